@@ -72,20 +72,89 @@ __license__ = "FreeBSD, see COPYING"
 from datetime import timedelta
 from mpeg1audio import headers
 from mpeg1audio import utils
+from mpeg1audio import crc
+from mpeg1audio import framestats
+from mpeg1audio import sources
 from headers import MPEGAudioHeaderEOFException, MPEGAudioHeaderException
+from collections import namedtuple
+import array
+import contextlib
+import hashlib
+import itertools
 import math
 import struct
 
 __all__ = ['MPEGAudioFrameBase', 'MPEGAudioFrameIterator', 'MPEGAudioFrame',
-           'MPEGAudio', 'MPEGAudioHeaderException',
-           'MPEGAudioHeaderEOFException', 'PARSE_ALL_CHUNK_SIZE', 'headers',
-           'utils', 'vbri', 'xing']
+           'MPEGAudioFrameIndex', 'MPEGAudioFrameBatch', 'MPEGAudio',
+           'MPEGAudioHeaderException', 'MPEGAudioHeaderEOFException',
+           'PARSE_ALL_CHUNK_SIZE', 'FRAME_INDEX_INTERVAL', 'FRAME_BATCH_SIZE',
+           'headers', 'utils', 'vbri', 'xing']
 
 PARSE_ALL_CHUNK_SIZE = 153600
 """Chunk size of parsing all frames.
 
 :type: int"""
 
+_HEADER_STRUCT = struct.Struct('>I')
+"""MPEGAudio frame header."""
+
+FRAME_INDEX_INTERVAL = 64
+"""Interval of frames between checkpoints in :class:`MPEGAudioFrameIndex`.
+
+:type: int"""
+
+FRAME_BATCH_SIZE = 65536
+"""Count of frames in batches of :func:`MPEGAudioFrameIterator.iter_batches`.
+
+:type: int"""
+
+CBR_TAIL_SIZE = 4096
+"""Size of the tail read for the exact CBR frame count, covers the tags and the
+last frame of most files.
+
+:type: int"""
+
+RESYNC_MAX_BYTES = 65536
+"""Maximum of bytes searched for next frame after corrupted frame, in tolerant
+parsing.
+
+:type: int"""
+
+RESYNC_FRAMES = 3
+"""Count of consecutive frames required to resync after corrupted frame, in
+tolerant parsing.
+
+:type: int"""
+
+def _update_hash(hasher, hashed, chunk, chunk_offset, end_offset):
+    """Hash bytes of chunk not yet hashed, up to the given offset.
+    
+    :param hasher: Hash object updated.
+    :type hasher: hash object
+    
+    :param hashed: Offset up to which bytes are hashed.
+    :type hashed: int
+    
+    :param chunk: Chunk of file.
+    :type chunk: string
+    
+    :param chunk_offset: Offset of chunk *within a file*.
+    :type chunk_offset: int
+    
+    :param end_offset: Offset up to which bytes are hashed, bytes beyond the
+        chunk are hashed from the next chunk.
+    :type end_offset: int
+    
+    :return: Offset up to which bytes are hashed.
+    :rtype: int
+    
+    """
+    end_offset = min(end_offset, chunk_offset + len(chunk))
+    if end_offset <= hashed:
+        return hashed
+    hasher.update(chunk[max(hashed - chunk_offset, 0):end_offset - chunk_offset])
+    return end_offset
+
 class MPEGAudioFrameBase(object):
     """MPEGAudio frame base, should not be instated, only inherited.
     
@@ -120,7 +189,8 @@ class MPEGAudioFrameBase(object):
         """
 
         self.is_protected = False
-        """Is protected?
+        """Is protected by CRC? Protected frames have CRC-16 after the header,
+        this is the case when the protection bit is *not* set.
         
         :type: bool 
         """
@@ -215,7 +285,15 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         
         """
 
-    def get_forward_iterator(self, file, chunk_size=None):
+        self.header = None
+        """Header bytes as integer, ``None`` if the frame is not parsed.
+        
+        :type: int, or None
+        
+        """
+
+    def get_forward_iterator(self, file, chunk_size=None, crc_report=None,
+                             hasher=None):
         """Get forward iterator from this position.
         
         :param file: File object
@@ -225,6 +303,14 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
             :const:`mpeg1audio.utils.DEFAULT_CHUNK_SIZE`.
         :type chunk_size: int
         
+        :param crc_report: Verify CRC of protected frames, and collect results
+            to given report.
+        :type crc_report: :class:`crc.CRCReport`, or None
+        
+        :param hasher: Hash bytes of the frames, see
+            :func:`parse_consecutive`.
+        :type hasher: hash object, or None
+        
         :return: Generator that iterates forward from this frame.
         :rtype: generator of :class:`MPEGAudioFrame`
         
@@ -233,11 +319,28 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         next_frame_offset = self.offset + self.size
         chunks = utils.chunked_reader(file, start_position=next_frame_offset,
                                        chunk_size=chunk_size)
-        return MPEGAudioFrame.parse_consecutive(next_frame_offset, chunks)
+        return MPEGAudioFrame.parse_consecutive(next_frame_offset, chunks,
+                                                crc_report=crc_report,
+                                                hasher=hasher)
 
-#    def get_backward_iterator(self, file):
-#        # TODO: LOW: Backward iterator
-#        raise NotImplementedError('Backward iteration not implemented!')
+    def get_backward_iterator(self, file, chunk_size=None):
+        """Get backward iterator from this position.
+        
+        :param file: File object
+        :type file: file object
+        
+        :param chunk_size: Chunked reading size, ``None`` defaults to 
+            :const:`mpeg1audio.utils.DEFAULT_CHUNK_SIZE`.
+        :type chunk_size: int
+        
+        :return: Generator that iterates backward from this frame, first
+            yielded is the frame preceding this one.
+        :rtype: generator of :class:`MPEGAudioFrame`
+        
+        """
+        chunks = utils.reverse_chunked_reader(file, end_position=self.offset,
+                                              chunk_size=chunk_size)
+        return MPEGAudioFrame.parse_consecutive_backward(self, chunks)
 
     @classmethod
     def find_and_parse(cls, file, max_frames=3, chunk_size=None, #IGNORE:R0913
@@ -300,11 +403,16 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         return iter([])
 
     @classmethod
-    def parse_consecutive(cls, header_offset, chunks):
+    def parse_consecutive(cls, header_offset, chunks, crc_report=None,
+                          hasher=None, hash_offset=None, stream_header=None):
         """Parse consecutive MPEGAudio Frame headers. 
         
         Parses from given position until header parsing error, or end of chunks.
         
+        Parsing is locked to the latest parsed frame: next frame differing only
+        by bitrate and padding is copied from it, with the size looked up from
+        :func:`headers.get_size_table`. Only other frames are parsed fully.
+        
         :param header_offset: Header offset *within a file*.
         :type header_offset: int
         
@@ -312,6 +420,25 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
             reached.
         :type chunks: generator, or list
         
+        :param crc_report: Verify CRC of protected frames, and collect results to 
+            given report. Frames are verified in batches per chunk, and yielded
+            after verification.
+        :type crc_report: :class:`crc.CRCReport`, or None
+        
+        :param hasher: Hash bytes of the frames, e.g. from :mod:`hashlib`.
+            Frame is hashed when the next frame is requested, so frames not
+            consumed are not hashed.
+        :type hasher: hash object, or None
+        
+        :param hash_offset: Offset from which frames are hashed, ``None``
+            defaults to *header_offset*.
+        :type hash_offset: int
+        
+        :param stream_header: Header of a frame of the stream, frames ending
+            at header not matching it by :const:`headers.STREAM_MASK`.
+            ``None`` accepts frames of any stream.
+        :type stream_header: int, or None
+        
         :return: Generator yielding MPEGAudio frames.
         :rtype: generator of :class:`MPEGFrame`
         
@@ -323,20 +450,43 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         previous_chunk = ""
         next_mpegframe_offset = header_offset
 
+        # Frames waiting for CRC verification, and bytes needed from the
+        # previous chunk to have their protected bits.
+        pending_mpegframes = []
+        tail_size = 4
+        if crc_report is not None:
+            tail_size = crc.MAX_PROTECTED_SIZE
+
+        hashed = header_offset if hash_offset is None else hash_offset
+
+        stream_bits = None
+        if stream_header is not None:
+            stream_bits = stream_header & headers.STREAM_MASK
+
+        # Locked frame, its header bits by headers.LOCK_MASK, and the sizes of
+        # its stream.
+        locked_mpegframe = None
+        locked_bits = None
+        size_table = None
+
+        chunk = ""
+        chunk_offset = header_offset
         for next_chunk_offset, next_chunk in chunks:
-            # Get 4 bytes from previous chunk
-            previous_chunk_end = previous_chunk[-4:]
+            # Get bytes from previous chunk
+            previous_chunk_end = previous_chunk[-tail_size:]
 
-            # Join the 4 bytes, if there were any, to tested chunk
+            # Join the bytes, if there were any, to tested chunk
             chunk = previous_chunk_end + next_chunk
             chunk_offset = next_chunk_offset - len(previous_chunk_end)
 
             # Yield all frames in chunk 
+            has_ended = False
             while True:
                 if (previous_mpegframe is not None) and \
                    (previous_mpegframe_offset is not None):
                     if previous_mpegframe.size is None:
-                        return
+                        has_ended = True
+                        break
                         # TODO: LOW: Free bitrate, you must search for the
                         # second frame.
                     next_mpegframe_offset = previous_mpegframe_offset + \
@@ -351,21 +501,437 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
                     # We need next chunk, end of this chunk was reached
                     break
 
-                # Parse and append if parseable
-                try:
-                    next_mpegframe = MPEGAudioFrame.parse(header_bytes)
-                except MPEGAudioHeaderException:
-                    return
+                if stream_bits is not None and \
+                   header_bytes & headers.STREAM_MASK != stream_bits:
+                    has_ended = True
+                    break
+
+                # Copy the locked frame, or parse and lock if parseable
+                entry = None
+                if header_bytes & headers.LOCK_MASK == locked_bits:
+                    entry = size_table.get(header_bytes &
+                                           headers.SIZE_TABLE_MASK)
+                if entry is not None:
+                    next_mpegframe = locked_mpegframe._copy_locked(header_bytes,
+                                                                   entry)
                 else:
-                    # Frame was parsed successfully
-                    next_mpegframe.offset = next_mpegframe_offset
+                    try:
+                        next_mpegframe = MPEGAudioFrame.parse(header_bytes)
+                    except MPEGAudioHeaderException:
+                        has_ended = True
+                        break
+                    locked_mpegframe = next_mpegframe
+                    locked_bits = header_bytes & headers.LOCK_MASK
+                    size_table = headers.get_size_table(header_bytes)
+
+                # Frame was parsed successfully
+                next_mpegframe.offset = next_mpegframe_offset
+                if hasher is not None:
+                    # Previous frames are consumed.
+                    hashed = _update_hash(hasher, hashed, chunk, chunk_offset,
+                                          next_mpegframe_offset)
+                if crc_report is None:
                     yield next_mpegframe
+                else:
+                    pending_mpegframes.append(next_mpegframe)
 
                 previous_mpegframe_offset = next_mpegframe_offset
                 previous_mpegframe = next_mpegframe
-            previous_chunk = next_chunk
+
+            # Frames of this chunk are consumed, up to the next header.
+            if hasher is not None:
+                hashed = _update_hash(hasher, hashed, chunk, chunk_offset,
+                                      next_mpegframe_offset)
+
+            # Verify the batch of frames within this chunk
+            if pending_mpegframes:
+                verified_mpegframes, pending_mpegframes = \
+                    crc_report.verify(pending_mpegframes, chunk, chunk_offset,
+                               final=has_ended)
+                for mpegframe in verified_mpegframes:
+                    yield mpegframe
+
+            if has_ended:
+                return
+            previous_chunk = chunk
+
+        if pending_mpegframes:
+            verified_mpegframes, pending_mpegframes = \
+                crc_report.verify(pending_mpegframes, chunk, chunk_offset, final=True)
+            for mpegframe in verified_mpegframes:
+                yield mpegframe
         return
 
+    @classmethod
+    def count_consecutive(cls, header_offset, chunks, index=None, hasher=None,
+                          hash_offset=None):
+        """Count consecutive MPEGAudio Frames, without creating frames.
+
+        Counts the same frames as :func:`parse_consecutive` yields, but only
+        looks up sizes and bitrates of headers from
+        :func:`headers.get_frame_table`.
+
+        :param header_offset: Header offset *within a file*.
+        :type header_offset: int
+
+        :param chunks: Generator yielding consecutive chunks, starting at
+            *header_offset*.
+        :type chunks: generator, or list
+
+        :param index: Record checkpoints of the counted frames, the first frame
+            being frame ``0``.
+        :type index: :class:`MPEGAudioFrameIndex`, or None
+
+        :param hasher: Hash bytes of the counted frames, e.g. from
+            :mod:`hashlib`.
+        :type hasher: hash object, or None
+
+        :param hash_offset: Offset from which frames are hashed, ``None``
+            defaults to *header_offset*.
+        :type hash_offset: int
+
+        :return: Count of frames, sum of their bitrates, and offset of the end
+            of the last frame.
+        :rtype: tuple of (int, int, int)
+
+        """
+        table_get = headers.get_frame_table().get
+        mask = headers.FRAME_TABLE_MASK
+        unpack_from = _HEADER_STRUCT.unpack_from
+
+        checkpoint = None
+        interval = 0
+        if index is not None:
+            interval = index.interval
+            checkpoint = len(index.offsets) * interval
+
+        hashed = header_offset if hash_offset is None else hash_offset
+
+        count = 0
+        bitrate_sum = 0
+        offset = header_offset
+        buffer = ""
+        buffer_offset = header_offset
+        for chunk_offset, chunk in chunks:
+            # Keep the incomplete header from the end of the previous buffer
+            position = offset - buffer_offset
+            if position < len(buffer):
+                buffer = buffer[position:] + chunk
+                buffer_offset = offset
+            else:
+                buffer = chunk
+                buffer_offset = chunk_offset
+            position = offset - buffer_offset
+
+            has_ended = False
+            end = len(buffer) - 3
+            while position < end:
+                entry = table_get(unpack_from(buffer, position)[0] & mask)
+                if entry is None:
+                    has_ended = True
+                    break
+                if count == checkpoint:
+                    index.offsets.append(buffer_offset + position)
+                    checkpoint += interval
+                count += 1
+                bitrate_sum += entry[1]
+                position += entry[0]
+
+            offset = buffer_offset + position
+            if hasher is not None:
+                hashed = _update_hash(hasher, hashed, buffer, buffer_offset,
+                                      offset)
+            if has_ended:
+                break
+
+        if index is not None:
+            index.frame_count = count
+        return count, bitrate_sum, offset
+
+    @classmethod
+    def batch_consecutive(cls, header_offset, chunks, batch_size=None,
+                          index=None):
+        """Parse consecutive MPEGAudio Frames to columnar batches, without
+        creating frames.
+        
+        Batches the same frames as :func:`count_consecutive` counts, with
+        the sizes and bitrates looked up from :func:`headers.get_frame_table`.
+        
+        :param header_offset: Header offset *within a file*.
+        :type header_offset: int
+        
+        :param chunks: Generator yielding consecutive chunks, starting at
+            *header_offset*.
+        :type chunks: generator, or list
+        
+        :param batch_size: Count of frames in batches, last batch may have
+            less. ``None`` defaults to :const:`FRAME_BATCH_SIZE`.
+        :type batch_size: int
+        
+        :param index: Record checkpoints of the frames, the first frame being
+            frame ``0``. Count of frames is recorded when the frames end.
+        :type index: :class:`MPEGAudioFrameIndex`, or None
+        
+        :rtype: generator of :class:`MPEGAudioFrameBatch`
+        
+        """
+        batch_size = batch_size or FRAME_BATCH_SIZE
+        table_get = headers.get_frame_table().get
+        mask = headers.FRAME_TABLE_MASK
+        unpack_from = _HEADER_STRUCT.unpack_from
+
+        checkpoint = None
+        interval = 0
+        if index is not None:
+            interval = index.interval
+            checkpoint = len(index.offsets) * interval
+
+        batch = MPEGAudioFrameBatch.new()
+        offsets, sizes, bitrates, header_ids = batch
+        batch_end = batch_size
+
+        count = 0
+        offset = header_offset
+        buffer = ""
+        buffer_offset = header_offset
+        for chunk_offset, chunk in chunks:
+            # Keep the incomplete header from the end of the previous buffer
+            position = offset - buffer_offset
+            if position < len(buffer):
+                buffer = buffer[position:] + chunk
+                buffer_offset = offset
+            else:
+                buffer = chunk
+                buffer_offset = chunk_offset
+            position = offset - buffer_offset
+
+            has_ended = False
+            end = len(buffer) - 3
+            while position < end:
+                header = unpack_from(buffer, position)[0]
+                entry = table_get(header & mask)
+                if entry is None:
+                    has_ended = True
+                    break
+                if count == checkpoint:
+                    index.offsets.append(buffer_offset + position)
+                    checkpoint += interval
+                offsets.append(buffer_offset + position)
+                sizes.append(entry[0])
+                bitrates.append(entry[1])
+                header_ids.append(header)
+                position += entry[0]
+
+                count += 1
+                if count == batch_end:
+                    yield batch
+                    batch = MPEGAudioFrameBatch.new()
+                    offsets, sizes, bitrates, header_ids = batch
+                    batch_end += batch_size
+
+            offset = buffer_offset + position
+            if has_ended:
+                break
+
+        if offsets:
+            yield batch
+        if index is not None:
+            index.frame_count = count
+
+    @classmethod
+    def resync(cls, file, offset, stream_mpegframe, max_bytes=None,
+               required_frames=None):
+        """Find next frame after corrupted frame.
+        
+        Searched region is read once, and the candidates are tested within
+        it. Candidate is accepted when it begins required count of 
+        consecutive frames, all matching the fixed header fields of the 
+        stream.
+        
+        :param file: File object being searched.
+        :type file: file object
+        
+        :param offset: Offset in file where to begin the search.
+        :type offset: int
+        
+        :param stream_mpegframe: Frame of the stream, found frames must match
+            its fixed header fields, see :func:`is_same_stream`.
+        :type stream_mpegframe: :class:`MPEGAudioFrame`
+        
+        :param max_bytes: Maximum of bytes searched, ``None`` defaults to
+            :const:`RESYNC_MAX_BYTES`.
+        :type max_bytes: int
+        
+        :param required_frames: Count of consecutive frames required, ``None``
+            defaults to :const:`RESYNC_FRAMES`.
+        :type required_frames: int
+        
+        :return: First frame found, ``None`` if frames were not found.
+        :rtype: :class:`MPEGAudioFrame`, or None
+        
+        """
+        max_bytes = max_bytes or RESYNC_MAX_BYTES
+        required_frames = required_frames or RESYNC_FRAMES
+
+        # Candidates are within max bytes, and the frames following them
+        # within the same buffer.
+        chunk = sources.get_source(file).read_at(offset, max_bytes + \
+                                    required_frames * headers.MAX_FRAME_SIZE)
+        return cls.find_in_chunk(chunk, offset, stream_mpegframe, max_bytes,
+                                 required_frames)
+
+    @classmethod
+    def find_in_chunk(cls, chunk, chunk_offset, stream_mpegframe,
+                      max_bytes=None, required_frames=None):
+        """Find first frame of the stream in chunk.
+        
+        Candidate is accepted when it begins required count of consecutive
+        frames within the chunk, all matching the fixed header fields of the
+        stream.
+        
+        :param chunk: Chunk searched.
+        :type chunk: string
+        
+        :param chunk_offset: Offset of the chunk in file.
+        :type chunk_offset: int
+        
+        :param stream_mpegframe: Frame of the stream, found frames must match
+            its fixed header fields, see :func:`is_same_stream` and
+            :const:`headers.STREAM_MASK`.
+        :type stream_mpegframe: :class:`MPEGAudioFrame`
+        
+        :param max_bytes: Candidates are within this many bytes from the
+            beginning of chunk, ``None`` searches the whole chunk.
+        :type max_bytes: int
+        
+        :param required_frames: Count of consecutive frames required, ``None``
+            defaults to :const:`RESYNC_FRAMES`.
+        :type required_frames: int
+        
+        :return: First frame found, ``None`` if frames were not found.
+        :rtype: :class:`MPEGAudioFrame`, or None
+        
+        """
+        required_frames = required_frames or RESYNC_FRAMES
+        if max_bytes is None:
+            max_bytes = len(chunk)
+
+        # Candidates not matching the stream are rejected by their header.
+        stream_header = stream_mpegframe.header
+        stream_bits = None
+        if stream_header is not None:
+            stream_bits = stream_header & headers.STREAM_MASK
+        unpack_from = _HEADER_STRUCT.unpack_from
+        end = len(chunk) - 3
+
+        for found in utils.find_all_overlapping(chunk[:max_bytes], chr(255)):
+            if stream_bits is not None and (found >= end or \
+               unpack_from(chunk, found)[0] & headers.STREAM_MASK != \
+               stream_bits):
+                continue
+            frames = list(itertools.islice(\
+                            MPEGAudioFrame.parse_consecutive(\
+                                chunk_offset + found, [(chunk_offset, chunk)],
+                                stream_header=stream_header),
+                            required_frames))
+            if len(frames) == required_frames and \
+               all(frame.is_same_stream(stream_mpegframe) for frame in frames):
+                return frames[0]
+        return None
+
+    def is_same_stream(self, mpegframe):
+        """Has the frame same fixed header fields as given frame?
+        
+        Fixed fields, the version, layer and sample rate, do not change within
+        a stream.
+        
+        :param mpegframe: Frame of the stream.
+        :type mpegframe: :class:`MPEGAudioFrame`
+        
+        :rtype: bool
+        
+        """
+        return self.version == mpegframe.version and \
+               self.layer == mpegframe.layer and \
+               self.sample_rate == mpegframe.sample_rate
+
+    @classmethod
+    def parse_consecutive_backward(cls, next_mpegframe, chunks):
+        """Parse consecutive MPEGAudio Frame headers backwards.
+        
+        Preceding frame is the one whose header parses, whose MPEG version,
+        layer and sample rate are same as in the following frame, and whose
+        size lands exactly on the following frame. Parses until no such frame
+        is found, or beginning of chunks.
+        
+        :param next_mpegframe: Known frame, parsing begins from the frame 
+            preceding this.
+        :type next_mpegframe: :class:`MPEGAudioFrame`
+        
+        :param chunks: Generator yielding chunks in reversed order, ending 
+            where *next_mpegframe* begins.
+        :type chunks: generator, or list
+        
+        :return: Generator yielding MPEGAudio frames in reversed order.
+        :rtype: generator of :class:`MPEGAudioFrame`
+        
+        :see: :func:`utils.reverse_chunked_reader()`
+        
+        """
+        chunks = iter(chunks)
+        next_mpegframe_offset = next_mpegframe.offset
+        buffer = ""
+        buffer_offset = next_mpegframe_offset
+        has_chunks = True
+
+        while True:
+            # Buffer must hold the largest possible frame before next frame
+            while has_chunks and \
+                  next_mpegframe_offset - buffer_offset < \
+                  headers.MAX_FRAME_SIZE:
+                try:
+                    chunk_offset, chunk = chunks.next()
+                except StopIteration:
+                    has_chunks = False
+                else:
+                    buffer = chunk + \
+                             buffer[:next_mpegframe_offset - buffer_offset]
+                    buffer_offset = chunk_offset
+
+            # Search candidates starting from the nearest
+            mpegframe = None
+            lowest = max(next_mpegframe_offset - headers.MAX_FRAME_SIZE -
+                         buffer_offset, 0)
+            found = next_mpegframe_offset - buffer_offset - 4
+            while found >= lowest:
+                found = buffer.rfind(chr(255), lowest, found + 1)
+                if found == -1:
+                    break
+
+                try:
+                    candidate = MPEGAudioFrame.parse(\
+                                        headers.get_bytes(found, buffer))
+                except MPEGAudioHeaderException:
+                    pass
+                else:
+                    if candidate.size == \
+                            next_mpegframe_offset - buffer_offset - found and \
+                       candidate.version == next_mpegframe.version and \
+                       candidate.layer == next_mpegframe.layer and \
+                       candidate.sample_rate == next_mpegframe.sample_rate:
+                        mpegframe = candidate
+                        break
+                found -= 1
+
+            if mpegframe is None:
+                return
+
+            mpegframe.offset = buffer_offset + found
+            yield mpegframe
+
+            next_mpegframe = mpegframe
+            next_mpegframe_offset = mpegframe.offset
+
     @classmethod
     def parse(cls, bytes):
         """Tries to create MPEGAudio Frame from given bytes.
@@ -381,7 +947,7 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
             cannot be parsed.
             
         """
-        # TODO: LOW: CRC, verify and parse.
+        # CRC is verified by parse_consecutive, see crc.CRCReport
         # http://www.codeproject.com/KB/audio-video/mpegaudioinfo.aspx#CRC
 
         # Header synchronization bits
@@ -418,7 +984,7 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         self.is_private = private_bit == 1
         self.is_copyrighted = copyright_bit == 1
         self.is_original = original_bit == 1
-        self.is_protected = protection_bit == 1
+        self.is_protected = protection_bit == 0
 
         # Non-header parseable information
         self.samples_per_frame = headers.get_samples_per_frame(self.version,
@@ -426,11 +992,136 @@ class MPEGAudioFrame(MPEGAudioFrameBase):
         self.size = headers.get_frame_size(self.version, self.layer,
                                            self.sample_rate, self.bitrate,
                                            self._padding_size)
+        self.header = bytes
         return self
 
+    def _copy_locked(self, header, entry):
+        """Copy of this frame, for header differing only by bitrate and 
+        padding, see :const:`headers.LOCK_MASK`.
+        
+        :param header: Header of the copy.
+        :type header: int
+        
+        :param entry: Frame size and bitrate of the header, from
+            :func:`headers.get_size_table`.
+        :type entry: tuple of (int, int)
+        
+        :rtype: :class:`MPEGAudioFrame`
+        
+        """
+        mpegframe = MPEGAudioFrame.__new__(MPEGAudioFrame)
+        mpegframe.__dict__.update(self.__dict__)
+        mpegframe.size, mpegframe.bitrate = entry
+        mpegframe._padding_size = (header >> 9) & 1
+        mpegframe.header = header
+        return mpegframe
+
+class MPEGAudioFrameIndex(object):
+    """Sparse index of MPEGAudio frame offsets.
+    
+    Records the offset of every *interval*:th frame while frames are being
+    iterated from the beginning. Getting arbitrary frame requires then parsing
+    at most *interval* frames forward from the nearest checkpoint.
+    
+    """
+    def __init__(self, interval=None):
+        """
+        :param interval: Interval of frames between checkpoints, ``None``
+            defaults to :const:`FRAME_INDEX_INTERVAL`. Memory usage of index is
+            *frame count / interval* offsets.
+        :type interval: int
+        
+        """
+        self.interval = max(interval or FRAME_INDEX_INTERVAL, 1)
+        """Interval of frames between checkpoints.
+        
+        :type: int
+        """
+
+        self.offsets = []
+        """Offsets of checkpoint frames, item *n* is the offset of frame 
+        *n * interval*.
+        
+        :type: list of int
+        """
+
+        self.frame_count = None
+        """Count of frames, known when iteration has reached the last frame.
+        
+        :type: int, or None
+        """
+
+    def add(self, number, offset):
+        """Record frame, if it is the next checkpoint.
+        
+        :param number: Number of the frame, first frame is ``0``.
+        :type number: int
+        
+        :param offset: Offset of the frame in file.
+        :type offset: int
+        
+        """
+        if number == len(self.offsets) * self.interval:
+            self.offsets.append(offset)
+
+    def nearest(self, number):
+        """Nearest checkpoint at or before given frame.
+        
+        :param number: Number of the frame.
+        :type number: int
+        
+        :return: Number and offset of the checkpoint frame.
+        :rtype: tuple of (int, int)
+        
+        :raise IndexError: Raised if index does not have checkpoints.
+        
+        """
+        if not self.offsets:
+            raise IndexError('Frame index is empty.')
+        checkpoint = min(number // self.interval, len(self.offsets) - 1)
+        return checkpoint * self.interval, self.offsets[checkpoint]
+
+class MPEGAudioFrameBatch(namedtuple('MPEGAudioFrameBatch',
+                                     ('offsets', 'sizes', 'bitrates',
+                                      'headers'))):
+    """Columnar batch of consecutive frames.
+    
+    Columns are arrays of equal length, one item per frame: ``offsets`` in
+    file, ``sizes`` in bytes, ``bitrates`` in kilobits per second, and
+    ``headers`` as integers, identifying the fields of the frames, see
+    :func:`MPEGAudioFrame.parse`. Arrays are :class:`array.array` of typecodes
+    ``"l"``, ``"H"``, ``"H"`` and ``"L"``, or NumPy arrays of the same types,
+    see :func:`to_numpy`.
+    
+    """
+    __slots__ = ()
+
+    @classmethod
+    def new(cls):
+        """Create empty batch.
+        
+        :rtype: :class:`MPEGAudioFrameBatch`
+        
+        """
+        return cls(array.array('l'), array.array('H'), array.array('H'),
+                   array.array('L'))
+
+    def to_numpy(self):
+        """Get batch of NumPy arrays, sharing the memory of the arrays.
+        
+        :rtype: :class:`MPEGAudioFrameBatch`
+        
+        :raise ImportError: Raised if NumPy is not available.
+        
+        """
+        import numpy
+        return MPEGAudioFrameBatch(*[numpy.frombuffer(column,
+                                                      dtype=column.typecode) \
+                                     for column in self])
+
 class MPEGAudioFrameIterator(object):
     """MPEGAudio Frame iterator, for lazy evaluation."""
-    def __init__(self, mpeg, begin_frames, end_frames):
+    def __init__(self, mpeg, begin_frames, end_frames, index_interval=None):
         """        
         :param mpeg: MPEGAudio Which frames are to be iterated over.
         :type mpeg: :class:`MPEGAudio`
@@ -441,6 +1132,10 @@ class MPEGAudioFrameIterator(object):
         :param end_frames: End frames of MPEGAudio. 
         :type end_frames: lambda: [:class:`MPEGAudioFrame`, ...]
         
+        :param index_interval: Interval of checkpoints in frame index, ``None``
+            defaults to :const:`FRAME_INDEX_INTERVAL`.
+        :type index_interval: int
+        
         """
         self.mpeg = mpeg
         """MPEGAudio which frames are iterated.
@@ -466,6 +1161,12 @@ class MPEGAudioFrameIterator(object):
         :type: bool 
         """
 
+        self._hash_algorithm = None
+        """Hash algorithm of :attr:`MPEGAudio.content_hash` when parsed all.
+        
+        :type: string, or None
+        """
+
         self._has_parsed_beginning = not callable(self._begin_frames)
         """Has parsing beginning occurred?
         
@@ -478,72 +1179,505 @@ class MPEGAudioFrameIterator(object):
         :type: bool 
         """
 
+        self._index = MPEGAudioFrameIndex(index_interval)
+        """Sparse index of frames, filled during iteration.
+        
+        :type: :class:`MPEGAudioFrameIndex`
+        """
+
     def __len__(self):
-        pass
+        """Count of frames.
+        
+        .. note:: May start parsing of all frames, only if the file is VBR
+            without Xing or VBRI header. See :func:`get_length`.
+        
+        """
+        return self.get_length()[0]
 
-    def parse_all(self, force=False):
+    def get_length(self, scan=True):
+        """Count of frames from the cheapest source available.
+        
+        The count is taken from the first available of the following:
+        
+            1. frame index, when all frames have been iterated (exact),
+            2. frame count of Xing or VBRI header, and the frame holding the
+               header (not exact),
+            3. CBR frame count calculated from the padding schedule (exact),
+               or estimated from size (not exact),
+            4. iterating all frames (exact), only if *scan* is ``True``.
+        
+        :param scan: Iterate all frames if no other source is available.
+        :type scan: bool
+        
+        :return: Count of frames, ``None`` if not scanned, and is the count
+            exact.
+        :rtype: tuple of (int, or None, bool)
+        
+        """
+        mpeg = self.mpeg
+
+        if self._index.frame_count is not None:
+            return self._index.frame_count, True
+
+        for vbr in (mpeg.xing, mpeg.vbri):
+            if vbr is not None and vbr.frame_count is not None:
+                # Frame holding the VBR header is not counted by the header.
+                return vbr.frame_count + 1, False
+
+        if not mpeg.is_vbr:
+            frame_count = mpeg._get_frame_count(parse_all=False,
+                                                parse_ending=True)
+            return frame_count, mpeg.provenance in ('parsed', 'calculated')
+
+        if scan:
+            return self._get_frame_count(), True
+
+        return None, False
+
+    def parse_all(self, force=False, verify_crc=None, tolerant=None,
+                  statistics=None, hash_algorithm=None):
         """Parse all frames.
         
         :see: :func:`MPEGAudio.parse_all`
         
         """
+        if verify_crc is not None:
+            self.mpeg.verify_crc = verify_crc
+        if tolerant is not None:
+            self.mpeg.tolerant = tolerant
+
         # TODO: LOW: How do we deal corrupted MPEGAudio files? 
         # Where some frames are misplaced, etc?
 
-        if self._has_parsed_all and not force:
-            # TODO: DEBUG!
-            raise NotImplementedError('This should not happen, ever!')
-            # return
-
+        # Parsed again only if asked for results not gathered by the pass.
+        if self._has_parsed_all and not force and statistics is None and \
+           verify_crc is None and tolerant is None and \
+           hash_algorithm in (None, self._hash_algorithm):
+            return
+
+        if statistics is True:
+            statistics = framestats.FrameStatistics()
+        elif statistics is not None and \
+             not isinstance(statistics, framestats.FrameStatistics):
+            statistics = framestats.FrameStatistics(statistics)
+
+        # Frames are hashed in the same pass, except the XING or VBRI frame.
+        hasher = None
+        hash_offset = None
+        begin_frames = self._get_begin_frames()
+        if hash_algorithm is not None:
+            hasher = hashlib.new(hash_algorithm)
+            hash_offset = begin_frames[0].offset
+            if self.mpeg.xing is not None or self.mpeg.vbri is not None:
+                hash_offset += begin_frames[0].size
+
+        # Reading stops when the budget is exceeded, frames so far are used.
         avg_bitrate = 0
         index = -1
-        for index, frame in enumerate(self):
-            avg_bitrate += frame.bitrate
+        end_offset = None
+        first_offset = begin_frames[0].offset
+        if statistics is None and not self.mpeg.verify_crc and \
+           not self.mpeg.tolerant:
+            # Frames are not needed, only counted.
+            chunks = utils.StopOnException(\
+                        utils.chunked_reader(self.mpeg._source,
+                                             start_position=first_offset,
+                                             chunk_size=PARSE_ALL_CHUNK_SIZE),
+                        sources.BudgetException)
+            index, avg_bitrate, end_offset = \
+                MPEGAudioFrame.count_consecutive(first_offset, chunks,
+                                                 index=self._index,
+                                                 hasher=hasher,
+                                                 hash_offset=hash_offset)
+            index -= 1
+            budget_exception = chunks.exception
+        else:
+            frames = utils.StopOnException(self._iterate(hasher, hash_offset),
+                                           sources.BudgetException)
+            if statistics is None:
+                for index, frame in enumerate(frames):
+                    avg_bitrate += frame.bitrate
+            else:
+                add = statistics.add
+                for index, frame in enumerate(frames):
+                    avg_bitrate += frame.bitrate
+                    add(frame)
+                self.mpeg.statistics = statistics
+            if index >= 0:
+                end_offset = frame.offset + frame.size
+            budget_exception = frames.exception
 
         # Close for now
         self.mpeg.close()
 
+        if budget_exception is not None:
+            if index < 0:
+                raise budget_exception
+
+            # Estimate from the frames parsed so far, hash is not complete
+            self._index.frame_count = None
+            self.mpeg.content_hash = None
+            self._hash_algorithm = None
+            self.mpeg.budget_exceeded = True
+            self.mpeg.frame_count = int(round(float(index + 1) * \
+                            self.mpeg.size / (end_offset - first_offset)))
+            self.mpeg.bitrate = avg_bitrate / (index + 1)
+            self.mpeg.provenance = 'estimated'
+            return
+
         frame_count = index + 1
         bitrate = avg_bitrate / frame_count
 
         # Set MPEGAudio values
         self.mpeg.frame_count = frame_count
         self.mpeg.bitrate = bitrate
+        self.mpeg.provenance = 'parsed'
+        if hasher is not None:
+            self.mpeg.content_hash = hasher.hexdigest()
+            self._hash_algorithm = hash_algorithm
 
         # Set has parsed all
         self._has_parsed_all = True
 
-#    def __reversed__(self):
-#        # TODO: LOW: Backward iterator
-#        pass
+    def __reversed__(self):
+        # Join reversed end frames, and generator yielding preceding frames
+        # from that on, until the first frame of MPEGAudio.
+        end_frames = self._get_end_frames()
+        first_offset = self.mpeg.offset
+        return itertools.takewhile(lambda frame: frame.offset >= first_offset,
+                 utils.join_iterators(\
+                   reversed(end_frames),
+                   end_frames[0].get_backward_iterator(self.mpeg._source)))
 
     def __iter__(self):
+        return self._iterate()
+
+    def _iterate(self, hasher=None, hash_offset=None):
+        """Iterate all frames.
+        
+        :param hasher: Hash bytes of the frames, see
+            :func:`MPEGAudioFrame.parse_consecutive`.
+        :type hasher: hash object, or None
+        
+        :param hash_offset: Offset from which frames are hashed.
+        :type hash_offset: int
+        
+        :rtype: generator of :class:`MPEGAudioFrame`
+        
+        """
         # Join begin frames, and generator yielding next frames from that on.
 
         # TODO: ASSUMPTION: Iterating frames uses parsing all chunk size.
-        return utils.join_iterators(\
-                 self._begin_frames,
-                 self._begin_frames[-1].\
-                    get_forward_iterator(self.mpeg._file,
-                                         chunk_size=PARSE_ALL_CHUNK_SIZE))
+        begin_frames = self._get_begin_frames()
+
+        # Begin frames are not verified nor hashed, verifying and hashing 
+        # walks from the first frame.
+        if self.mpeg.verify_crc or hasher is not None:
+            crc_report = None
+            if self.mpeg.verify_crc:
+                crc_report = self.mpeg.crc_report = crc.CRCReport()
+            first_offset = begin_frames[0].offset
+            chunks = utils.chunked_reader(self.mpeg._source,
+                                          start_position=first_offset,
+                                          chunk_size=PARSE_ALL_CHUNK_SIZE)
+            return self._walk(0, self._tolerate(\
+                     MPEGAudioFrame.parse_consecutive(\
+                       first_offset, chunks, crc_report=crc_report,
+                       hasher=hasher, hash_offset=hash_offset),
+                     PARSE_ALL_CHUNK_SIZE, crc_report, hasher))
+
+        return self._walk(0, self._tolerate(utils.join_iterators(\
+                 begin_frames,
+                 begin_frames[-1].\
+                    get_forward_iterator(self.mpeg._source,
+                                         chunk_size=PARSE_ALL_CHUNK_SIZE)),
+                 PARSE_ALL_CHUNK_SIZE))
+
+    def iter_batches(self, size=None, as_numpy=False):
+        """Iterate all frames as columnar batches.
+        
+        Frames are parsed chunk at a time to arrays of offsets, sizes,
+        bitrates and headers, without creating :class:`MPEGAudioFrame` for
+        each frame. Only when the MPEGAudio is tolerant, or verifies CRC, the
+        batches are collected from frames.
+        
+        Usage example::
+        
+            for batch in mpeg.frames.iter_batches(as_numpy=True):
+                print batch.bitrates.mean()
+        
+        :param size: Count of frames in batches, last batch may have less.
+            ``None`` defaults to :const:`FRAME_BATCH_SIZE`.
+        :type size: int
+        
+        :param as_numpy: Get columns as NumPy arrays.
+        :type as_numpy: bool
+        
+        :rtype: generator of :class:`MPEGAudioFrameBatch`
+        
+        :raise ImportError: Raised if NumPy is requested but not available.
+        
+        """
+        size = size or FRAME_BATCH_SIZE
+        if as_numpy:
+            import numpy
+
+        mpeg = self.mpeg
+        if mpeg.verify_crc or mpeg.tolerant:
+            batches = self._batch_frames(self, size)
+        else:
+            first_offset = self._get_begin_frames()[0].offset
+            chunks = utils.chunked_reader(mpeg._source,
+                                          start_position=first_offset,
+                                          chunk_size=PARSE_ALL_CHUNK_SIZE)
+            batches = MPEGAudioFrame.batch_consecutive(first_offset, chunks,
+                                                       size, index=self._index)
+
+        for batch in batches:
+            yield batch.to_numpy() if as_numpy else batch
+
+    def _batch_frames(self, frames, size):
+        """Collect frames to columnar batches.
+        
+        :param frames: Frames batched.
+        :type frames: iterable of :class:`MPEGAudioFrame`
+        
+        :param size: Count of frames in batches.
+        :type size: int
+        
+        :rtype: generator of :class:`MPEGAudioFrameBatch`
+        
+        """
+        batch = MPEGAudioFrameBatch.new()
+        for frame in frames:
+            batch.offsets.append(frame.offset)
+            batch.sizes.append(frame.size)
+            batch.bitrates.append(frame.bitrate)
+            batch.headers.append(frame.header)
+            if len(batch.offsets) == size:
+                yield batch
+                batch = MPEGAudioFrameBatch.new()
+        if batch.offsets:
+            yield batch
+
+    def _tolerate(self, frames, chunk_size=None, crc_report=None,
+                  hasher=None):
+        """Continue frames over corrupted regions, if MPEGAudio is tolerant.
+        
+        When frames end, or a frame not matching the stream is found, next
+        frame is searched with :func:`MPEGAudioFrame.resync`, and the skipped
+        region is recorded to :attr:`MPEGAudio.gaps`.
+        
+        :param frames: Consecutive frames.
+        :type frames: iterable of :class:`MPEGAudioFrame`
+        
+        :param chunk_size: Chunk size of iterating after resync.
+        :type chunk_size: int
+        
+        :param crc_report: Verify CRC of frames after resync, and collect 
+            results to given report.
+        :type crc_report: :class:`crc.CRCReport`, or None
+        
+        :param hasher: Hash bytes of frames after resync, skipped regions are
+            not hashed.
+        :type hasher: hash object, or None
+        
+        :rtype: generator of :class:`MPEGAudioFrame`
+        
+        """
+        mpeg = self.mpeg
+        if not mpeg.tolerant:
+            for frame in frames:
+                yield frame
+            return
+
+        stream_frame = self._get_begin_frames()[0]
+        previous_frame = None
+        while True:
+            for frame in frames:
+                if not frame.is_same_stream(stream_frame):
+                    break
+                previous_frame = frame
+                yield frame
+
+            if previous_frame is None:
+                return
+
+            gap_offset = previous_frame.offset + previous_frame.size
+            frame = MPEGAudioFrame.resync(mpeg._source, gap_offset, stream_frame)
+            if frame is None:
+                return
+
+            gap = (gap_offset, frame.offset - gap_offset)
+            if gap not in mpeg.gaps:
+                mpeg.gaps.append(gap)
+                mpeg.gaps.sort()
+
+            if hasher is not None:
+                hasher.update(mpeg._source.read_at(frame.offset, frame.size))
+            frames = utils.join_iterators([frame],
+                       frame.get_forward_iterator(mpeg._source,
+                                                  chunk_size=chunk_size,
+                                                  crc_report=crc_report,
+                                                  hasher=hasher))
+
+    def _walk(self, number, frames):
+        """Yield frames, and record them to frame index.
+        
+        :param number: Number of the first frame in *frames*.
+        :type number: int
+        
+        :param frames: Consecutive frames, starting from frame *number*.
+        :type frames: iterable of :class:`MPEGAudioFrame`
+        
+        :rtype: generator of :class:`MPEGAudioFrame`
+        
+        :raise sources.BudgetException: Raised if the deadline of budget is
+            exceeded, also when frames are read from the block cache.
+        
+        """
+        index = self._index
+        budget = self.mpeg.budget
+        frame = None
+        for number, frame in enumerate(frames, number):
+            if budget is not None:
+                budget.check()
+            index.add(number, frame.offset)
+            yield frame
+            number += 1
+
+        # Frames ran out at the last frame, count of frames is now known. Walk
+        # stopped by corrupted frame before it is not recorded.
+        end_frames = self._get_end_frames()
+        if frame is not None and \
+           (not end_frames or frame.offset >= end_frames[-1].offset):
+            index.frame_count = number
+
+    def _walk_from_index(self, number):
+        """Frames from the nearest checkpoint at or before given frame.
+        
+        :param number: Number of the frame wanted.
+        :type number: int
+        
+        :return: Number of the checkpoint frame, and frames starting from it.
+        :rtype: tuple of (int, generator of :class:`MPEGAudioFrame`)
+        
+        """
+        if not self._index.offsets:
+            for begin_number, frame in enumerate(self._get_begin_frames()):
+                self._index.add(begin_number, frame.offset)
+
+        checkpoint_number, checkpoint_offset = self._index.nearest(number)
+
+        # Walking past the indexed range uses parsing all chunk size
+        chunk_size = utils.DEFAULT_CHUNK_SIZE
+        if number - checkpoint_number > self._index.interval:
+            chunk_size = PARSE_ALL_CHUNK_SIZE
+
+        chunks = utils.chunked_reader(self.mpeg._source,
+                                      start_position=checkpoint_offset,
+                                      chunk_size=chunk_size)
+        frames = MPEGAudioFrame.parse_consecutive(checkpoint_offset, chunks)
+        return checkpoint_number, \
+               self._walk(checkpoint_number, self._tolerate(frames, chunk_size))
+
+    def _get_frame(self, number):
+        """Get frame by number using frame index.
+        
+        :param number: Number of the frame, first frame is ``0``.
+        :type number: int
+        
+        :rtype: :class:`MPEGAudioFrame`
+        
+        :raise IndexError: Raised if there is no such frame.
+        
+        """
+        frame_count = self._index.frame_count
+        if frame_count is not None and number >= frame_count:
+            raise IndexError('Frame index out of range.')
+
+        checkpoint_number, frames = self._walk_from_index(number)
+        for frame in itertools.islice(frames, number - checkpoint_number, None):
+            return frame
+
+        raise IndexError('Frame index out of range.')
+
+    def _get_frame_count(self):
+        """Frame count, walks from the last checkpoint to the end if needed.
+        
+        :rtype: int
+        
+        """
+        if self._index.frame_count is None:
+            last_checkpoint = len(self._index.offsets) * self._index.interval
+            for frame in self._walk_from_index(last_checkpoint)[1]:
+                pass
+        return self._index.frame_count
+
+    def _get_exact_length(self):
+        """Exact count of frames, walks to the end if needed.
+        
+        :rtype: int
+        
+        """
+        length, is_exact = self.get_length()
+        if not is_exact:
+            length = self._get_frame_count()
+        return length
 
     def __getitem__(self, key):
-        # TODO: LOW: Following is misleading, _begin_frames and _end_frames does
-        # not include all keys, works for now.
-        if key < 0:
-            # Lazy evaluate
-            if callable(self._end_frames):
-                self._end_frames = list(self._end_frames())
-                self._has_parsed_ending = True
+        if isinstance(key, slice):
+            start, stop = key.start, key.stop
+            step = 1 if key.step is None else key.step
+            if start is not None and start < 0 and stop is None and \
+               step > 0 and -start <= len(self._get_end_frames()):
+                return self._get_end_frames()[key]
+            if step > 0 and (start or 0) >= 0 and (stop or 0) >= 0:
+                return list(itertools.islice(self, start, stop, step))
+
+            # Negative indices are relative to the count of frames.
+            start, stop, step = key.indices(self._get_exact_length())
+            if step > 0:
+                return list(itertools.islice(self, start, stop, step))
+            return list(itertools.islice(self, stop + 1, start + 1))[::step]
 
-            return self._end_frames[key]
+        if key < 0:
+            end_frames = self._get_end_frames()
+            if -key <= len(end_frames):
+                return end_frames[key]
+
+            # Beyond end frames, count of frames is required
+            key += self._get_frame_count()
+            if key < 0:
+                raise IndexError('Frame index out of range.')
+            return self._get_frame(key)
         else:
-            # Lazy evaluate
-            if callable(self._begin_frames):
-                self._begin_frames = list(self._begin_frames())
-                self._has_parsed_beginning = True
+            begin_frames = self._get_begin_frames()
+            if key < len(begin_frames):
+                return begin_frames[key]
+            return self._get_frame(key)
 
-            return self._begin_frames[key]
+    def _get_begin_frames(self):
+        """Begin frames, parsed lazily.
+        
+        :rtype: [:class:`MPEGAudioFrame`, ...]
+        
+        """
+        if callable(self._begin_frames):
+            self._begin_frames = list(self._begin_frames())
+            self._has_parsed_beginning = True
+        return self._begin_frames
+
+    def _get_end_frames(self):
+        """End frames, parsed lazily.
+        
+        :rtype: [:class:`MPEGAudioFrame`, ...]
+        
+        """
+        if callable(self._end_frames):
+            self._end_frames = list(self._end_frames())
+            self._has_parsed_ending = True
+        return self._end_frames
 
 class MPEGAudio(MPEGAudioFrameBase):
     """
@@ -559,7 +1693,9 @@ class MPEGAudio(MPEGAudioFrameBase):
     """Opens the file when needed"""
 
     def __init__(self, file, begin_start_looking=0, ending_start_looking=0,
-                 mpeg_test=True):
+                 mpeg_test=True, index_interval=None, verify_crc=False,
+                 tolerant=False, file_pool=None, cache_size=None, info=None,
+                 sampling_error=None, max_bytes=None, deadline=None):
         """
         .. todo:: If given filename, create file and close it always automatically 
             when not needed.
@@ -590,11 +1726,57 @@ class MPEGAudio(MPEGAudioFrameBase):
         :param mpeg_test: Do mpeg test first before continuing with parsing the 
             beginning. This is useful especially if there is even slight
             possibility that given file is not MPEGAudio, we can rule them out
-            fast.
+            fast. Known non-MPEG files, such as FLAC, MP4 or JPEG, are ruled
+            out by their signature first, see :func:`sniff_test`.
         :type mpeg_test: bool
         
+        :param index_interval: Interval of checkpoints in frame index used for
+            random access of :attr:`frames`, ``None`` defaults to
+            :const:`FRAME_INDEX_INTERVAL`. Smaller interval means faster random
+            access, and more memory.
+        :type index_interval: int
+        
+        :param verify_crc: Verify CRC of protected frames when iterating all
+            :attr:`frames`, results are in :attr:`crc_report`.
+        :type verify_crc: bool
+        
+        :param tolerant: Iterate :attr:`frames` over corrupted regions, by
+            searching the next frames of the stream after a corrupted frame.
+            Skipped regions are in :attr:`gaps`.
+        :type tolerant: bool
+        
+        :param file_pool: Pool of open descriptors, used when instiated using
+            path to file. :func:`close` then closes the descriptor of the pool,
+            and the file is re-opened on demand by the pool.
+        :type file_pool: :class:`utils.FilePool`
+        
+        :param cache_size: Byte budget of :attr:`block_cache`, ``None`` defaults
+            to :const:`sources.BLOCK_CACHE_SIZE`, ``0`` disables the cache.
+        :type cache_size: int
+        
+        :param info: Snapshot of the file, see :func:`get_info`. Probing is
+            skipped, and the details are set from the snapshot. See also
+            :func:`from_info`.
+        :type info: :class:`info.MPEGAudioInfo`
+        
+        :param sampling_error: Estimate VBR files without XING or VBRI header
+            by sampling windows of the file, to this relative error, instead
+            of parsing all frames. Estimate is in :attr:`estimate`. ``None``
+            parses all frames.
+        :type sampling_error: float, or None
+        
+        :param max_bytes: Budget of bytes read by parsing, during the
+            initialization and afterwards. See :attr:`budget`.
+        :type max_bytes: int, or None
+        
+        :param deadline: Budget of seconds from now for parsing, during the
+            initialization and afterwards. See :attr:`budget`.
+        :type deadline: float, or None
+        
         :raise headers.MPEGAudioHeaderException: Raised if header cannot be
             found.
+        :raise sources.BudgetException: Raised if the budget is exceeded
+            before the header is found.
         
         """
         super(MPEGAudio, self).__init__()
@@ -615,20 +1797,29 @@ class MPEGAudio(MPEGAudioFrameBase):
         if isinstance(file, (str, unicode)):
             self._filepath = file
 
-            # Open the file
+            # Open the file, or proxy of the pooled file
             try:
-                file = open(file, "rb")
+                if file_pool is not None:
+                    file = file_pool.open(file)
+                    file.read(0)
+                else:
+                    file = open(file, "rb")
             except (IOError, os.error):
                 raise MPEGAudioHeaderException(
-                    'File %s cannot be opened' % file)
+                    'File %s cannot be opened' % self._filepath)
             self._filehandle = file
 
-        # If instiated using file object
+        # If instiated using file object, or source
         else:
+            # Sources, e.g. in remote storage, are read with fewest reads.
+            if hasattr(file, 'read_at') and not hasattr(file, 'read') and \
+               not isinstance(file, sources.PrefetchSource):
+                file = sources.PrefetchSource(file)
+
             self._file = file
-            """File object.
+            """File object, or source.
             
-            :type: file object
+            :type: file object, or source
             """
 
         self.is_vbr = False
@@ -637,6 +1828,40 @@ class MPEGAudio(MPEGAudioFrameBase):
         type: bool
         """
 
+        self.budget = None
+        """Budget of bytes read and time of parsing, ``None`` is unlimited.
+        
+        When :func:`parse_all` or parsing of ending exceeds the budget, the
+        values are estimated from the frames parsed so far, marked by
+        :attr:`budget_exceeded`. Elsewhere :exc:`sources.BudgetException` is
+        raised. See also :func:`limit`.
+        
+        :type: :class:`sources.Budget`, or None
+        """
+        if max_bytes is not None or deadline is not None:
+            self.budget = sources.Budget(max_bytes, deadline)
+
+        self.budget_exceeded = False
+        """Has the budget been exceeded, leaving values estimated?
+        
+        :type: bool
+        """
+
+        # Known non-MPEG files are rejected with one small read, before the
+        # reads of probing are planned and cached.
+        if info is None and mpeg_test:
+            self.sniff_test()
+
+        self.block_cache = None
+        """Cache of blocks read by parsing, shared by all probing phases.
+        Overlapping reads of the phases are read from the file once.
+        
+        :type: :class:`sources.BlockCache`, or None
+        """
+        if cache_size != 0:
+            self.block_cache = sources.BlockCache(sources.get_source(file),
+                                                  max_bytes=cache_size)
+
         self.filesize = utils.get_filesize(file)
         """Filesize in bytes.
         
@@ -661,6 +1886,69 @@ class MPEGAudio(MPEGAudioFrameBase):
         :type: iterator for :class:`MPEGAudioFrame`
         """
 
+        self.verify_crc = verify_crc
+        """Verify CRC of protected frames when iterating all frames?
+        
+        :type: bool
+        """
+
+        self.crc_report = None
+        """CRC verification results of the last iteration of all frames, 
+        ``None`` if not verified.
+        
+        :type: :class:`crc.CRCReport`, or None
+        """
+
+        self.tolerant = tolerant
+        """Iterate frames over corrupted regions?
+        
+        :type: bool
+        """
+
+        self.gaps = []
+        """Corrupted regions skipped by tolerant iteration, in order.
+        
+        :type: list of (offset, size) tuples
+        """
+
+        self.statistics = None
+        """Statistics of frames aggregated by :func:`parse_all`, ``None`` if
+        not aggregated.
+        
+        :type: :class:`framestats.FrameStatistics`, or None
+        """
+
+        self.sampling_error = sampling_error
+        """Target relative error of sampling estimation, ``None`` parses all
+        frames of VBR files without XING or VBRI header.
+        
+        :type: float, or None
+        """
+
+        self.content_hash = None
+        """Hash of the bytes of the frames, as hexadecimal digest, computed by
+        :func:`parse_all` given the algorithm. Tags and the frame of XING or
+        VBRI header are not hashed, so files with the same audio but
+        different tags have the same hash. ``None`` if not hashed.
+        
+        :type: string, or None
+        """
+
+        self.estimate = None
+        """Sampling estimation of frame count, ``None`` if not estimated.
+        
+        :type: :class:`sampling.Estimate`, or None
+        """
+
+        self.provenance = None
+        """Where the frame count, and values derived from it, are from:
+        ``"parsed"`` from all frames, ``"calculated"`` exactly from CBR 
+        padding schedule, ``"header"`` from XING or VBRI header, or 
+        ``"estimated"``. ``None`` if not yet known.
+        
+        :type: string, or None
+        """
+
         self._frame_count = None
         self._frame_size = None
         self._size = None
@@ -670,8 +1958,16 @@ class MPEGAudio(MPEGAudioFrameBase):
         self._ending_start_looking = ending_start_looking
 
         test_frames = []
-        if mpeg_test:
-            test_frames = list(self.is_mpeg_test())
+        if info is not None:
+            # First frame is at known offset.
+            begin_start_looking = info.offset
+        else:
+            # Plan the reads of probing, when reading a source.
+            if isinstance(file, sources.PrefetchSource):
+                file.prefetch(self.get_probe_ranges(mpeg_test))
+
+            if mpeg_test:
+                test_frames = list(self.is_mpeg_test())
 
         # Parse beginning of file, when needed. In reality, this is run every 
         # time init is run. The set_mpeg_details, XING, VBRI uses the first 
@@ -682,22 +1978,191 @@ class MPEGAudio(MPEGAudioFrameBase):
         end_frames = lambda: self.parse_ending(ending_start_looking)
 
         # Creates frame iterator between begin and end frames.
-        self.frames = MPEGAudioFrameIterator(self, begin_frames, end_frames)
+        self.frames = MPEGAudioFrameIterator(self, begin_frames, end_frames,
+                                             index_interval)
 
-        # Set MPEGAudio Details
-        self.set_mpeg_details(self.frames[0], test_frames)
+        if info is not None:
+            self.set_info(info)
+        else:
+            # Set MPEGAudio Details
+            self.set_mpeg_details(self.frames[0], test_frames)
 
-        # Parse VBR Headers if can be found.
-        self.parse_xing()
-        self.parse_vbri()
+            # Parse VBR Headers if can be found.
+            self.parse_xing()
+            self.parse_vbri()
 
         # Close for now
         self.close()
 
+    @classmethod
+    def from_info(cls, info, file=None, **kwargs):
+        """Create lazy MPEGAudio from snapshot, without probing the file.
+        
+        :param info: Snapshot of the file.
+        :type info: :class:`info.MPEGAudioInfo`
+        
+        :param file: File object, or path to file. ``None`` defaults to the
+            path in snapshot.
+        :type file: file object, string, or source
+        
+        :param kwargs: Other arguments of :class:`MPEGAudio`.
+        
+        :rtype: :class:`MPEGAudio`
+        
+        :raise utils.FileIdentityException: Raised if the file has changed
+            since the snapshot, by identity of the file when opened by path
+            of the snapshot, or by file size.
+        :raise MPEGAudioHeaderException: Raised if the file cannot be opened.
+        
+        """
+        file = file or info.path
+
+        if info.identity is not None and isinstance(file, (str, unicode)) and \
+           file == info.path:
+            try:
+                identity = utils.get_identity(os.stat(file))
+            except os.error:
+                raise MPEGAudioHeaderException(
+                    'File %s cannot be opened' % file)
+            if identity != info.identity:
+                raise utils.FileIdentityException(
+                    'File %s has changed since snapshot' % file)
+
+        mpeg = cls(file, begin_start_looking=info.begin_start_looking,
+                   ending_start_looking=info.ending_start_looking, info=info,
+                   **kwargs)
+        if mpeg.filesize != info.filesize:
+            mpeg.close()
+            raise utils.FileIdentityException(
+                'File size %d differs from snapshot' % mpeg.filesize)
+        return mpeg
+
+    def get_info(self):
+        """Get immutable snapshot of the details.
+        
+        .. note:: Values not yet known are computed, which may start parsing
+            of all frames, only if the file is VBR without XING or VBRI header.
+        
+        :rtype: :class:`info.MPEGAudioInfo`
+        
+        """
+        from info import MPEGAudioInfo
+
+        duration = self.duration
+        sample_count = self.sample_count
+        header = headers.get_bytes(0, self._source.read_at(self.offset, 4))
+
+        vbr_header = None
+        vbr_data = None
+        if self.xing is not None:
+            vbr_header = 'xing'
+            vbr_data = self.xing.data
+        elif self.vbri is not None:
+            vbr_header = 'vbri'
+            vbr_data = self.vbri.data
+
+        identity = None
+        if self._filepath is not None:
+            identity = utils.get_identity(os.stat(self._filepath))
+
+        return MPEGAudioInfo(path=self._filepath, filesize=self.filesize,
+                    offset=self.offset, header=header, version=self.version,
+                    layer=self.layer, sample_rate=self.sample_rate,
+                    samples_per_frame=self.samples_per_frame,
+                    channel_mode=self.channel_mode, is_vbr=self.is_vbr,
+                    vbr_header=vbr_header, bitrate=self.bitrate,
+                    frame_size=self.frame_size, frame_count=self.frame_count,
+                    size=self.size, sample_count=sample_count,
+                    duration=None if duration is None else \
+                             duration.total_seconds(),
+                    provenance=self.provenance,
+                    begin_start_looking=self._begin_start_looking,
+                    ending_start_looking=self._ending_start_looking,
+                    identity=identity, vbr_data=vbr_data)
+
+    def set_info(self, info):
+        """Sets details of *this* MPEGAudio from snapshot.
+        
+        :param info: Snapshot of the file.
+        :type info: :class:`info.MPEGAudioInfo`
+        
+        """
+        first_mpegframe = MPEGAudioFrame.parse(info.header)
+        first_mpegframe.offset = info.offset
+        self.set_mpeg_details(first_mpegframe, [first_mpegframe])
+
+        # VBR headers are parsed again from the data of snapshot, values
+        # derived from them are set from the snapshot below.
+        from xing import XING, XINGHeaderException
+        from vbri import VBRI, VBRIHeaderException
+        try:
+            if info.vbr_header == 'xing':
+                self.xing = XING.parse(info.vbr_data or '', info.offset)
+            elif info.vbr_header == 'vbri':
+                self.vbri = VBRI.parse(info.vbr_data or '', info.offset)
+        except (XINGHeaderException, VBRIHeaderException):
+            pass
+
+        self.is_vbr = info.is_vbr
+        self.bitrate = info.bitrate
+        self.frame_size = info.frame_size
+        self.frame_count = info.frame_count
+        self.size = info.size
+        if info.duration is not None:
+            self.duration = timedelta(seconds=info.duration)
+        self.provenance = info.provenance
+
+    @contextlib.contextmanager
+    def limit(self, max_bytes=None, deadline=None):
+        """Context of a budget replacing :attr:`budget`, e.g. for getting one
+        property::
+        
+            with mpeg.limit(max_bytes=1048576, deadline=0.5):
+                duration = mpeg.duration
+        
+        :param max_bytes: Maximum of bytes read, ``None`` is unlimited.
+        :type max_bytes: int, or None
+        
+        :param deadline: Seconds from now, ``None`` is unlimited.
+        :type deadline: float, or None
+        
+        """
+        previous_budget = self.budget
+        self.budget = sources.Budget(max_bytes, deadline)
+        try:
+            yield self.budget
+        finally:
+            self.budget = previous_budget
+
     def close(self):
         if self._filehandle:
             self._filehandle.close()
 
+    def _get_source(self, cached=True):
+        """Source reading the file.
+        
+        :param cached: Read through :attr:`block_cache`, if any.
+        :type cached: bool
+        
+        :rtype: source, see :mod:`mpeg1audio.sources`
+        
+        """
+        source = sources.get_source(self._file)
+        if self.budget is not None:
+            source = sources.BudgetSource(source, self.budget)
+        if not cached or self.block_cache is None:
+            return source
+
+        # File may have been re-opened since.
+        self.block_cache.source = source
+        return self.block_cache
+
+    _source = property(_get_source)
+    """Source reading the file, parsing reads only through this.
+    
+    :type: source, see :mod:`mpeg1audio.sources`
+    """
+
     def _get_size(self, parse_all=False, parse_ending=True):
         """MPEGAudio Size getter.
         
@@ -710,9 +2175,14 @@ class MPEGAudio(MPEGAudioFrameBase):
         if parse_ending:
             # 100% accurate size, if parsing ending did indeed return frame from
             # same MPEGAudio:
-            self.size = self.frames[-1].offset + self.frames[-1].size - \
-                        self.frames[0].offset
-        else:
+            try:
+                self.size = self.frames[-1].offset + self.frames[-1].size - \
+                            self.frames[0].offset
+            except sources.BudgetException:
+                self.budget_exceeded = True
+                parse_ending = False
+
+        if not parse_ending:
             # TODO: NORMAL: Estimation of size Following might be a good enough
             # for 99% of time, maybe it should be default? A biggest risk is
             # that files with a *huge* footer will yield totally inaccurate
@@ -734,18 +2204,42 @@ class MPEGAudio(MPEGAudioFrameBase):
         """MPEGAudio Size setter."""
         self._size = value
 
-    def _get_sample_count(self, parse_all=False, parse_ending=True):
+    def _get_sample_count(self, parse_all=False, parse_ending=True,
+                          gapless=True):
         """Sample count getter.
         
+        If XING header has :class:`LAME` extension, the count is exact count
+        of samples in the original audio, without parsing.
+        
+        :param gapless: Remove encoder delay and padding given in LAME
+            extension, otherwise count of samples in all frames is returned.
+        :type gapless: bool
+        
         :rtype: int, or None
         
         """
+        lame = self._get_gapless_lame()
+        if gapless and lame is not None:
+            return max(self.xing.frame_count * self.samples_per_frame - \
+                       lame.encoder_delay - lame.encoder_padding, 0)
+
         frame_count = self._get_frame_count(parse_all=parse_all,
                                             parse_ending=parse_ending)
         if frame_count is not None:
             return self.frame_count * self.samples_per_frame
         return None
 
+    def _get_gapless_lame(self):
+        """Get LAME extension giving the exact count of samples.
+        
+        :rtype: :class:`LAME`, or None
+        
+        """
+        if self.xing is not None and self.xing.lame is not None and \
+           self.xing.frame_count is not None:
+            return self.xing.lame
+        return None
+
     def _get_bitrate(self, parse_all=True):
         """Bitrate getter.
         
@@ -756,7 +2250,7 @@ class MPEGAudio(MPEGAudioFrameBase):
             return self._bitrate
 
         if self.is_vbr:
-            sample_count = self._get_sample_count(parse_all)
+            sample_count = self._get_sample_count(parse_all, gapless=False)
             mpeg_size = self._get_size()
             self.bitrate = headers.get_vbr_bitrate(mpeg_size, sample_count,
                                             self.sample_rate)
@@ -777,7 +2271,14 @@ class MPEGAudio(MPEGAudioFrameBase):
             return self._frame_count
 
         if not self.is_vbr:
-            # CBR
+            # CBR, exact from the padding schedule
+            self._frame_count = self._get_cbr_frame_count()
+            if self._frame_count is not None:
+                self.provenance = 'calculated'
+                return self._frame_count
+
+            self.provenance = 'estimated'
+
             mpeg_size = self._get_size(parse_all=parse_all,
                                        parse_ending=parse_ending)
             first_frame = self.frames[0]
@@ -799,6 +2300,14 @@ class MPEGAudio(MPEGAudioFrameBase):
             # Average it aint:
             #self._frame_count = int(round((unpadded_frames + padded_frames) / \
             #                    float(2)))
+        elif self.sampling_error is not None:
+            # VBR, estimated by sampling
+            from sampling import estimate
+            self.estimate = estimate(self, target_error=self.sampling_error)
+            self._frame_count = self.estimate.frame_count
+            self.provenance = 'estimated'
+            if self.estimate.is_exact:
+                self.provenance = 'parsed'
         else:
             # VBR
             self.frames.parse_all()
@@ -809,6 +2318,78 @@ class MPEGAudio(MPEGAudioFrameBase):
         """Frame count setter."""
         self._frame_count = value
 
+    def _get_cbr_frame_count(self):
+        """Exact frame count of CBR, from the padding schedule.
+        
+        Padding slots of CBR are spread so that the average frame size matches
+        the bitrate, thus the size of *n* frames is within a slot or two of *n*
+        times the average. The count is calculated from the size between the
+        first frame and the end of audio before tags, and validated by parsing
+        the last frame, which must end at the end of audio. 
+        
+        On success, the size is set. End frames are left to be parsed on
+        demand, the validated last frame alone would not serve negative
+        indexes beyond it.
+        
+        :return: Frame count, ``None`` if the file does not follow the padding
+            schedule.
+        :rtype: int, or None
+        
+        """
+        first_frame = self.frames[0]
+        if first_frame.size is None:
+            return None
+
+        source = self._source
+        end = self.filesize - self._ending_start_looking
+        tail_offset = max(end - CBR_TAIL_SIZE, 0)
+        tail = source.read_at(tail_offset, end - tail_offset)
+        end -= utils.get_footer_size(tail)
+
+        slot_size = headers.SLOTS[first_frame.layer]
+        unpadded_frame_size = first_frame.size - first_frame._padding_size * \
+                                                 slot_size
+        average_frame_size = \
+            headers.get_average_frame_size(first_frame.bitrate,
+                                           first_frame.samples_per_frame,
+                                           first_frame.sample_rate)
+
+        mpeg_size = end - first_frame.offset
+        frame_count = int(round(mpeg_size / average_frame_size))
+        padding_slots, remainder = divmod(mpeg_size - frame_count * \
+                                          unpadded_frame_size, slot_size)
+        expected_padding_slots = frame_count * \
+            (average_frame_size - unpadded_frame_size) / slot_size
+        # Frame holding XING header may be unpadded, and the schedule may 
+        # start at any phase.
+        if frame_count < 1 or remainder or \
+           abs(padding_slots - expected_padding_slots) > 2:
+            return None
+
+        # Last frame must end at the end of audio
+        for size in (unpadded_frame_size, unpadded_frame_size + slot_size):
+            offset = end - size
+            if tail_offset <= offset and offset + 4 <= tail_offset + len(tail):
+                position = offset - tail_offset
+                header_bytes = tail[position:position + 4]
+            else:
+                header_bytes = source.read_at(offset, 4)
+            try:
+                last_frame = MPEGAudioFrame.parse(headers.get_bytes(0,
+                                                                header_bytes))
+            except MPEGAudioHeaderException:
+                continue
+            if last_frame.size == size and \
+               last_frame.bitrate == first_frame.bitrate and \
+               last_frame.is_same_stream(first_frame):
+                last_frame.offset = offset
+                break
+        else:
+            return None
+
+        self._size = mpeg_size
+        return frame_count
+
     def _get_frame_size(self, parse_all=True):
         """Frame size getter.
         
@@ -842,6 +2423,9 @@ class MPEGAudio(MPEGAudioFrameBase):
         if self._duration is not None:
             return self._duration
 
+        # Gapless sample count is exact, so is the duration.
+        exact = self._get_gapless_lame() is not None
+
         if not self.is_vbr:
             # CBR
             sample_count = self._get_sample_count(parse_all=False,
@@ -849,7 +2433,7 @@ class MPEGAudio(MPEGAudioFrameBase):
             if sample_count is not None:
                 self.duration = \
                     headers.get_duration_from_sample_count(sample_count,
-                                                    self.sample_rate)
+                                                    self.sample_rate, exact)
 #            mpeg_size = self._get_size()
 #            bitrate = self._get_bitrate(parse_all)
 #            if (bitrate is not None) and (mpeg_size is not None):
@@ -862,7 +2446,7 @@ class MPEGAudio(MPEGAudioFrameBase):
             if sample_count is not None:
                 self.duration = \
                     headers.get_duration_from_sample_count(sample_count,
-                                                    self.sample_rate)
+                                                    self.sample_rate, exact)
 
         return self._duration
 
@@ -884,6 +2468,9 @@ class MPEGAudio(MPEGAudioFrameBase):
     sample_count = property(_get_sample_count)
     """Count of samples in MPEGAudio.
     
+    If XING header has :class:`LAME` extension, encoder delay and padding are
+    removed, thus the count is exact.
+    
     .. note:: May start parsing of all frames. 
     
     :type: int
@@ -933,7 +2520,7 @@ class MPEGAudio(MPEGAudioFrameBase):
         """
         from xing import XING, XINGHeaderException
         try:
-            self.xing = XING.find_and_parse(self._file, self.frames[0].offset)
+            self.xing = XING.find_and_parse(self._source, self.offset)
         except XINGHeaderException:
             pass
         else:
@@ -947,13 +2534,151 @@ class MPEGAudio(MPEGAudioFrameBase):
         """
         from vbri import VBRI, VBRIHeaderException
         try:
-            self.vbri = VBRI.find_and_parse(self._file, self.frames[0].offset)
+            self.vbri = VBRI.find_and_parse(self._source, self.offset)
         except VBRIHeaderException:
             pass
         else:
             VBRHeader.set_mpeg(self, self.vbri)
 
 
+    def get_time_offset(self, time):
+        """Get frame aligned offset of given time.
+        
+        Frame is looked up from the frame index if it covers the time, for CBR
+        the offset is calculated, for VBR the XING table of contents is used if
+        available. Calculated offsets are synchronized to the following frame.
+        Otherwise frames are walked from the nearest checkpoint of the index.
+        
+        .. note:: 
+        
+            Offsets from XING table of contents are approximate, so is the
+            returned frame number with them.
+        
+        :param time: Time from the beginning, in seconds.
+        :type time: number, or datetime.timedelta
+        
+        :return: Number of the frame, and the offset of the frame in file. If 
+            the time is beyond last frame, offset is end of the last frame.
+        :rtype: tuple of (int, int)
+        
+        """
+        if isinstance(time, timedelta):
+            time = time.days * 86400 + time.seconds + \
+                   time.microseconds / 1000000.0
+
+        number = int(time * self.sample_rate / self.samples_per_frame)
+        number = max(number, 0)
+
+        # Frame holding the VBR header is not audio.
+        if self.xing is not None or self.vbri is not None:
+            number += 1
+
+        index = self.frames._index
+        last_frame = self.frames[-1]
+        end_offset = last_frame.offset + last_frame.size
+
+        if index.frame_count is None and \
+           number >= len(index.offsets) * index.interval:
+            estimate = None
+            if not self.is_vbr:
+                estimate = int(number * headers.get_average_frame_size(\
+                                self.frames[0].bitrate, self.samples_per_frame,
+                                self.sample_rate))
+            elif self.xing is not None and self.xing.toc is not None:
+                samples = number * self.samples_per_frame
+                percent = 100.0 * samples / self.sample_count
+                estimate = self.xing.get_toc_offset(percent, self.size)
+
+            if estimate is not None:
+                # Padding can shift the calculated offset by a few bytes.
+                estimate = max(self.offset + estimate - 8, self.offset)
+                if estimate >= end_offset:
+                    return number, end_offset
+
+                for frame in MPEGAudioFrame.find_and_parse(file=self._source,
+                                            max_frames=1,
+                                            begin_frame_search=estimate,
+                                            lazily_after=2):
+                    return number, frame.offset
+                return number, end_offset
+
+        try:
+            return number, self.frames[number].offset
+        except IndexError:
+            return index.frame_count, end_offset
+
+    def extract(self, start_time, end_time, dest, xing=True):
+        """Extract frame aligned part of MPEGAudio to file.
+        
+        Frames are copied without decoding, and by the kernel when possible, 
+        see :func:`utils.copy_range`.
+        
+        :param start_time: Start time, in seconds.
+        :type start_time: number, or datetime.timedelta
+        
+        :param end_time: End time, in seconds. ``None`` means end of 
+            MPEGAudio.
+        :type end_time: number, datetime.timedelta, or None
+        
+        :param dest: Destination file opened for writing, or path of file.
+        :type dest: file object, or string
+        
+        :param xing: Prepend frame having XING header describing the extracted
+            frames, only if MPEGAudio is Layer III.
+        :type xing: bool
+        
+        :return: Count of bytes written.
+        :rtype: int
+        
+        """
+        from xing import XING, XINGHeaderException
+
+        start_offset = self.get_time_offset(start_time)[1]
+        last_frame = self.frames[-1]
+        end_offset = last_frame.offset + last_frame.size
+        if end_time is not None:
+            end_offset = self.get_time_offset(end_time)[1]
+
+        length = max(end_offset - start_offset, 0)
+
+        xing_frame = ""
+        if xing and length:
+            # Frames copied are counted from their headers, frame count is
+            # left out if they are not consecutive up to the end.
+            max_chunks = (length + PARSE_ALL_CHUNK_SIZE - 1) // \
+                         PARSE_ALL_CHUNK_SIZE
+            chunks = utils.chunked_reader(self._source,
+                                          chunk_size=PARSE_ALL_CHUNK_SIZE,
+                                          start_position=start_offset,
+                                          max_chunks=max_chunks)
+            chunks = ((chunk_offset, chunk[:end_offset - chunk_offset]) \
+                      for chunk_offset, chunk in chunks)
+            frame_count, bitrate_sum, walked_offset = \
+                MPEGAudioFrame.count_consecutive(start_offset, chunks)
+            if walked_offset != end_offset:
+                frame_count = None
+
+            header_bytes = headers.get_bytes(0,
+                             self._source.read_at(start_offset, 4))
+            try:
+                xing_frame = XING.create_frame(header_bytes, frame_count,
+                                               length, self.is_vbr)
+            except XINGHeaderException:
+                pass
+
+        file = dest
+        if isinstance(dest, (str, unicode)):
+            file = open(dest, 'wb')
+        try:
+            file.write(xing_frame)
+            written = len(xing_frame)
+            written += utils.copy_range(self._source, file, start_offset,
+                                        length)
+        finally:
+            if file is not dest:
+                file.close()
+        return written
+
     def is_mpeg_test(self, test_position=None):
         """Test that the file is MPEGAudio.
         
@@ -981,13 +2706,10 @@ class MPEGAudio(MPEGAudioFrameBase):
         # If test position is not given explicitely it is assumed to be at the
         # middle of "start" and "end" of looking.
         if test_position is None:
-            looking_length = self.filesize - self._ending_start_looking - \
-                             self._begin_start_looking
-            test_position = self._begin_start_looking + \
-                            int(0.5 * looking_length)
+            test_position = self._get_test_position()
 
         try:
-            return utils.genmin(MPEGAudioFrame.find_and_parse(file=self._file,
+            return utils.genmin(MPEGAudioFrame.find_and_parse(file=self._source,
                                             max_frames=3,
                                             chunk_size=16384,
                                             begin_frame_search=test_position,
@@ -998,6 +2720,67 @@ class MPEGAudio(MPEGAudioFrameBase):
             raise MPEGAudioHeaderException("MPEG Test is not passed, "
                                            "file might not be MPEG?")
 
+    def sniff_test(self):
+        """Test that the file is not a known non-MPEG file, from the signature
+        at the beginning of file.
+        
+        This is a single small read of the file, not cached, done before
+        the reads of probing and :func:`is_mpeg_test` which searches for the
+        frames.
+        
+        :raise headers.MPEGAudioHeaderException: Raised if the file is known
+            non-MPEG file, such as FLAC or JPEG.
+        
+        """
+        container = headers.get_container(
+            self._get_source(cached=False).read_at(0, headers.SNIFF_SIZE))
+        if container is not None:
+            raise MPEGAudioHeaderException("MPEG Test is not passed, "
+                                           "file is %s." % container)
+
+    def _get_test_position(self):
+        """Position of MPEG test, middle of "start" and "end" of looking.
+        
+        :rtype: int
+        
+        """
+        looking_length = self.filesize - self._ending_start_looking - \
+                         self._begin_start_looking
+        return self._begin_start_looking + int(0.5 * looking_length)
+
+    def get_probe_ranges(self, mpeg_test=True):
+        """Ranges of file read by probing, in initialization and getters.
+        
+        Ranges cover the beginning with XING and VBRI headers, the MPEG test
+        at the middle, and the ending of file. Signature at the beginning of
+        file is read before, see :func:`sniff_test`.
+        
+        :param mpeg_test: Include the range of MPEG test.
+        :type mpeg_test: bool
+        
+        :return: Ranges as tuples of begin and end offsets.
+        :rtype: list of (int, int)
+        
+        """
+        begin = self._begin_start_looking
+        end = self.filesize - self._ending_start_looking
+        ranges = [
+            # Search chunk, and consecutive chunk from a header within it.
+            (begin, begin + 2 * utils.DEFAULT_CHUNK_SIZE),
+            # Ending is searched from one rewind before the end, to the end.
+            (end - 4000, self.filesize),
+        ]
+        if mpeg_test:
+            test_position = self._get_test_position()
+            ranges.append((test_position, test_position + 2 * 16384))
+
+        # Block cache reads whole blocks.
+        if self.block_cache is not None:
+            block_size = self.block_cache.block_size
+            ranges = [(begin - begin % block_size,
+                       end + -end % block_size) for begin, end in ranges]
+        return ranges
+
     def set_mpeg_details(self, first_mpegframe, mpegframes):
         """Sets details of *this* MPEGAudio from the given frames.
         
@@ -1019,6 +2802,8 @@ class MPEGAudio(MPEGAudioFrameBase):
         self.is_private = first_mpegframe.is_private
         self.is_protected = first_mpegframe.is_protected
         self.offset = first_mpegframe.offset
+        self.version = first_mpegframe.version
+        self.layer = first_mpegframe.layer
         self.channel_mode = first_mpegframe.channel_mode
         self.channel_mode_extension = first_mpegframe.channel_mode_extension
         self.emphasis = first_mpegframe.emphasis
@@ -1029,7 +2814,13 @@ class MPEGAudio(MPEGAudioFrameBase):
 
         # If no testing frames was given, resort to getting last three frames.
         if len(mpegframes) == 0:
-            mpegframes = self.frames[-3:]
+            try:
+                mpegframes = self.frames[-3:]
+            except sources.BudgetException:
+                # Ending is out of budget, VBR is then seen from the
+                # beginning frames only.
+                self.budget_exceeded = True
+                mpegframes = self.frames[:3]
 
         # If any of the bitrates differ, this is most likely VBR. 
         self.is_vbr = any(mpegframe.bitrate != first_mpegframe.bitrate \
@@ -1040,7 +2831,9 @@ class MPEGAudio(MPEGAudioFrameBase):
             self.frame_size = None
             self.frame_count = None
 
-    def parse_all(self, force=False):
+    def parse_all(self, force=False, verify_crc=None, tolerant=None,
+                  statistics=None, max_bytes=None, deadline=None,
+                  hash_algorithm=None):
         """Parse all frames.
 
         You should not need to call this, the initialization of
@@ -1055,15 +2848,59 @@ class MPEGAudio(MPEGAudioFrameBase):
         Essentially all properties, and variables of MPEGAudio should be as
         accurate as possible after running this.
             
-        :param force: Force re-parsing all frames. Defaults to ``False``.
+        :param force: Force re-parsing all frames. Defaults to ``False``,
+            when frames are parsed again only if statistics, CRC verification,
+            tolerance, or content hash of another algorithm is asked.
         :type force: bool
         
+        :param verify_crc: Set :attr:`verify_crc`, when verifying CRC of
+            protected frames, results are in :attr:`crc_report`. ``None`` keeps
+            the current value.
+        :type verify_crc: bool, or None
+        
+        :param tolerant: Set :attr:`tolerant`, when tolerant the frames are
+            counted over corrupted regions, which are recorded in :attr:`gaps`.
+            ``None`` keeps the current value.
+        :type tolerant: bool, or None
+        
+        :param statistics: Aggregate statistics of frames in the same pass, 
+            to :attr:`statistics`. ``True`` computes all aggregates, or give
+            names of aggregates, see :const:`framestats.AGGREGATES`, or a
+            :class:`framestats.FrameStatistics` to be added to.
+        :type statistics: bool, iterable of string, or 
+            :class:`framestats.FrameStatistics`
+        
+        :param max_bytes: Budget of bytes read, replacing :attr:`budget`
+            during parsing. When exceeded, values are estimated from the
+            frames parsed so far, see :attr:`budget_exceeded`.
+        :type max_bytes: int, or None
+        
+        :param deadline: Budget of seconds from now, replacing :attr:`budget`
+            during parsing.
+        :type deadline: float, or None
+        
+        :param hash_algorithm: Hash bytes of the frames in the same pass, to
+            :attr:`content_hash`. Name of algorithm of :func:`hashlib.new`,
+            e.g. ``"sha1"``.
+        :type hash_algorithm: string, or None
+        
+        :raise ValueError: Raised if the hash algorithm is not available.
+        
         """
         # Semantically, I think, only frames should have parse_all() only, thus
         # this MPEGAudio.parse_all() exists purely because user of this API
         # should not need to guess the "extra" semantics of frames and
         # MPEGAudio.
-        self.frames.parse_all(force=force)
+        if max_bytes is None and deadline is None:
+            self.frames.parse_all(force=force, verify_crc=verify_crc,
+                                  tolerant=tolerant, statistics=statistics,
+                                  hash_algorithm=hash_algorithm)
+            return
+
+        with self.limit(max_bytes, deadline):
+            self.frames.parse_all(force=force, verify_crc=verify_crc,
+                                  tolerant=tolerant, statistics=statistics,
+                                  hash_algorithm=hash_algorithm)
 
     def parse_beginning(self, begin_offset=0, max_frames=6):
         """Parse beginning of MPEGAudio.
@@ -1086,7 +2923,7 @@ class MPEGAudio(MPEGAudioFrameBase):
         """
         try:
             return utils.genmin(\
-                     MPEGAudioFrame.find_and_parse(file=self._file,
+                     MPEGAudioFrame.find_and_parse(file=self._source,
                                               max_frames=max_frames,
                                               begin_frame_search=begin_offset),
                      1)
@@ -1140,9 +2977,9 @@ class MPEGAudio(MPEGAudioFrameBase):
                 # Retry from backwards...
                 end_frames = \
                     list(MPEGAudioFrame.find_and_parse(\
-                            file=self._file,
+                            file=self._source,
                             max_frames=None,
-                            begin_frame_search=begin_frame_search))
+                            begin_frame_search=max(begin_frame_search, 0)))
                 if begin_frame_search < 0 and len(end_frames) < min_frames:
                     raise MPEGAudioHeaderException(
                                         'Not enough frames was found')
@@ -1165,6 +3002,7 @@ class VBRHeader(object):
         """
         if vbr.frame_count is not None:
             mpeg.frame_count = vbr.frame_count
+            mpeg.provenance = 'header'
 
         if vbr.mpeg_size is not None:
             mpeg.size = vbr.mpeg_size
@@ -1195,3 +3033,9 @@ class VBRHeader(object):
         
         :type: int, or None 
         """
+
+        self.data = ''
+        """Data of the first frame, from its beginning up to the end of the
+        header, enough to parse the header again without reading the file.
+        
+        :type: string"""
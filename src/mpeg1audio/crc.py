@@ -0,0 +1,172 @@
+"""
+MPEG Frame CRC-16 verification module.
+
+Protected frames have CRC-16 right after the header. It is calculated over
+the last two bytes of the header, and the protected bits following the CRC:
+the side information in Layer III, and the bit allocation in Layer I.
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio import headers
+from mpeg1audio.headers import MPEGAudioHeaderException
+import struct
+
+CRC16_POLYNOMIAL = 0x8005
+"""CRC-16 polynomial of MPEG Audio.
+
+:type: int"""
+
+MAX_PROTECTED_SIZE = 38
+"""Maximum size of protected region of frame, header, CRC and Layer I stereo
+bit allocation.
+
+:type: int"""
+
+def _get_crc16_table(polynomial):
+    """Get CRC-16 lookup table.
+
+    :param polynomial: CRC-16 polynomial.
+    :type polynomial: int
+
+    :rtype: tuple of int
+
+    """
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for bit in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ polynomial) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return tuple(table)
+
+CRC16_TABLE = _get_crc16_table(CRC16_POLYNOMIAL)
+"""CRC-16 lookup table.
+
+:type: tuple of int"""
+
+def crc16(data, crc=0xFFFF):
+    """Calculate CRC-16 of data.
+
+        >>> hex(crc16('123456789'))
+        '0xaee7'
+
+    :param data: Data to be calculated.
+    :type data: string
+
+    :param crc: Initial value, or CRC of preceding data.
+    :type crc: int
+
+    :rtype: int
+
+    """
+    table = CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ ord(byte)]
+    return crc
+
+def get_protected_size(frame):
+    """Get size of protected bits following the CRC.
+
+    :param frame: Protected MPEG frame.
+    :type frame: :class:`mpeg1audio.MPEGAudioFrame`
+
+    :return: Size in bytes.
+    :rtype: int
+
+    :raise mpeg1audio.MPEGAudioHeaderException: Raised if the size cannot be
+        determined. Layer II bit allocation depends on allocation tables, and
+        is not supported.
+
+    """
+    if frame.layer == '3':
+        return headers.get_side_info_size(frame.version, frame.layer,
+                                          frame.channel_mode)
+    elif frame.layer == '1':
+        if frame.channel_mode == 'mono':
+            return 16
+        elif frame.channel_mode == 'joint stereo':
+            bound = int(frame.channel_mode_extension.split('-')[0])
+            return (32 + bound) / 2
+        return 32
+    raise MPEGAudioHeaderException('Protected size cannot be determined.')
+
+class CRCReport(object):
+    """CRC verification results of frames."""
+
+    def __init__(self):
+        self.checked = 0
+        """Count of frames verified.
+
+        :type: int"""
+
+        self.unchecked = 0
+        """Count of protected frames which could not be verified.
+
+        :type: int"""
+
+        self.errors = 0
+        """Count of frames having invalid CRC, or truncated protected bits.
+
+        :type: int"""
+
+        self.error_offsets = []
+        """Offsets of frames having errors.
+
+        :type: list of int"""
+
+    def verify(self, frames, chunk, chunk_offset, final=False):
+        """Verify batch of frames in chunk.
+
+        :param frames: Frames within the chunk, in order.
+        :type frames: list of :class:`mpeg1audio.MPEGAudioFrame`
+
+        :param chunk: Chunk of data.
+        :type chunk: string
+
+        :param chunk_offset: Offset of chunk in file.
+        :type chunk_offset: int
+
+        :param final: There are no more chunks, frames which protected bits
+            are not within the chunk are errors.
+        :type final: bool
+
+        :return: Verified frames, and frames whose protected bits are not
+            within the chunk yet.
+        :rtype: tuple of (list, list)
+
+        """
+        chunk_length = len(chunk)
+        for index, frame in enumerate(frames):
+            if not frame.is_protected:
+                continue
+
+            try:
+                protected_size = get_protected_size(frame)
+            except MPEGAudioHeaderException:
+                self.unchecked += 1
+                continue
+
+            begin = frame.offset - chunk_offset
+            end = begin + 6 + protected_size
+            if end > chunk_length and not final:
+                return frames[:index], frames[index:]
+
+            self.checked += 1
+            data = chunk[begin:end]
+            if len(data) != end - begin or struct.unpack('>H', data[4:6])[0] \
+                    != crc16(data[6:], crc16(data[2:4])):
+                self.errors += 1
+                self.error_offsets.append(frame.offset)
+
+        return frames, []
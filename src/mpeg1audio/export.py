@@ -0,0 +1,353 @@
+"""
+Columnar export of scanned MPEGAudio files, as CSV, Arrow or Parquet.
+
+Writers buffer values per column, and write them in record batches of fixed
+count of rows, so memory is bounded however many files are scanned. Columns
+are the fields of :class:`mpeg1audio.info.MPEGAudioInfo`, fields of XING or
+VBRI header, frame statistics when aggregated, and content hash when hashed,
+see :const:`COLUMNS`. Arrow and Parquet require :mod:`pyarrow`.
+
+Usage example, streaming results while scanning::
+
+    from mpeg1audio.scanner import Catalog
+    from mpeg1audio.export import CSVWriter
+    writer = CSVWriter(open('catalog.csv', 'wb'))
+    Catalog(statistics=['bitrate', 'padding']).scan('music/', writer)
+    writer.close()
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio.info import INFO_FIELDS
+from mpeg1audio.vbri import VBRI, VBRIHeaderException
+from mpeg1audio.xing import XING, XINGHeaderException
+import abc
+import csv
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+EXPORT_BATCH_SIZE = 8192
+"""Count of rows in record batches.
+
+:type: int"""
+
+_INFO_COLUMN_TYPES = {
+    'version': 'string', 'layer': 'string', 'channel_mode': 'string',
+    'vbr_header': 'string', 'provenance': 'string', 'is_vbr': 'bool',
+    'bitrate': 'float', 'duration': 'float',
+}
+"""Types of info columns which are not ints."""
+
+_INFO_COLUMN_FIELDS = INFO_FIELDS[1:INFO_FIELDS.index('identity')]
+"""Fields of info exported as columns, path and modification time have
+columns of their own, and VBR header data is not exported.
+
+:type: tuple of string"""
+
+VBR_HEADER_COLUMNS = (
+    ('vbr_quality', 'int'), ('has_toc', 'bool'), ('encoder_delay', 'int'),
+    ('encoder_padding', 'int'), ('vbri_version', 'int'), ('vbri_delay', 'int'),
+)
+"""Columns of XING header and its :class:`mpeg1audio.lame.LAME` extension, or
+of VBRI header, see :attr:`mpeg1audio.info.MPEGAudioInfo.vbr_data`.
+
+:type: tuple of (string, string)"""
+
+STATISTICS_COLUMNS = (
+    ('min_bitrate', 'int'), ('max_bitrate', 'int'),
+    ('channel_mode_changes', 'int'), ('emphasis', 'string'),
+    ('padded_count', 'int'), ('padding_ratio', 'float'),
+    ('first_offset', 'int'), ('last_offset', 'int'), ('audio_size', 'int'),
+)
+"""Columns of frame statistics, see
+:class:`mpeg1audio.framestats.FrameStatistics`.
+
+:type: tuple of (string, string)"""
+
+COLUMNS = (('path', 'string'), ('mtime', 'float'), ('error', 'string')) + \
+          tuple((field, _INFO_COLUMN_TYPES.get(field, 'int')) \
+                for field in _INFO_COLUMN_FIELDS) + VBR_HEADER_COLUMNS + \
+          STATISTICS_COLUMNS + (('content_hash', 'string'),)
+"""Columns of export, as tuples of name and type. Type is ``"string"``,
+``"int"``, ``"float"`` or ``"bool"``, values missing are ``None``.
+
+:type: tuple of (string, string)"""
+
+_NO_INFO = (None,) * len(_INFO_COLUMN_FIELDS)
+"""Values of info columns of files not parsed."""
+
+_NO_VBR_HEADER = (None,) * len(VBR_HEADER_COLUMNS)
+"""Values of VBR header columns of files without VBR header."""
+
+_NO_STATISTICS = (None,) * len(STATISTICS_COLUMNS)
+"""Values of statistics columns of files without statistics."""
+
+def get_vbr_header_values(info):
+    """Get values of VBR header columns, parsed from the data of snapshot.
+
+    :param info: Snapshot of the file, or ``None``.
+    :type info: :class:`mpeg1audio.info.MPEGAudioInfo`
+
+    :return: Values in order of :const:`VBR_HEADER_COLUMNS`.
+    :rtype: tuple
+
+    """
+    if info is None or info.vbr_data is None:
+        return _NO_VBR_HEADER
+
+    quality = has_toc = encoder_delay = encoder_padding = None
+    vbri_version = vbri_delay = None
+    try:
+        if info.vbr_header == 'xing':
+            xing = XING.parse(info.vbr_data, info.offset)
+            quality = xing.quality
+            has_toc = xing.toc is not None
+            if xing.lame is not None:
+                encoder_delay = xing.lame.encoder_delay
+                encoder_padding = xing.lame.encoder_padding
+        elif info.vbr_header == 'vbri':
+            vbri = VBRI.parse(info.vbr_data, info.offset)
+            quality = vbri.quality
+            vbri_version = vbri.version
+            vbri_delay = vbri.delay
+    except (XINGHeaderException, VBRIHeaderException):
+        return _NO_VBR_HEADER
+
+    return (quality, has_toc, encoder_delay, encoder_padding, vbri_version,
+            vbri_delay)
+
+def get_statistics_values(statistics):
+    """Get values of statistics columns.
+
+    :param statistics: Statistics of frames, or ``None``.
+    :type statistics: :class:`mpeg1audio.framestats.FrameStatistics`
+
+    :return: Values in order of :const:`STATISTICS_COLUMNS`.
+    :rtype: tuple
+
+    """
+    if statistics is None:
+        return _NO_STATISTICS
+
+    aggregates = statistics.aggregates
+    channel_mode_changes = emphasis = padded_count = audio_size = None
+    if 'channel_mode' in aggregates:
+        channel_mode_changes = max(len(statistics.channel_modes) - 1, 0)
+    if 'emphasis' in aggregates and statistics.emphases:
+        emphasis = statistics.emphases[0][1]
+    if 'padding' in aggregates:
+        padded_count = statistics.padded_count
+    if 'audio_size' in aggregates:
+        audio_size = statistics.audio_size
+
+    return (statistics.min_bitrate, statistics.max_bitrate,
+            channel_mode_changes, emphasis, padded_count,
+            statistics.padding_ratio, statistics.first_offset,
+            statistics.last_offset, audio_size)
+
+class ColumnarWriter(object):
+    """Writer buffering rows per column, written in record batches.
+
+    Subclasses implement :func:`_write_batch`, and :func:`_close` if needed.
+
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, batch_size=None):
+        """
+        :param batch_size: Count of rows in record batches, ``None`` defaults
+            to :const:`EXPORT_BATCH_SIZE`.
+        :type batch_size: int
+
+        """
+        self.batch_size = batch_size or EXPORT_BATCH_SIZE
+        """Count of rows in record batches.
+
+        :type: int"""
+
+        self.columns = COLUMNS
+        """Columns written.
+
+        :type: tuple of (string, string)"""
+
+        self.rows = 0
+        """Count of rows written.
+
+        :type: int"""
+
+        self._buffers = tuple([] for column in self.columns)
+        """Values of the current batch, per column.
+
+        :type: tuple of list"""
+
+    def write(self, path, entry, statistics=None):
+        """Write row of scanned file.
+
+        :param path: Path of the file.
+        :type path: string
+
+        :param entry: Entry of the file.
+        :type entry: :class:`mpeg1audio.scanner.CatalogEntry`
+
+        :param statistics: Statistics of frames of the file.
+        :type statistics: :class:`mpeg1audio.framestats.FrameStatistics`, or
+            None
+
+        """
+        values = (path, entry.identity[3], entry.error) + \
+                 (_NO_INFO if entry.info is None else \
+                  entry.info[1:len(_INFO_COLUMN_FIELDS) + 1]) + \
+                 get_vbr_header_values(entry.info) + \
+                 get_statistics_values(statistics) + (entry.content_hash,)
+        for buffer, value in zip(self._buffers, values):
+            buffer.append(value)
+
+        self.rows += 1
+        if len(self._buffers[0]) >= self.batch_size:
+            self.flush()
+
+    def write_catalog(self, catalog):
+        """Write rows of all entries of catalog, sorted by path.
+
+        Statistics are not kept in catalog, their columns are empty.
+
+        :param catalog: Catalog written.
+        :type catalog: :class:`mpeg1audio.scanner.Catalog`
+
+        """
+        for path in sorted(catalog.entries):
+            self.write(path, catalog.entries[path])
+
+    def flush(self):
+        """Write buffered rows as a record batch."""
+        if not self._buffers[0]:
+            return
+        self._write_batch(self._buffers)
+        for buffer in self._buffers:
+            del buffer[:]
+
+    def close(self):
+        """Write buffered rows, and finish the output."""
+        self.flush()
+        self._close()
+
+    @abc.abstractmethod
+    def _write_batch(self, buffers):
+        """Write record batch.
+
+        :param buffers: Values per column.
+        :type buffers: tuple of list
+
+        """
+
+    def _close(self):
+        """Finish the output."""
+        pass
+
+class CSVWriter(ColumnarWriter):
+    """Writer of CSV, with header row of column names."""
+
+    def __init__(self, file, batch_size=None):
+        """
+        :param file: File opened for writing, in binary mode.
+        :type file: file object
+
+        :param batch_size: Count of rows in record batches, ``None`` defaults
+            to :const:`EXPORT_BATCH_SIZE`.
+        :type batch_size: int
+
+        """
+        super(CSVWriter, self).__init__(batch_size)
+
+        self.file = file
+        """File written.
+
+        :type: file object"""
+
+        self._writer = csv.writer(file)
+        """CSV writer of the file."""
+
+        self._writer.writerow([name for name, type in self.columns])
+
+    def _write_batch(self, buffers):
+        self._writer.writerows(zip(*buffers))
+
+    def _close(self):
+        self.file.flush()
+
+class ArrowWriter(ColumnarWriter):
+    """Writer of Arrow IPC file, or Parquet file, using :mod:`pyarrow`."""
+
+    def __init__(self, file, format='arrow', batch_size=None):
+        """
+        :param file: Path of the file, or file opened for writing in binary
+            mode.
+        :type file: string, or file object
+
+        :param format: ``"arrow"`` or ``"parquet"``.
+        :type format: string
+
+        :param batch_size: Count of rows in record batches, ``None`` defaults
+            to :const:`EXPORT_BATCH_SIZE`. Each batch is a row group in
+            Parquet.
+        :type batch_size: int
+
+        :raise ExportException: Raised if pyarrow is not available, or format
+            is unknown.
+
+        """
+        if pyarrow is None:
+            raise ExportException('pyarrow is required by %s' % format)
+        if format not in ('arrow', 'parquet'):
+            raise ExportException('Unknown format %s' % format)
+
+        super(ArrowWriter, self).__init__(batch_size)
+
+        self.format = format
+        """``"arrow"`` or ``"parquet"``.
+
+        :type: string"""
+
+        types = {'string': pyarrow.string(), 'int': pyarrow.int64(),
+                 'float': pyarrow.float64(), 'bool': pyarrow.bool_()}
+        self._types = [types[type] for name, type in self.columns]
+        """Arrow types of the columns."""
+
+        self.schema = pyarrow.schema([pyarrow.field(name, arrow_type) \
+                        for (name, type), arrow_type in zip(self.columns,
+                                                            self._types)])
+        """Arrow schema of the columns.
+
+        :type: :class:`pyarrow.Schema`"""
+
+        if format == 'parquet':
+            from pyarrow import parquet
+            self._writer = parquet.ParquetWriter(file, self.schema)
+        else:
+            self._writer = pyarrow.RecordBatchFileWriter(file, self.schema)
+
+    def _write_batch(self, buffers):
+        arrays = [pyarrow.array(buffer, type=arrow_type) \
+                  for buffer, arrow_type in zip(buffers, self._types)]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, self.schema.names)
+        if self.format == 'parquet':
+            self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def _close(self):
+        self._writer.close()
+
+class ExportException(Exception):
+    """Export exception."""
+    pass
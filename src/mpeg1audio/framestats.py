@@ -0,0 +1,161 @@
+"""
+Frame statistics, aggregated in the same pass as parsing all frames.
+
+Usage example::
+
+    from mpeg1audio import MPEGAudio
+    mpeg = MPEGAudio('data/song.mp3')
+    mpeg.parse_all(statistics=True)
+    print mpeg.statistics.bitrate_histogram, mpeg.statistics.padding_ratio
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+AGGREGATES = ('bitrate', 'channel_mode', 'emphasis', 'padding', 'offsets',
+              'audio_size')
+"""Names of all aggregates.
+
+:type: tuple of string"""
+
+class FrameStatistics(object):
+    """Statistics of frames, aggregated one frame at a time."""
+
+    def __init__(self, aggregates=None):
+        """
+        :param aggregates: Names of aggregates computed, ``None`` defaults to
+            all :const:`AGGREGATES`.
+        :type aggregates: iterable of string
+
+        :raise ValueError: Raised if aggregate is unknown.
+
+        """
+        self.aggregates = tuple(aggregates or AGGREGATES)
+        """Names of aggregates computed.
+
+        :type: tuple of string"""
+
+        for aggregate in self.aggregates:
+            if aggregate not in AGGREGATES:
+                raise ValueError('Unknown aggregate %s' % aggregate)
+
+        self.frame_count = 0
+        """Count of frames.
+
+        :type: int"""
+
+        self.min_bitrate = None
+        """Minimum bitrate in kilobits per second, aggregate ``bitrate``.
+
+        :type: int, or None"""
+
+        self.max_bitrate = None
+        """Maximum bitrate in kilobits per second, aggregate ``bitrate``.
+
+        :type: int, or None"""
+
+        self.bitrate_histogram = {}
+        """Count of frames by bitrate, aggregate ``bitrate``.
+
+        :type: dict of int: int"""
+
+        self.channel_modes = []
+        """Changes of channel mode, including the first frame, aggregate
+        ``channel_mode``.
+
+        :type: list of (frame number, channel mode) tuples"""
+
+        self.emphases = []
+        """Changes of emphasis, including the first frame, aggregate
+        ``emphasis``.
+
+        :type: list of (frame number, emphasis) tuples"""
+
+        self.padded_count = 0
+        """Count of frames having padding, aggregate ``padding``.
+
+        :type: int"""
+
+        self.first_offset = None
+        """Offset of the first frame, aggregate ``offsets``.
+
+        :type: int, or None"""
+
+        self.last_offset = None
+        """Offset of the last frame, aggregate ``offsets``.
+
+        :type: int, or None"""
+
+        self.audio_size = 0
+        """Total size of frames in bytes, aggregate ``audio_size``.
+
+        :type: int"""
+
+        self._adders = [getattr(self, '_add_' + aggregate) \
+                        for aggregate in self.aggregates]
+        """Adders of the aggregates computed.
+
+        :type: list of callable"""
+
+    def add(self, frame):
+        """Add frame to statistics.
+
+        :param frame: Frame, next after the previously added.
+        :type frame: :class:`mpeg1audio.MPEGAudioFrame`
+
+        """
+        for adder in self._adders:
+            adder(frame)
+        self.frame_count += 1
+
+    def _add_bitrate(self, frame):
+        bitrate = frame.bitrate
+        histogram = self.bitrate_histogram
+        histogram[bitrate] = histogram.get(bitrate, 0) + 1
+        if self.min_bitrate is None or bitrate < self.min_bitrate:
+            self.min_bitrate = bitrate
+        if self.max_bitrate is None or bitrate > self.max_bitrate:
+            self.max_bitrate = bitrate
+
+    def _add_channel_mode(self, frame):
+        if not self.channel_modes or \
+           self.channel_modes[-1][1] != frame.channel_mode:
+            self.channel_modes.append((self.frame_count, frame.channel_mode))
+
+    def _add_emphasis(self, frame):
+        if not self.emphases or self.emphases[-1][1] != frame.emphasis:
+            self.emphases.append((self.frame_count, frame.emphasis))
+
+    def _add_padding(self, frame):
+        if frame._padding_size:
+            self.padded_count += 1
+
+    def _add_offsets(self, frame):
+        if self.first_offset is None:
+            self.first_offset = frame.offset
+        self.last_offset = frame.offset
+
+    def _add_audio_size(self, frame):
+        self.audio_size += frame.size
+
+    def _get_padding_ratio(self):
+        """Padding ratio getter.
+
+        :rtype: float, or None
+
+        """
+        if 'padding' not in self.aggregates or not self.frame_count:
+            return None
+        return float(self.padded_count) / self.frame_count
+
+    padding_ratio = property(_get_padding_ratio)
+    """Ratio of frames having padding, aggregate ``padding``.
+
+    :type: float, or None
+    """
@@ -97,6 +97,80 @@ SLOT_COEFFS = {
 }
 """Slot coefficient lookup dict"""
 
+SIDE_INFO_SIZES = {
+    '1': (32, 17),
+    '2': (17, 9),
+    '2.5': (17, 9),
+}
+"""Layer III side information size lookup dict, non-mono and mono"""
+
+MAX_FRAME_SIZE = 2881
+"""The absolute theoretical maximum frame size in bytes, MPEG 2.5 Layer II,
+8000 Hz @ 160 kbps, with a padding slot.
+
+:type: int"""
+
+FRAME_TABLE_MASK = 0xFFFEFE00
+"""Bits of header determining frame size and bitrate: sync, version, layer,
+bitrate, sample rate and padding bits. See :func:`get_frame_table`.
+
+:type: int"""
+
+_frame_table = None
+"""Frame sizes and bitrates by masked header, built on first use."""
+
+STREAM_MASK = 0xFFFF0C80
+"""Bits of header fixed within a stream: sync, version, layer, protection,
+sample rate, and the bit of channel mode telling stereo and joint stereo from
+dual channel and mono.
+
+:type: int"""
+
+LOCK_MASK = 0xFFFF0DFF
+"""Bits of header other than bitrate and padding. Frames of a locked stream
+having these bits of the locked header get their size from
+:func:`get_size_table`.
+
+:type: int"""
+
+SIZE_TABLE_MASK = 0xF200
+"""Bitrate and padding bits of header, see :func:`get_size_table`.
+
+:type: int"""
+
+_size_tables = {}
+"""Tables of :func:`get_size_table` by version, layer and sample rate bits."""
+
+SNIFF_SIZE = 64
+"""Size of the beginning of file read by :func:`get_container`.
+
+:type: int"""
+
+CONTAINER_SIGNATURES = (
+    (0, 'fLaC', 'FLAC'),
+    (0, 'OggS', 'Ogg'),
+    (4, 'ftyp', 'MP4'),
+    (0, '\x1a\x45\xdf\xa3', 'Matroska'),
+    (0, '\x30\x26\xb2\x75\x8e\x66\xcf\x11', 'ASF'),
+    (0, 'FORM', 'AIFF'),
+    (0, 'MThd', 'MIDI'),
+    (0, '\xff\xd8\xff', 'JPEG'),
+    (0, '\x89PNG\r\n\x1a\n', 'PNG'),
+    (0, 'GIF8', 'GIF'),
+    (0, 'PK\x03\x04', 'ZIP'),
+    (0, 'PK\x05\x06', 'ZIP'),
+    (0, '%PDF-', 'PDF'),
+)
+"""Signatures of non-MPEG files, as tuples of offset, signature and name of
+the format. WAV is tested separately, as it may contain MPEG audio.
+
+:type: tuple of (int, string, string)"""
+
+WAVE_MPEG_FORMATS = (0x50, 0x55)
+"""Format tags of WAV containing MPEG audio: MPEG and MPEG Layer III.
+
+:type: tuple of int"""
+
 def check_sync_bits(bits):
     """Check if given bits has sync bits.
     
@@ -334,6 +408,37 @@ def get_samples_per_frame(mpeg_version, layer):
                             'Samples per frame cannot be determined.')
 
 
+def get_side_info_size(mpeg_version, layer, channel_mode):
+    """Get size of Layer III side information.
+    
+    Side information follows the header, or the CRC if frame is protected.
+    
+    :param mpeg_version: Version of the mpeg, as returned by 
+        :func:`get_mpeg_version`
+    :type mpeg_version: string
+    
+    :param layer: Layer of the MPEG as returned by :func:`get_layer`.
+    :type layer: string
+    
+    :param channel_mode: Channel mode as returned by :func:`get_channel_mode`.
+    :type channel_mode: string
+    
+    :rtype: int
+    :return: Side information size in bytes.
+    
+    :raise mpeg1audio.MPEGAudioHeaderException: Raised if side information 
+        size cannot be determined, e.g. layer is not ``'3'``.
+    
+    """
+    if layer != '3':
+        raise MPEGAudioHeaderException(
+                            'Side information exists only in Layer III.')
+    try:
+        return SIDE_INFO_SIZES[mpeg_version][channel_mode == 'mono']
+    except (KeyError, TypeError):
+        raise MPEGAudioHeaderException(
+                            'Side information size cannot be determined.')
+
 def get_frame_size(mpeg_version, layer, sample_rate, bitrate, padding_size):
     """Get size.
     
@@ -394,6 +499,27 @@ def get_vbr_bitrate(mpeg_size, sample_count, sample_rate):
     bits_per_second = bytes_per_second * 8
     return bits_per_second / 1000
 
+def get_average_frame_size(bitrate, samples_per_frame, sample_rate):
+    """Get average frame size of constant bitrate MPEG.
+    
+    Padding slots are spread so that average frame size matches the bitrate
+    exactly, thus the average is rarely a whole number.
+    
+    :param bitrate: Bitrate in kilobits per second.
+    :type bitrate: int
+    
+    :param samples_per_frame: Samples per frame.
+    :type samples_per_frame: int
+    
+    :param sample_rate: Sample rate in Hz.
+    :type sample_rate: int
+    
+    :return: Average frame size in bytes.
+    :rtype: float
+    
+    """
+    return float(bitrate * 1000 * samples_per_frame) / (8 * sample_rate)
+
 def get_sample_count(frame_count, samples_per_frame):
     """Get sample count.
     
@@ -409,7 +535,7 @@ def get_sample_count(frame_count, samples_per_frame):
     """
     return frame_count * samples_per_frame
 
-def get_duration_from_sample_count(sample_count, sample_rate):
+def get_duration_from_sample_count(sample_count, sample_rate, exact=False):
     """Get MPEG Duration.
     :param sample_count: Count of samples.
     :type sample_count: int
@@ -417,10 +543,16 @@ def get_duration_from_sample_count(sample_count, sample_rate):
     :param sample_rate: Sample rate in Hz.
     :type sample_rate: int
     
-    :return: Duration of MPEG, accuracy in seconds.
+    :param exact: Duration accurate to a sample, otherwise accuracy is in
+        seconds.
+    :type exact: bool
+    
+    :return: Duration of MPEG.
     :rtype: datetime.timedelta
     
     """
+    if exact:
+        return timedelta(seconds=float(sample_count) / sample_rate)
     return timedelta(seconds=int(round(sample_count / sample_rate)))
 
 def get_duration_from_size_bitrate(mpeg_size, bitrate):
@@ -459,6 +591,107 @@ def get_vbr_frame_size(mpeg_size, frame_count):
     """
     return mpeg_size / frame_count
 
+def get_frame_table():
+    """Get frame sizes and bitrates of all parseable headers.
+    
+    Lookup of masked header replaces parsing, when only sizes and bitrates of
+    frames are needed. Table contains exactly the headers parsed by
+    :func:`mpeg1audio.MPEGAudioFrame.parse`, as it is built with the same
+    functions.
+    
+        >>> get_frame_table()[0xFFFB9000 & FRAME_TABLE_MASK]
+        (417, 128)
+    
+    :return: Frame size in bytes and bitrate in kilobits per second, by header
+        masked with :const:`FRAME_TABLE_MASK`.
+    :rtype: dict of int: (int, int)
+    
+    """
+    global _frame_table
+    if _frame_table is not None:
+        return _frame_table
+
+    table = {}
+    for version_bits in range(4):
+        for layer_bits in range(4):
+            for bitrate_bits in range(16):
+                for sample_rate_bits in range(4):
+                    for padding_bit in range(2):
+                        try:
+                            version = get_mpeg_version(version_bits)
+                            layer = get_layer(layer_bits)
+                            bitrate = get_bitrate(version, layer, bitrate_bits)
+                            sample_rate = get_sample_rate(version,
+                                                          sample_rate_bits)
+                            size = get_frame_size(version, layer, sample_rate,
+                                                  bitrate, padding_bit)
+                        except MPEGAudioHeaderException:
+                            continue
+                        header = 0xFFE00000 | version_bits << 19 | \
+                                 layer_bits << 17 | bitrate_bits << 12 | \
+                                 sample_rate_bits << 10 | padding_bit << 9
+                        table[header] = (size, bitrate)
+    _frame_table = table
+    return table
+
+def get_container(data):
+    """Get format of known non-MPEG file from the beginning of file.
+    
+    Files are recognized by their signatures, see
+    :const:`CONTAINER_SIGNATURES`. WAV is recognized unless its format is
+    MPEG, see :const:`WAVE_MPEG_FORMATS`.
+    
+        >>> get_container('fLaC\\x00\\x00\\x00\\x22')
+        'FLAC'
+        >>> get_container('ID3\\x04\\x00') is None
+        True
+        >>> get_container('RIFF\\x00\\x00\\x00\\x00WAVEfmt '
+        ...               '\\x10\\x00\\x00\\x00\\x55\\x00') is None
+        True
+    
+    :param data: Beginning of file, :const:`SNIFF_SIZE` bytes or less.
+    :type data: string
+    
+    :return: Name of the format, or ``None`` if the file may be MPEGAudio.
+    :rtype: string, or None
+    
+    """
+    for offset, signature, name in CONTAINER_SIGNATURES:
+        if data.startswith(signature, offset):
+            return name
+
+    if data.startswith('RIFF') and data.startswith('WAVE', 8):
+        # Format tag is in the format chunk, when it is the first chunk.
+        if not data.startswith('fmt ', 12) or len(data) < 22:
+            return None
+        format_tag = struct.unpack_from('<H', data, 20)[0]
+        return None if format_tag in WAVE_MPEG_FORMATS else 'WAV'
+    return None
+
+def get_size_table(header):
+    """Get frame sizes and bitrates of the stream of given header, by bitrate
+    and padding.
+    
+        >>> get_size_table(0xFFFBA064)[0x9200]
+        (418, 128)
+    
+    :param header: Header of a frame of the stream.
+    :type header: int
+    
+    :return: Frame size in bytes and bitrate in kilobits per second, by header
+        masked with :const:`SIZE_TABLE_MASK`.
+    :rtype: dict of int: (int, int)
+    
+    """
+    stream_bits = header & FRAME_TABLE_MASK & ~SIZE_TABLE_MASK
+    table = _size_tables.get(stream_bits)
+    if table is None:
+        table = dict((frame_header & SIZE_TABLE_MASK, entry) \
+                     for frame_header, entry in get_frame_table().items() \
+                     if frame_header & ~SIZE_TABLE_MASK == stream_bits)
+        _size_tables[stream_bits] = table
+    return table
+
 class MPEGAudioHeaderException(Exception):
     """MPEG Header Exception, unable to parse or read the header."""
     def __init__(self, message, mpeg_offset=None, bad_offset=None):
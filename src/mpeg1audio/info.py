@@ -0,0 +1,207 @@
+"""
+Immutable snapshot of MPEGAudio details, for cross-process use.
+
+:class:`MPEGAudioInfo` has no file handles, so it is cheap to pickle and to
+send to other processes, or to store in caches. It serializes to a compact
+binary form, and can rehydrate a lazy :class:`mpeg1audio.MPEGAudio` without
+probing the file again.
+
+Usage example::
+
+    from mpeg1audio import MPEGAudio
+    data = MPEGAudio('data/song.mp3').get_info().to_bytes()
+    ...
+    mpeg = MPEGAudio.from_info(MPEGAudioInfo.from_bytes(data))
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from collections import namedtuple
+import struct
+
+INFO_FIELDS = ('path', 'filesize', 'offset', 'header', 'version', 'layer',
+               'sample_rate', 'samples_per_frame', 'channel_mode', 'is_vbr',
+               'vbr_header', 'bitrate', 'frame_size', 'frame_count', 'size',
+               'sample_count', 'duration', 'provenance', 'begin_start_looking',
+               'ending_start_looking', 'identity', 'vbr_data')
+"""Fields of :class:`MPEGAudioInfo`.
+
+:type: tuple of string"""
+
+INFO_MAGIC = 'MPAI'
+"""Magic of serialized :class:`MPEGAudioInfo`.
+
+:type: string"""
+
+INFO_FORMAT_VERSION = 1
+"""Format version of serialized :class:`MPEGAudioInfo`.
+
+:type: int"""
+
+_INFO_STRUCT = struct.Struct('>4sBIqqqq?B?dqqqqdB?QQqdHH')
+"""Fixed part of serialized :class:`MPEGAudioInfo`, followed by the path and
+the VBR header data."""
+
+VBR_HEADERS = (None, 'xing', 'vbri')
+"""VBR header types, serialized by their index.
+
+:type: tuple"""
+
+PROVENANCES = (None, 'parsed', 'calculated', 'header', 'estimated')
+"""Provenances of frame count and values derived from it, serialized by their
+index. ``parsed`` and ``calculated`` are exact.
+
+:type: tuple"""
+
+class MPEGAudioInfo(namedtuple('MPEGAudioInfo', INFO_FIELDS)):
+    """Immutable snapshot of MPEGAudio details.
+
+    Fields are named as in :class:`mpeg1audio.MPEGAudio`, with following
+    exceptions: ``path`` is the path to file, or ``None``; ``header`` is the
+    header of the first frame as integer; ``vbr_header`` is ``"xing"``,
+    ``"vbri"`` or ``None``; ``duration`` is in seconds; and ``provenance``
+    tells where the frame count is from, see :const:`PROVENANCES`;
+    ``identity`` is the identity of the file, see
+    :func:`mpeg1audio.utils.get_identity`, or ``None`` if not opened by path;
+    and ``vbr_data`` is the data the VBR header is parsed from, see
+    :attr:`mpeg1audio.VBRHeader.data`, or ``None``.
+
+    """
+    __slots__ = ()
+
+    def _get_is_exact(self):
+        """Is exact getter.
+
+        :rtype: bool
+
+        """
+        return self.provenance in ('parsed', 'calculated')
+
+    is_exact = property(_get_is_exact)
+    """Are frame count and values derived from it exact?
+
+    :type: bool
+    """
+
+    def to_bytes(self):
+        """Serialize to compact binary form.
+
+        :rtype: string
+
+        """
+        path = self.path
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        path = path or ''
+        vbr_data = self.vbr_data or ''
+        device, inode, identity_size, mtime = self.identity or (0, 0, 0, 0.0)
+
+        return _INFO_STRUCT.pack(INFO_MAGIC, INFO_FORMAT_VERSION,
+                    self.header, self.filesize, self.offset,
+                    self.begin_start_looking, self.ending_start_looking,
+                    self.is_vbr, VBR_HEADERS.index(self.vbr_header),
+                    isinstance(self.bitrate, (int, long)),
+                    _float_or_nan(self.bitrate), _int_or_minus(self.frame_size),
+                    _int_or_minus(self.frame_count), _int_or_minus(self.size),
+                    _int_or_minus(self.sample_count),
+                    _float_or_nan(self.duration),
+                    PROVENANCES.index(self.provenance),
+                    self.identity is not None, device, inode, identity_size,
+                    mtime, len(path), len(vbr_data)) + path + vbr_data
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialize from binary form.
+
+        :param data: Serialized info, as returned by :func:`to_bytes`.
+        :type data: string
+
+        :rtype: :class:`MPEGAudioInfo`
+
+        :raise ValueError: Raised if data is not serialized info.
+
+        """
+        from mpeg1audio import MPEGAudioFrame
+        from mpeg1audio.headers import MPEGAudioHeaderException
+
+        try:
+            (magic, format_version, header, filesize, offset,
+             begin_start_looking, ending_start_looking, is_vbr, vbr_header,
+             is_bitrate_int, bitrate, frame_size, frame_count, size,
+             sample_count, duration, provenance, has_identity, device, inode,
+             identity_size, mtime, path_length, vbr_data_length) = \
+                _INFO_STRUCT.unpack(data[:_INFO_STRUCT.size])
+        except struct.error:
+            raise ValueError('Info is truncated.')
+
+        if magic != INFO_MAGIC or format_version != INFO_FORMAT_VERSION:
+            raise ValueError('Info format is not supported.')
+
+        try:
+            frame = MPEGAudioFrame.parse(header)
+        except MPEGAudioHeaderException:
+            raise ValueError('Header of info is not valid.')
+
+        path_end = _INFO_STRUCT.size + path_length
+        if len(data) < path_end + vbr_data_length:
+            raise ValueError('Info is truncated.')
+
+        path = data[_INFO_STRUCT.size:path_end] or None
+        vbr_data = data[path_end:path_end + vbr_data_length] or None
+
+        identity = None
+        if has_identity:
+            identity = (device, inode, identity_size, mtime)
+
+        if is_bitrate_int:
+            bitrate = int(bitrate)
+
+        return cls(path=path, filesize=filesize, offset=offset, header=header,
+                   version=frame.version, layer=frame.layer,
+                   sample_rate=frame.sample_rate,
+                   samples_per_frame=frame.samples_per_frame,
+                   channel_mode=frame.channel_mode, is_vbr=is_vbr,
+                   vbr_header=VBR_HEADERS[vbr_header],
+                   bitrate=_nan_to_none(bitrate),
+                   frame_size=_minus_to_none(frame_size),
+                   frame_count=_minus_to_none(frame_count),
+                   size=_minus_to_none(size),
+                   sample_count=_minus_to_none(sample_count),
+                   duration=_nan_to_none(duration),
+                   provenance=PROVENANCES[provenance],
+                   begin_start_looking=begin_start_looking,
+                   ending_start_looking=ending_start_looking,
+                   identity=identity, vbr_data=vbr_data)
+
+    def __reduce__(self):
+        return (_from_bytes, (self.to_bytes(),))
+
+def _from_bytes(data):
+    """Unpickle :class:`MPEGAudioInfo`.
+
+    :param data: Serialized info.
+    :type data: string
+
+    :rtype: :class:`MPEGAudioInfo`
+
+    """
+    return MPEGAudioInfo.from_bytes(data)
+
+def _int_or_minus(value):
+    return -1 if value is None else value
+
+def _minus_to_none(value):
+    return None if value == -1 else value
+
+def _float_or_nan(value):
+    return float('nan') if value is None else value
+
+def _nan_to_none(value):
+    return None if value != value else value
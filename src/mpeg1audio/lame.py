@@ -0,0 +1,132 @@
+"""
+LAME extension of XING header.
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+import struct
+
+class LAME(object):
+    """LAME extension of XING header.
+
+    LAME, and encoders using it, write this extension right after the XING
+    header fields. Most notably it has encoder delay and padding, which are
+    needed to know the exact count of samples in the original audio.
+
+    """
+    def __init__(self):
+        self.offset = 0
+        """Offset of extension in file.
+
+        :type: int"""
+
+        self.size = 36
+        """Size of extension in file.
+
+        :type: int"""
+
+        self.encoder = None
+        """Encoder version, for example ``"LAME3.97 "``.
+
+        :type: string"""
+
+        self.revision = None
+        """Revision of the extension.
+
+        :type: int"""
+
+        self.vbr_method = None
+        """VBR method.
+
+        :type: int"""
+
+        self.lowpass = None
+        """Lowpass frequency in Hz.
+
+        :type: int"""
+
+        self.encoder_delay = 0
+        """Encoder delay, count of samples added to the beginning.
+
+        :type: int"""
+
+        self.encoder_padding = 0
+        """Encoder padding, count of samples added to the end.
+
+        :type: int"""
+
+        self.music_length = None
+        """Length of music in bytes, from the first frame to the last frame.
+
+        :type: int"""
+
+        self.music_crc = None
+        """CRC-16 of music.
+
+        :type: int"""
+
+        self.tag_crc = None
+        """CRC-16 of the frame, up to this field.
+
+        :type: int"""
+
+    @classmethod
+    def parse(cls, chunk, beginning_of_lame, chunk_offset=0):
+        """Parse LAME extension from chunk.
+
+        :param chunk: Chunk of data from the frame holding XING header.
+        :type chunk: string
+
+        :param beginning_of_lame: Position of extension *within a chunk*,
+            right after the XING header fields.
+        :type beginning_of_lame: int
+
+        :param chunk_offset: Offset of chunk in file.
+        :type chunk_offset: int
+
+        :return: LAME extension.
+        :rtype: :class:`LAME`
+
+        :raise LAMEHeaderException: Raised if LAME extension cannot be parsed
+            or found.
+
+        """
+        lame_chunk = chunk[beginning_of_lame:beginning_of_lame + 36]
+        if len(lame_chunk) != 36:
+            raise LAMEHeaderException('LAME EOF')
+
+        if not lame_chunk[:4].isalnum():
+            raise LAMEHeaderException('LAME extension is not found.')
+
+        self = LAME()
+        self.offset = chunk_offset + beginning_of_lame
+        self.encoder = lame_chunk[:9]
+
+        (revision_method, lowpass) = struct.unpack('>BB', lame_chunk[9:11])
+        self.revision = revision_method >> 4
+        self.vbr_method = revision_method & 15
+        self.lowpass = lowpass * 100
+
+        (delay_padding,) = struct.unpack('>I', '\x00' + lame_chunk[21:24])
+        self.encoder_delay = delay_padding >> 12
+        self.encoder_padding = delay_padding & 4095
+
+        (self.music_length, self.music_crc, self.tag_crc) = \
+            struct.unpack('>IHH', lame_chunk[28:36])
+
+        return self
+
+class LAMEException(Exception):
+    """LAME Related exceptions inherit from this."""
+    pass
+
+class LAMEHeaderException(LAMEException):
+    """LAME Header Exception."""
+    pass
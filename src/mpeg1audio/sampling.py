@@ -0,0 +1,313 @@
+"""
+Sampling estimation of VBR files without XING or VBRI header.
+
+Instead of parsing all frames, frames are counted in randomly placed windows
+of the file. Average frame size is the ratio of bytes to frames over the
+windows, and frame count is the size of MPEGAudio divided by it. Windows are
+added until the relative error of the average, at given confidence, is below
+the target.
+
+Usage example::
+
+    from mpeg1audio import MPEGAudio, sampling
+    estimate = sampling.estimate(MPEGAudio('data/vbr_empty.mp3'))
+    print estimate.duration, estimate.duration_interval
+
+Estimation is also used by :class:`mpeg1audio.MPEGAudio` given the
+*sampling_error*.
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio import MPEGAudioFrame, headers, utils
+import math
+import random
+
+SAMPLING_WINDOW_SIZE = 16384
+"""Size of sampled windows in bytes.
+
+:type: int"""
+
+SAMPLING_MIN_WINDOWS = 8
+"""Count of windows sampled before the error is tested.
+
+:type: int"""
+
+SAMPLING_MAX_WINDOWS = 64
+"""Maximum of windows sampled.
+
+:type: int"""
+
+SAMPLING_TARGET_ERROR = 0.01
+"""Target relative error of the estimate.
+
+:type: float"""
+
+SAMPLING_CONFIDENCE = 0.95
+"""Confidence of the error and the intervals.
+
+:type: float"""
+
+SAMPLING_SEED = 0
+"""Seed of window positions, same file gets the same estimate.
+
+:type: int"""
+
+class Estimate(object):
+    """Estimate of VBR MPEGAudio, with confidence intervals."""
+
+    def __init__(self):
+        self.frame_count = None
+        """Estimated count of frames.
+
+        :type: int"""
+
+        self.frame_count_interval = None
+        """Confidence interval of frame count.
+
+        :type: tuple of (int, int)"""
+
+        self.bitrate = None
+        """Estimated average bitrate in kilobits per second.
+
+        :type: float"""
+
+        self.bitrate_interval = None
+        """Confidence interval of bitrate.
+
+        :type: tuple of (float, float)"""
+
+        self.duration = None
+        """Estimated duration.
+
+        :type: datetime.timedelta"""
+
+        self.duration_interval = None
+        """Confidence interval of duration.
+
+        :type: tuple of (datetime.timedelta, datetime.timedelta)"""
+
+        self.error = None
+        """Relative error of the estimate, at the confidence.
+
+        :type: float"""
+
+        self.confidence = None
+        """Confidence of the error and the intervals.
+
+        :type: float"""
+
+        self.window_count = 0
+        """Count of windows having frames.
+
+        :type: int"""
+
+        self.bytes_read = 0
+        """Count of bytes read.
+
+        :type: int"""
+
+        self.is_exact = False
+        """Are all frames counted, because the file is smaller than the
+        windows?
+
+        :type: bool"""
+
+def estimate(mpeg, target_error=None, confidence=None, window_size=None,
+             min_windows=None, max_windows=None, seed=None):
+    """Estimate frame count, bitrate and duration by sampling windows.
+
+    Files smaller than the minimum of windows are counted fully.
+
+    :param mpeg: MPEGAudio estimated.
+    :type mpeg: :class:`mpeg1audio.MPEGAudio`
+
+    :param target_error: Target relative error, ``None`` defaults to
+        :const:`SAMPLING_TARGET_ERROR`.
+    :type target_error: float
+
+    :param confidence: Confidence of the error, ``None`` defaults to
+        :const:`SAMPLING_CONFIDENCE`.
+    :type confidence: float
+
+    :param window_size: Size of windows, ``None`` defaults to
+        :const:`SAMPLING_WINDOW_SIZE`.
+    :type window_size: int
+
+    :param min_windows: Windows sampled before testing the error, ``None``
+        defaults to :const:`SAMPLING_MIN_WINDOWS`.
+    :type min_windows: int
+
+    :param max_windows: Maximum of windows, ``None`` defaults to
+        :const:`SAMPLING_MAX_WINDOWS`.
+    :type max_windows: int
+
+    :param seed: Seed of window positions, ``None`` defaults to
+        :const:`SAMPLING_SEED`.
+    :type seed: hashable
+
+    :rtype: :class:`Estimate`
+
+    :raise mpeg1audio.MPEGAudioHeaderException: Raised if no frames are found
+        in the windows.
+
+    """
+    target_error = target_error or SAMPLING_TARGET_ERROR
+    confidence = confidence or SAMPLING_CONFIDENCE
+    window_size = window_size or SAMPLING_WINDOW_SIZE
+    min_windows = max(min_windows or SAMPLING_MIN_WINDOWS, 2)
+    max_windows = max(max_windows or SAMPLING_MAX_WINDOWS, min_windows)
+    random_positions = random.Random(SAMPLING_SEED if seed is None else seed)
+
+    source = mpeg._source
+    stream_mpegframe = mpeg.frames[0]
+    first_offset = stream_mpegframe.offset
+    mpeg_size = mpeg.size
+
+    result = Estimate()
+    result.confidence = confidence
+
+    if mpeg_size <= window_size * min_windows:
+        # Small file, count all frames.
+        chunks = utils.chunked_reader(source, start_position=first_offset,
+                                      chunk_size=mpeg_size + 4)
+        frame_count = MPEGAudioFrame.count_consecutive(first_offset,
+                                                       chunks)[0]
+        result.bytes_read = mpeg_size + 4
+        result.is_exact = True
+        _set_estimate(result, mpeg, mpeg_size, float(mpeg_size) / frame_count,
+                      0.0)
+        return result
+
+    z = get_z(confidence)
+    spans = []
+    counts = []
+    error = None
+    for window in range(max_windows * 2):
+        position = first_offset + \
+                   random_positions.randrange(mpeg_size - window_size)
+        chunk = source.read_at(position, window_size)
+        result.bytes_read += len(chunk)
+
+        # Beginning of the window is searched for frames.
+        found = MPEGAudioFrame.find_in_chunk(chunk, position,
+                                             stream_mpegframe,
+                                             max_bytes=window_size // 2)
+        if found is None:
+            continue
+        frame_count, bitrate_sum, end_offset = \
+            MPEGAudioFrame.count_consecutive(found.offset,
+                                             [(position, chunk)])
+        spans.append(end_offset - found.offset)
+        counts.append(frame_count)
+
+        if len(counts) >= min_windows:
+            error = _get_error(spans, counts, z)
+            if error <= target_error or len(counts) >= max_windows:
+                break
+
+    if not counts:
+        raise headers.MPEGAudioHeaderException('Frames not found in windows.')
+    if error is None:
+        error = _get_error(spans, counts, z)
+
+    result.window_count = len(counts)
+    _set_estimate(result, mpeg, mpeg_size,
+                  float(sum(spans)) / sum(counts), error)
+    return result
+
+def get_z(confidence):
+    """Get two-sided z-score of normal distribution.
+
+        >>> round(get_z(0.95), 3)
+        1.96
+
+    :param confidence: Confidence, between ``0`` and ``1``.
+    :type confidence: float
+
+    :rtype: float
+
+    """
+    low, high = 0.0, 10.0
+    for iteration in range(64):
+        middle = (low + high) / 2
+        if math.erf(middle / math.sqrt(2)) < confidence:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def _get_error(spans, counts, z):
+    """Relative error of the ratio of bytes to frames over windows.
+
+    :param spans: Bytes of counted frames in each window.
+    :type spans: list of int
+
+    :param counts: Count of frames in each window.
+    :type counts: list of int
+
+    :param z: Z-score of the confidence.
+    :type z: float
+
+    :rtype: float
+
+    """
+    window_count = len(counts)
+    if window_count < 2:
+        return float('inf')
+    ratio = float(sum(spans)) / sum(counts)
+    mean_count = float(sum(counts)) / window_count
+    variance = sum((span - ratio * count) ** 2 \
+                   for span, count in zip(spans, counts)) / (window_count - 1)
+    standard_error = math.sqrt(variance / window_count) / mean_count
+    return z * standard_error / ratio
+
+def _set_estimate(result, mpeg, mpeg_size, frame_size, error):
+    """Set estimated values and their intervals.
+
+    :param result: Estimate being set.
+    :type result: :class:`Estimate`
+
+    :param mpeg: MPEGAudio estimated.
+    :type mpeg: :class:`mpeg1audio.MPEGAudio`
+
+    :param mpeg_size: Size of MPEGAudio in bytes.
+    :type mpeg_size: int
+
+    :param frame_size: Average frame size in bytes.
+    :type frame_size: float
+
+    :param error: Relative error of the average frame size.
+    :type error: float
+
+    """
+    frame_count = mpeg_size / frame_size
+    low = max(int(math.floor(frame_count * (1 - error))), 1)
+    high = int(math.ceil(frame_count * (1 + error)))
+
+    result.error = error
+    result.frame_count = int(round(frame_count))
+    result.frame_count_interval = (low, high)
+    result.duration = _get_duration(mpeg, result.frame_count)
+    result.duration_interval = (_get_duration(mpeg, low),
+                                _get_duration(mpeg, high))
+    result.bitrate = _get_bitrate(mpeg, mpeg_size, result.frame_count)
+    result.bitrate_interval = (_get_bitrate(mpeg, mpeg_size, high),
+                               _get_bitrate(mpeg, mpeg_size, low))
+
+def _get_duration(mpeg, frame_count):
+    return headers.get_duration_from_sample_count(\
+                headers.get_sample_count(frame_count, mpeg.samples_per_frame),
+                mpeg.sample_rate)
+
+def _get_bitrate(mpeg, mpeg_size, frame_count):
+    return headers.get_vbr_bitrate(mpeg_size,
+                headers.get_sample_count(frame_count, mpeg.samples_per_frame),
+                mpeg.sample_rate)
@@ -0,0 +1,317 @@
+"""
+Batch scanning of MPEGAudio files under directories into a catalog.
+
+Catalog keeps snapshots of scanned files by path, with identities of the
+files. Scanning again parses only files whose identity has changed since, and
+drops files which no longer exist, so a library can be kept up to date
+without parsing all files again. See :mod:`mpeg1audio.watch` for updating the
+catalog as files change.
+
+Usage example::
+
+    from mpeg1audio.scanner import Catalog
+    catalog = Catalog()
+    catalog.scan('music/')
+    for path, entry in catalog.entries.items():
+        if entry.info is not None:
+            print path, entry.info.duration
+    catalog.save(open('catalog.pickle', 'wb'))
+
+Results can be streamed to columnar files while scanning, see
+:mod:`mpeg1audio.export`.
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio import MPEGAudio, MPEGAudioHeaderException
+from mpeg1audio import framestats, utils
+from mpeg1audio.sources import BudgetException
+from mpeg1audio.utils import get_identity
+from collections import namedtuple
+import hashlib
+import os
+import pickle
+
+SCAN_EXTENSIONS = ('.mp3', '.mp2', '.mp1', '.mpa')
+"""Extensions of scanned files, compared case-insensitively.
+
+:type: tuple of string"""
+
+class CatalogEntry(namedtuple('CatalogEntry', ('identity', 'info', 'error',
+                                               'content_hash'))):
+    """Entry of scanned file in :class:`Catalog`.
+
+    ``identity`` is the identity of the file when scanned, see
+    :func:`mpeg1audio.utils.get_identity`; ``info`` is
+    :class:`mpeg1audio.info.MPEGAudioInfo`, or ``None`` if the file could not
+    be parsed; ``error`` is the reason, or ``None``; and ``content_hash`` is
+    the hash of the audio, see :attr:`mpeg1audio.MPEGAudio.content_hash`, or
+    ``None`` if not hashed.
+
+    """
+    __slots__ = ()
+
+    def __new__(cls, identity, info, error, content_hash=None):
+        # Entries saved without content hash are loaded.
+        return super(CatalogEntry, cls).__new__(cls, identity, info, error,
+                                                content_hash)
+
+class Catalog(object):
+    """Catalog of scanned MPEGAudio files by path."""
+
+    def __init__(self, extensions=None, file_pool=None, statistics=None,
+                 max_bytes=None, deadline=None, hash_algorithm=None):
+        """
+        :param extensions: Extensions of scanned files, ``None`` defaults to
+            :const:`SCAN_EXTENSIONS`.
+        :type extensions: iterable of string
+
+        :param file_pool: Pool of files opened by the scans, ``None`` creates
+            a new one.
+        :type file_pool: :class:`mpeg1audio.utils.FilePool`
+
+        :param statistics: Names of frame statistics aggregated of scanned
+            files, see :const:`mpeg1audio.framestats.AGGREGATES`. Statistics
+            are written to the writer of scan, they are not kept in the
+            catalog. ``None`` does not parse all frames.
+        :type statistics: iterable of string, or None
+
+        :param max_bytes: Budget of bytes read of each file, ``None`` is
+            unlimited. See :attr:`mpeg1audio.MPEGAudio.budget`.
+        :type max_bytes: int, or None
+
+        :param deadline: Budget of seconds of each file, ``None`` is
+            unlimited.
+        :type deadline: float, or None
+
+        :param hash_algorithm: Hash the audio of scanned files in the same
+            pass as parsing all frames, e.g. ``"sha1"``, see
+            :func:`mpeg1audio.MPEGAudio.parse_all`. Files with the same audio
+            but different tags have the same hash. ``None`` does not hash.
+        :type hash_algorithm: string, or None
+
+        :raise ValueError: Raised if aggregate of statistics is unknown, or the
+            hash algorithm is not available.
+
+        """
+        self.extensions = tuple(extension.lower() for extension in \
+                                (extensions or SCAN_EXTENSIONS))
+        """Extensions of scanned files.
+
+        :type: tuple of string"""
+
+        self.file_pool = file_pool or utils.FilePool()
+        """Pool of files opened by the scans.
+
+        :type: :class:`mpeg1audio.utils.FilePool`"""
+
+        self.statistics = statistics and tuple(statistics)
+        """Names of frame statistics aggregated of scanned files.
+
+        :type: tuple of string, or None"""
+
+        self.max_bytes = max_bytes
+        """Budget of bytes read of each file.
+
+        :type: int, or None"""
+
+        self.deadline = deadline
+        """Budget of seconds of each file.
+
+        :type: float, or None"""
+
+        # Invalid arguments would fail every file of the scan.
+        for aggregate in self.statistics or ():
+            if aggregate not in framestats.AGGREGATES:
+                raise ValueError('Unknown aggregate %s' % aggregate)
+        if hash_algorithm is not None:
+            hashlib.new(hash_algorithm)
+
+        self.hash_algorithm = hash_algorithm
+        """Algorithm of hashing the audio of scanned files.
+
+        :type: string, or None"""
+
+        self.entries = {}
+        """Entries of scanned files by path.
+
+        :type: dict of string: :class:`CatalogEntry`"""
+
+        self.scans = 0
+        """Count of files parsed.
+
+        :type: int"""
+
+    def is_scanned(self, path):
+        """Is the file scanned, by its extension?
+
+        :param path: Path of the file.
+        :type path: string
+
+        :rtype: bool
+
+        """
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    def scan(self, root, writer=None):
+        """Scan files under directory, or a single file.
+
+        Only files whose identity has changed are parsed again, and entries of
+        files no longer under *root* are removed.
+
+        :param root: Path of directory or file.
+        :type root: string
+
+        :param writer: Writer of the parsed files.
+        :type writer: :class:`mpeg1audio.export.ColumnarWriter`, or None
+
+        :return: Changes as tuples of path and change, see :func:`update`.
+        :rtype: list of (string, string)
+
+        """
+        root = os.path.normpath(root)
+        if not os.path.isdir(root):
+            change = self.update(root, writer)
+            return [(root, change)] if change else []
+
+        changes = []
+        found = set()
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                if not self.is_scanned(path):
+                    continue
+                found.add(path)
+                change = self.update(path, writer)
+                if change:
+                    changes.append((path, change))
+
+        for path in self.get_paths_under(root):
+            if path not in found:
+                del self.entries[path]
+                changes.append((path, 'removed'))
+        return changes
+
+    def update(self, path, writer=None):
+        """Update entry of the file, parsed only if its identity has changed.
+
+        :param path: Path of the file.
+        :type path: string
+
+        :param writer: Writer of the file, if parsed.
+        :type writer: :class:`mpeg1audio.export.ColumnarWriter`, or None
+
+        :return: ``"added"``, ``"changed"``, ``"removed"``, or ``None`` if the
+            entry is not changed.
+        :rtype: string, or None
+
+        """
+        entry = self.entries.get(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+
+        if stat is None or not os.path.isfile(path):
+            if entry is None:
+                return None
+            del self.entries[path]
+            return 'removed'
+
+        identity = get_identity(stat)
+        if entry is not None and entry.identity == identity:
+            return None
+
+        self.entries[path] = self.scan_file(path, identity, writer)
+        return 'added' if entry is None else 'changed'
+
+    def scan_file(self, path, identity, writer=None):
+        """Parse the file.
+
+        :param path: Path of the file.
+        :type path: string
+
+        :param identity: Identity of the file, see :func:`get_identity`.
+        :type identity: tuple
+
+        :param writer: Writer of the file.
+        :type writer: :class:`mpeg1audio.export.ColumnarWriter`, or None
+
+        :rtype: :class:`CatalogEntry`
+
+        """
+        self.scans += 1
+        mpeg = None
+        statistics = None
+        try:
+            mpeg = MPEGAudio(path, file_pool=self.file_pool,
+                             max_bytes=self.max_bytes, deadline=self.deadline)
+            if self.statistics or self.hash_algorithm:
+                mpeg.parse_all(statistics=self.statistics,
+                               hash_algorithm=self.hash_algorithm)
+                statistics = mpeg.statistics
+            entry = CatalogEntry(identity, mpeg.get_info(), None,
+                                 mpeg.content_hash)
+        except (MPEGAudioHeaderException, BudgetException,
+                utils.FileIdentityException, IOError, OSError), error:
+            entry = CatalogEntry(identity, None, str(error))
+        finally:
+            if mpeg is not None:
+                mpeg.close()
+
+        if writer is not None:
+            writer.write(path, entry, statistics)
+        return entry
+
+    def get_duplicates(self):
+        """Get paths of files having the same audio, by their content hash.
+
+        :return: Lists of two or more paths, sorted, by content hash.
+        :rtype: dict of string: list of string
+
+        """
+        paths = {}
+        for path, entry in self.entries.items():
+            if entry.content_hash is not None:
+                paths.setdefault(entry.content_hash, []).append(path)
+        return dict((content_hash, sorted(hashed_paths)) \
+                    for content_hash, hashed_paths in paths.items() \
+                    if len(hashed_paths) > 1)
+
+    def get_paths_under(self, directory):
+        """Get paths of entries under directory.
+
+        :param directory: Path of the directory.
+        :type directory: string
+
+        :rtype: list of string
+
+        """
+        prefix = os.path.join(os.path.normpath(directory), '')
+        return [path for path in self.entries if path.startswith(prefix)]
+
+    def save(self, file):
+        """Save entries to file.
+
+        :param file: File opened for writing in binary mode.
+        :type file: file object
+
+        """
+        pickle.dump(self.entries, file, pickle.HIGHEST_PROTOCOL)
+
+    def load(self, file):
+        """Load entries saved by :func:`save`, replacing current entries.
+
+        :param file: File opened for reading in binary mode.
+        :type file: file object
+
+        """
+        self.entries = pickle.load(file)
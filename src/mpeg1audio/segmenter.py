@@ -0,0 +1,204 @@
+"""
+Frame aligned segmenting of MPEGAudio, for HTTP Live Streaming (HLS) style
+playlists.
+
+Segments are found in a single pass over the frame headers, nothing is
+decoded. Segments can be written to own files, copied by the kernel when
+possible, or referred as byte ranges of the original file.
+
+Usage example, playlist referring byte ranges of the original file::
+
+    from mpeg1audio import MPEGAudio, segmenter
+    mpeg = MPEGAudio('data/song.mp3')
+    segments = segmenter.get_segments(mpeg, 10)
+    segmenter.write_playlist(segments, open('song.m3u8', 'w'), uri='song.mp3')
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio import utils
+import math
+import os
+
+class Segment(object):
+    """Frame aligned segment of MPEGAudio."""
+
+    def __init__(self, number, offset, sample_rate):
+        """
+        :param number: Number of the segment, first segment is ``0``.
+        :type number: int
+
+        :param offset: Offset of the first frame of segment in file.
+        :type offset: int
+
+        :param sample_rate: Sample rate in Hz.
+        :type sample_rate: int
+
+        """
+        self.number = number
+        """Number of the segment.
+
+        :type: int"""
+
+        self.offset = offset
+        """Offset of the first frame of segment in file.
+
+        :type: int"""
+
+        self.size = 0
+        """Size of segment in bytes.
+
+        :type: int"""
+
+        self.frame_count = 0
+        """Count of frames in segment.
+
+        :type: int"""
+
+        self.sample_count = 0
+        """Count of samples in segment.
+
+        :type: int"""
+
+        self.sample_rate = sample_rate
+        """Sample rate in Hz.
+
+        :type: int"""
+
+        self.uri = None
+        """URI of the written segment file, ``None`` if segment refers to byte
+        range of the original file.
+
+        :type: string, or None"""
+
+    def _get_duration(self):
+        """Duration getter.
+
+        :rtype: float
+
+        """
+        return float(self.sample_count) / self.sample_rate
+
+    duration = property(_get_duration)
+    """Exact duration in seconds.
+
+    :type: float
+    """
+
+def get_segments(mpeg, target_duration):
+    """Get frame aligned segments of MPEGAudio in a single pass.
+
+    Segment ends at the first frame boundary where its duration reaches the
+    target duration. Frame holding Xing or VBRI header is not included.
+
+    :param mpeg: MPEGAudio to be segmented.
+    :type mpeg: :class:`mpeg1audio.MPEGAudio`
+
+    :param target_duration: Target duration of segment in seconds.
+    :type target_duration: number
+
+    :return: Generator yielding segments.
+    :rtype: generator of :class:`Segment`
+
+    """
+    target_samples = target_duration * mpeg.sample_rate
+    frames = iter(mpeg.frames)
+
+    # Frame holding the VBR header is not audio.
+    if mpeg.xing is not None or mpeg.vbri is not None:
+        for frame in frames:
+            break
+
+    segment = None
+    for frame in frames:
+        if segment is None:
+            segment = Segment(0, frame.offset, mpeg.sample_rate)
+        elif segment.sample_count >= target_samples:
+            yield segment
+            segment = Segment(segment.number + 1, frame.offset,
+                              mpeg.sample_rate)
+
+        segment.size += frame.size
+        segment.frame_count += 1
+        segment.sample_count += frame.samples_per_frame
+
+    if segment is not None:
+        yield segment
+
+def write_segments(mpeg, segments, directory, name_format='segment%05d.mp3'):
+    """Write segments to own files.
+
+    Frames are copied through the source of MPEGAudio with
+    :func:`mpeg1audio.utils.copy_range`, by the kernel when the file has a
+    descriptor.
+
+    :param mpeg: MPEGAudio the segments are from.
+    :type mpeg: :class:`mpeg1audio.MPEGAudio`
+
+    :param segments: Segments to be written.
+    :type segments: iterable of :class:`Segment`
+
+    :param directory: Directory where to write segment files.
+    :type directory: string
+
+    :param name_format: Name of segment file, formatted with the number of
+        segment.
+    :type name_format: string
+
+    :return: Generator yielding written segments, having :attr:`Segment.uri`
+        set to the name of the file.
+    :rtype: generator of :class:`Segment`
+
+    """
+    for segment in segments:
+        segment.uri = name_format % segment.number
+        segment_file = open(os.path.join(directory, segment.uri), 'wb')
+        try:
+            utils.copy_range(mpeg._source, segment_file, segment.offset,
+                             segment.size)
+        finally:
+            segment_file.close()
+        yield segment
+
+def write_playlist(segments, file, uri=None):
+    """Write HLS playlist of segments.
+
+    Segments without :attr:`Segment.uri` are referred as byte ranges of the
+    given URI.
+
+    :param segments: Segments of the playlist.
+    :type segments: iterable of :class:`Segment`
+
+    :param file: File where to write the playlist.
+    :type file: file object
+
+    :param uri: URI of the original file, required if segments are not
+        written to own files.
+    :type uri: string
+
+    """
+    segments = list(segments)
+    target_duration = max([int(math.ceil(segment.duration)) \
+                           for segment in segments] or [0])
+
+    file.write('#EXTM3U\n')
+    file.write('#EXT-X-VERSION:4\n')
+    file.write('#EXT-X-TARGETDURATION:%d\n' % target_duration)
+    file.write('#EXT-X-MEDIA-SEQUENCE:0\n')
+    file.write('#EXT-X-PLAYLIST-TYPE:VOD\n')
+    for segment in segments:
+        file.write('#EXTINF:%.6f,\n' % segment.duration)
+        if segment.uri is None:
+            file.write('#EXT-X-BYTERANGE:%d@%d\n' % (segment.size,
+                                                    segment.offset))
+            file.write('%s\n' % uri)
+        else:
+            file.write('%s\n' % segment.uri)
+    file.write('#EXT-X-ENDLIST\n')
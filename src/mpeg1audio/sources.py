@@ -0,0 +1,820 @@
+"""
+Positional read sources.
+
+Sources read ranges of bytes at given offsets, they do not have a shared
+cursor like file objects. All parsing of the package reads through sources,
+given file objects are wrapped with :func:`get_source`.
+
+Source is any object implementing ``read_at(offset, length)`` and ``size()``.
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+# Re-define built-in:
+# pylint: disable-msg=W0622
+
+from collections import OrderedDict
+import ctypes
+import errno
+import os
+import time
+
+COALESCE_GAP = 262144
+"""Ranges closer than this are coalesced to one read by
+:class:`PrefetchSource`. Reading the gap is assumed cheaper than a round-trip.
+
+:type: int"""
+
+def _get_libc_function(names, argtypes):
+    """Get function of the C library, for Pythons without it in :mod:`os`.
+
+    :param names: Names of the function, first found is used.
+    :type names: tuple of string
+
+    :param argtypes: Types of the arguments.
+    :type argtypes: tuple of ctypes types
+
+    :return: Function of the C library, ``None`` if not available.
+    :rtype: ctypes function, or None
+
+    """
+    try:
+        # Symbols of the process, libc included, without searching libraries.
+        libc = ctypes.CDLL(None, use_errno=True)
+    except (OSError, TypeError):
+        return None
+    for name in names:
+        function = getattr(libc, name, None)
+        if function is not None:
+            function.argtypes = argtypes
+            function.restype = ctypes.c_ssize_t
+            return function
+    return None
+
+def _call_libc(function, *args):
+    """Call function of the C library, retrying interrupted calls.
+
+    :return: Non-negative return value of the function.
+    :rtype: int
+
+    :raise OSError: Raised if the function fails.
+
+    """
+    while True:
+        result = function(*args)
+        if result >= 0:
+            return result
+        error = ctypes.get_errno()
+        if error != errno.EINTR:
+            raise OSError(error, os.strerror(error))
+
+_libc_pread = None if hasattr(os, 'pread') else \
+    _get_libc_function(('pread64', 'pread'),
+                       (ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t,
+                        ctypes.c_longlong))
+"""``pread`` of the C library, used when :func:`os.pread` is not available."""
+
+_libc_copy_file_range = None if hasattr(os, 'copy_file_range') else \
+    _get_libc_function(('copy_file_range',),
+                       (ctypes.c_int, ctypes.POINTER(ctypes.c_longlong),
+                        ctypes.c_int, ctypes.POINTER(ctypes.c_longlong),
+                        ctypes.c_size_t, ctypes.c_uint))
+"""``copy_file_range`` of the C library, used when
+:func:`os.copy_file_range` is not available."""
+
+_libc_sendfile = None if hasattr(os, 'sendfile') else \
+    _get_libc_function(('sendfile64', 'sendfile'),
+                       (ctypes.c_int, ctypes.c_int,
+                        ctypes.POINTER(ctypes.c_longlong), ctypes.c_size_t))
+"""``sendfile`` of the C library, used when :func:`os.sendfile` is not
+available."""
+
+HAS_PREAD = hasattr(os, 'pread') or _libc_pread is not None
+"""Are positional reads of descriptors available, see :func:`pread`.
+
+:type: bool"""
+
+def pread(fileno, length, offset):
+    """Read bytes at offset of descriptor, without changing its position.
+
+    Uses :func:`os.pread`, or ``pread`` of the C library through
+    :mod:`ctypes` when :mod:`os` does not have it, as in Python 2.
+
+    :param fileno: Descriptor of the file.
+    :type fileno: int
+
+    :param length: Count of bytes, less is returned at the end of file.
+    :type length: int
+
+    :param offset: Offset in file.
+    :type offset: int
+
+    :rtype: string
+
+    :raise OSError: Raised if reading fails, or positional reads are not
+        available.
+
+    """
+    if _libc_pread is None:
+        if not hasattr(os, 'pread'):
+            raise OSError(errno.ENOSYS, 'pread is not available')
+        return os.pread(fileno, length, offset)
+
+    buffer = ctypes.create_string_buffer(length)
+    count = _call_libc(_libc_pread, fileno, buffer, length, offset)
+    return ctypes.string_at(buffer, count)
+
+def copy_file_range(source_fileno, destination_fileno, count, offset):
+    """Copy bytes at offset of source descriptor to the position of
+    destination descriptor, by the kernel.
+
+    Uses :func:`os.copy_file_range`, or ``copy_file_range`` of the C library
+    through :mod:`ctypes` when :mod:`os` does not have it, as in Python 2.
+
+    :param source_fileno: Descriptor of the file read.
+    :type source_fileno: int
+
+    :param destination_fileno: Descriptor of the file written.
+    :type destination_fileno: int
+
+    :param count: Count of bytes.
+    :type count: int
+
+    :param offset: Offset in source file.
+    :type offset: int
+
+    :return: Count of bytes copied, ``0`` at the end of file.
+    :rtype: int
+
+    :raise OSError: Raised if copying fails, or is not available.
+
+    """
+    if _libc_copy_file_range is None:
+        if not hasattr(os, 'copy_file_range'):
+            raise OSError(errno.ENOSYS, 'copy_file_range is not available')
+        return os.copy_file_range(source_fileno, destination_fileno, count,
+                                  offset)
+
+    offset = ctypes.c_longlong(offset)
+    return _call_libc(_libc_copy_file_range, source_fileno,
+                      ctypes.byref(offset), destination_fileno, None, count, 0)
+
+def sendfile(destination_fileno, source_fileno, offset, count):
+    """Copy bytes at offset of source descriptor to the position of
+    destination descriptor, by the kernel.
+
+    Uses :func:`os.sendfile`, or ``sendfile`` of the C library through
+    :mod:`ctypes` when :mod:`os` does not have it, as in Python 2.
+
+    :param destination_fileno: Descriptor of the file written.
+    :type destination_fileno: int
+
+    :param source_fileno: Descriptor of the file read.
+    :type source_fileno: int
+
+    :param offset: Offset in source file.
+    :type offset: int
+
+    :param count: Count of bytes.
+    :type count: int
+
+    :return: Count of bytes copied, ``0`` at the end of file.
+    :rtype: int
+
+    :raise OSError: Raised if copying fails, or is not available.
+
+    """
+    if _libc_sendfile is None:
+        if not hasattr(os, 'sendfile'):
+            raise OSError(errno.ENOSYS, 'sendfile is not available')
+        return os.sendfile(destination_fileno, source_fileno, offset, count)
+
+    offset = ctypes.c_longlong(offset)
+    return _call_libc(_libc_sendfile, destination_fileno, source_fileno,
+                      ctypes.byref(offset), count)
+
+def get_fileno(file):
+    """Get descriptor of file object or source, for copying by the kernel.
+
+    Caches are skipped, sources charging a budget or reading elsewhere have
+    no descriptor.
+
+    :param file: File object, or source.
+    :type file: file object, or source
+
+    :return: Descriptor, ``None`` if not available.
+    :rtype: int, or None
+
+    """
+    while isinstance(file, BlockCache):
+        file = file.source
+    if isinstance(file, DescriptorSource):
+        return file.fileno
+    if hasattr(file, 'read_at'):
+        return None
+    try:
+        return file.fileno()
+    except (AttributeError, IOError, ValueError):
+        return None
+
+def get_source(file):
+    """Get source of file object.
+
+    Files having descriptor are read with :func:`pread` when available,
+    other file objects by seeking and reading. Objects which already are
+    sources are returned as is.
+
+    :param file: File object, or source.
+    :type file: file object, or source
+
+    :return: Source reading the file.
+    :rtype: :class:`FileSource`, :class:`DescriptorSource`, or source
+
+    """
+    if hasattr(file, 'read_at'):
+        return file
+
+    if HAS_PREAD:
+        try:
+            file.fileno()
+        except (AttributeError, IOError, ValueError):
+            pass
+        else:
+            return DescriptorSource(file)
+
+    return FileSource(file)
+
+BLOCK_SIZE = 4096
+"""Size of aligned blocks in :class:`BlockCache`.
+
+:type: int"""
+
+BLOCK_CACHE_SIZE = 262144
+"""Byte budget of :class:`BlockCache`.
+
+:type: int"""
+
+BLOCK_CACHE_MAX_READ = 65536
+"""Reads longer than this bypass :class:`BlockCache`, such as reads of
+iterating all frames, which would only evict the cached blocks.
+
+:type: int"""
+
+def coalesce_ranges(ranges, gap=None):
+    """Coalesce ranges to fewest ranges covering them.
+
+        >>> coalesce_ranges([(1000, 2000), (0, 100), (2500, 3000)], gap=500)
+        [(0, 100), (1000, 3000)]
+
+    :param ranges: Ranges as tuples of begin and end offsets.
+    :type ranges: iterable of (int, int)
+
+    :param gap: Ranges closer than this are coalesced, ``None`` defaults to
+        :const:`COALESCE_GAP`.
+    :type gap: int
+
+    :rtype: list of (int, int)
+
+    """
+    if gap is None:
+        gap = COALESCE_GAP
+
+    coalesced = []
+    for begin, end in sorted(ranges):
+        if coalesced and begin - coalesced[-1][1] <= gap:
+            coalesced[-1] = (coalesced[-1][0], max(coalesced[-1][1], end))
+        else:
+            coalesced.append((begin, end))
+    return coalesced
+
+class FileSource(object):
+    """Source reading file object by seeking and reading."""
+
+    def __init__(self, file):
+        """
+        :param file: File object.
+        :type file: file object
+
+        """
+        self.file = file
+        """File object.
+
+        :type: file object"""
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        """
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        offset = self.file.tell()
+        self.file.seek(0, 2)
+        size = self.file.tell()
+        self.file.seek(offset)
+        return size
+
+class DescriptorSource(object):
+    """Source reading descriptor of file object with :func:`pread`.
+
+    Reads are unbuffered, and do not change the position of the file object.
+
+    """
+    def __init__(self, file):
+        """
+        :param file: File object having a descriptor.
+        :type file: file object
+
+        """
+        self.file = file
+        """File object.
+
+        :type: file object"""
+
+        self.fileno = file.fileno()
+        """Descriptor of the file.
+
+        :type: int"""
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        """
+        data = pread(self.fileno, length, offset)
+        if len(data) == length or not data:
+            return data
+
+        # Short reads are allowed before the end of file.
+        chunks = [data]
+        read = len(data)
+        while read < length:
+            data = pread(self.fileno, length - read, offset + read)
+            if not data:
+                break
+            chunks.append(data)
+            read += len(data)
+        return b''.join(chunks)
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        return os.fstat(self.fileno).st_size
+
+class MemorySource(object):
+    """Source reading bytes in memory, optionally with latency of each read.
+
+    Stands in for remote sources in tests.
+
+    """
+    def __init__(self, data, latency=0):
+        """
+        :param data: Bytes of the file.
+        :type data: string
+
+        :param latency: Seconds slept on each read.
+        :type latency: float
+
+        """
+        self.data = data
+        """Bytes of the file.
+
+        :type: string"""
+
+        self.latency = latency
+        """Seconds slept on each read.
+
+        :type: float"""
+
+        self.reads = 0
+        """Count of reads.
+
+        :type: int"""
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        """
+        self.reads += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.data[offset:offset + length]
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        return len(self.data)
+
+class PrefetchSource(object):
+    """Source reading planned ranges of another source with fewest reads.
+
+    Planned ranges are coalesced, and read with one read each. Reads within
+    the prefetched ranges are served from memory, others are read from the
+    source. Every access to the source is counted as a round-trip.
+
+    """
+    def __init__(self, source, gap=None):
+        """
+        :param source: Source being read, e.g. in remote storage.
+        :type source: source
+
+        :param gap: Ranges closer than this are coalesced, ``None`` defaults
+            to :const:`COALESCE_GAP`.
+        :type gap: int
+
+        """
+        self.source = source
+        """Source being read.
+
+        :type: source"""
+
+        self.gap = gap
+        """Ranges closer than this are coalesced.
+
+        :type: int, or None"""
+
+        self.round_trips = 0
+        """Count of accesses to the source.
+
+        :type: int"""
+
+        self._size = None
+        """Size of the source, asked once.
+
+        :type: int, or None"""
+
+        self._buffers = []
+        """Prefetched ranges, as tuples of offset and data.
+
+        :type: list of (int, string)"""
+
+    def prefetch(self, ranges):
+        """Read planned ranges.
+
+        :param ranges: Ranges as tuples of begin and end offsets, clipped to
+            the size of source.
+        :type ranges: iterable of (int, int)
+
+        """
+        size = self.size()
+        ranges = [(max(begin, 0), min(end, size)) for begin, end in ranges]
+        ranges = [(begin, end) for begin, end in ranges if begin < end]
+        for begin, end in coalesce_ranges(ranges, self.gap):
+            if self._get_buffered(begin, end - begin) is None:
+                self.round_trips += 1
+                self._buffers.append((begin,
+                                      self.source.read_at(begin, end - begin)))
+
+    def _get_buffered(self, offset, length):
+        """Get bytes within prefetched ranges.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes.
+        :type length: int
+
+        :return: Bytes, ``None`` if range is not prefetched.
+        :rtype: string, or None
+
+        """
+        for buffer_offset, data in self._buffers:
+            buffer_end = buffer_offset + len(data)
+            if buffer_offset <= offset and \
+               (offset + length <= buffer_end or buffer_end == self._size):
+                return data[offset - buffer_offset:
+                            offset - buffer_offset + length]
+        return None
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        """
+        data = self._get_buffered(offset, length)
+        if data is None:
+            self.round_trips += 1
+            data = self.source.read_at(offset, length)
+        return data
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        if self._size is None:
+            self.round_trips += 1
+            self._size = self.source.size()
+        return self._size
+
+class BlockCache(object):
+    """Source caching aligned blocks of another source.
+
+    Blocks are evicted least recently used first, when the byte budget is
+    exceeded. Consecutive missing blocks of a read are read from the source
+    with one read.
+
+    """
+    def __init__(self, source, block_size=None, max_bytes=None,
+                 max_read=None):
+        """
+        :param source: Source being cached.
+        :type source: source
+
+        :param block_size: Size of blocks, ``None`` defaults to
+            :const:`BLOCK_SIZE`.
+        :type block_size: int
+
+        :param max_bytes: Byte budget, ``None`` defaults to
+            :const:`BLOCK_CACHE_SIZE`.
+        :type max_bytes: int
+
+        :param max_read: Reads longer than this bypass the cache, ``None``
+            defaults to :const:`BLOCK_CACHE_MAX_READ`.
+        :type max_read: int
+
+        """
+        self.source = source
+        """Source being cached.
+
+        :type: source"""
+
+        self.block_size = block_size or BLOCK_SIZE
+        """Size of blocks.
+
+        :type: int"""
+
+        self.max_bytes = max_bytes or BLOCK_CACHE_SIZE
+        """Byte budget.
+
+        :type: int"""
+
+        self.max_read = max_read or BLOCK_CACHE_MAX_READ
+        """Reads longer than this bypass the cache.
+
+        :type: int"""
+
+        self.hits = 0
+        """Count of blocks read from the cache.
+
+        :type: int"""
+
+        self.misses = 0
+        """Count of blocks read from the source.
+
+        :type: int"""
+
+        self._blocks = OrderedDict()
+        """Cached blocks by number, least recently used first.
+
+        :type: dict of int: string"""
+
+        self._bytes = 0
+        """Bytes in cached blocks.
+
+        :type: int"""
+
+        self._size = None
+        """Size of the source, asked once.
+
+        :type: int, or None"""
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        """
+        if length <= 0 or length > self.max_read:
+            return self.source.read_at(offset, length)
+
+        block_size = self.block_size
+        first = offset // block_size
+        last = (offset + length - 1) // block_size
+
+        blocks = []
+        number = first
+        while number <= last:
+            block = self._blocks.pop(number, None)
+            if block is not None:
+                self._blocks[number] = block
+                self.hits += 1
+                blocks.append(block)
+                number += 1
+            else:
+                # Read the run of missing blocks with one read
+                run_end = number + 1
+                while run_end <= last and run_end not in self._blocks:
+                    run_end += 1
+                data = self.source.read_at(number * block_size,
+                                           (run_end - number) * block_size)
+                for position in range(0, (run_end - number) * block_size,
+                                      block_size):
+                    block = data[position:position + block_size]
+                    self.misses += 1
+                    blocks.append(block)
+                    if block:
+                        self._add(number, block)
+                    number += 1
+                    if len(block) < block_size:
+                        break
+
+            if len(blocks[-1]) < block_size:
+                # End of file
+                break
+
+        data = b''.join(blocks)
+        begin = offset - first * block_size
+        return data[begin:begin + length]
+
+    def _add(self, number, block):
+        """Add block, and evict blocks exceeding the byte budget.
+
+        :param number: Number of the block.
+        :type number: int
+
+        :param block: Data of the block.
+        :type block: string
+
+        """
+        self._blocks[number] = block
+        self._bytes += len(block)
+        while self._bytes > self.max_bytes:
+            self._bytes -= len(self._blocks.popitem(last=False)[1])
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        if self._size is None:
+            self._size = self.source.size()
+        return self._size
+
+class Budget(object):
+    """Budget of bytes read and time, shared by the reads of parsing.
+
+    Exceeding the budget raises :exc:`BudgetException` on the next read, so
+    parsing of an adversarial file stops within one read of the budget. The
+    deadline is checked also above caches, see :func:`check`.
+
+    """
+    def __init__(self, max_bytes=None, deadline=None):
+        """
+        :param max_bytes: Maximum of bytes read, ``None`` is unlimited.
+        :type max_bytes: int, or None
+
+        :param deadline: Seconds from now, ``None`` is unlimited.
+        :type deadline: float, or None
+
+        """
+        self.max_bytes = max_bytes
+        """Maximum of bytes read.
+
+        :type: int, or None"""
+
+        self.deadline = None
+        """Time when the budget ends, as in :func:`time.time`.
+
+        :type: float, or None"""
+
+        if deadline is not None:
+            self.deadline = time.time() + deadline
+
+        self.bytes_read = 0
+        """Count of bytes read.
+
+        :type: int"""
+
+    def charge(self, length):
+        """Charge read from the budget.
+
+        :param length: Count of bytes about to be read.
+        :type length: int
+
+        :raise BudgetException: Raised if the read would exceed the budget.
+
+        """
+        if self.max_bytes is not None and \
+           self.bytes_read + length > self.max_bytes:
+            raise BudgetException('Read budget of %d bytes exceeded' % \
+                                  self.max_bytes)
+        self.check()
+        self.bytes_read += length
+
+    def check(self):
+        """Check the deadline, done also when reads are served from caches.
+
+        :raise BudgetException: Raised if the deadline is exceeded.
+
+        """
+        if self.deadline is not None and time.time() > self.deadline:
+            raise BudgetException('Deadline exceeded')
+
+class BudgetSource(object):
+    """Source charging reads of another source from a budget."""
+
+    def __init__(self, source, budget):
+        """
+        :param source: Source being read.
+        :type source: source
+
+        :param budget: Budget charged.
+        :type budget: :class:`Budget`
+
+        """
+        self.source = source
+        """Source being read.
+
+        :type: source"""
+
+        self.budget = budget
+        """Budget charged.
+
+        :type: :class:`Budget`"""
+
+    def read_at(self, offset, length):
+        """Read bytes at offset.
+
+        :param offset: Offset in file.
+        :type offset: int
+
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+
+        :rtype: string
+
+        :raise BudgetException: Raised if the read would exceed the budget.
+
+        """
+        self.budget.charge(length)
+        return self.source.read_at(offset, length)
+
+    def size(self):
+        """Size of file.
+
+        :rtype: int
+
+        """
+        return self.source.size()
+
+class BudgetException(Exception):
+    """Raised when reading would exceed the budget of bytes or time."""
+    pass
@@ -1,7 +1,13 @@
 """
 Utility helpers.
 """
+from collections import OrderedDict
+from mpeg1audio import sources
+from mpeg1audio.sources import get_source
+import errno
 import os
+import struct
+import threading
 
 # Pylint disable settings:
 # ------------------------
@@ -19,54 +25,69 @@ DEFAULT_CHUNK_SIZE = 8192
 
 :type: int"""
 
+FILE_POOL_SIZE = 64
+"""Maximum of open descriptors in :class:`FilePool`, if not given.
+
+:type: int"""
+
 def get_filesize(file):
     """Get file size from file object.
     
-    :param file: File object, returned e.g. by :func:`open`.
-    :type file: file object
+    :param file: File object, returned e.g. by :func:`open`, or source.
+    :type file: file object, or source
     
     :return: File size in bytes.
     :rtype: int
     
     """
-    offset = file.tell()
-    file.seek(0, 2)
-    filesize = file.tell()
-    file.seek(offset)
-    return filesize
+    return get_source(file).size()
+
+def get_identity(stat):
+    """Get identity of file, changes when the file is changed or replaced.
+    
+    :param stat: Status of the file, as returned by :func:`os.stat`.
+    :type stat: stat result
+    
+    :return: Device, inode, size and modification time.
+    :rtype: tuple
+    
+    """
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime)
 
 def chunked_reader(file, chunk_size=None, start_position= -1,
                     max_chunks= -1, reset_offset=True):
     """Reads file in chunks for performance in handling of big files.
     
-    :param file: File to be read, e.g. returned by :func:`open`.
-    :type file: file object
+    Chunks are read with positional reads of the source, see
+    :func:`mpeg1audio.sources.get_source`.
+    
+    :param file: File to be read, e.g. returned by :func:`open`, or source.
+    :type file: file object, or source
     
     :param chunk_size: Read in this sized chunks, ``None`` defaults to 
         :const:`DEFAULT_CHUNK_SIZE`.
     :type chunk_size: int
     
     :param start_position: Start position of the chunked reading, ``-1`` means
-        that the file is not being seeked to new position.
+        the current position of the file object.
     :type start_position: int
     
     :param max_chunks: Maximum amount of chunks, ``-1`` means *infinity*.
     :type max_chunks: int
     
-    :param reset_offset: Resets the offset of seeking between chunks. Used
-        to correct the cursor position when file seeks / reads occurs inside 
-        chunk iteration.
+    :param reset_offset: Not used, positional reads are not affected by seeks
+        and reads occurring inside chunk iteration.
     :type reset_offset: bool
     
     :return: Generator of file chunks as tuples of chunk offset and chunk.
     :rtype: generator of (chunk_offset, chunk)
     
     """
-    if start_position != -1:
-        file.seek(start_position)
+    if start_position == -1:
+        start_position = file.tell()
 
-    offset = file.tell()
-    chunk = ""
+    source = get_source(file)
+    offset = max(start_position, 0)
     chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
 
     i = 0
@@ -74,16 +95,160 @@ def chunked_reader(file, chunk_size=None, start_position= -1,
         if 0 < max_chunks <= i:
             break
 
-        if reset_offset:
-            file.seek(offset + len(chunk))
+        chunk = source.read_at(offset, chunk_size)
+        if not chunk:
+            break
+        yield (offset, chunk)
+        offset += len(chunk)
+        i += 1
 
-        offset = file.tell()
-        chunk = file.read(chunk_size)
+def reverse_chunked_reader(file, end_position, chunk_size=None,
+                           max_chunks= -1):
+    """Reads file backwards in chunks, from given position to the beginning.
+    
+    :param file: File to be read, e.g. returned by :func:`open`, or source.
+    :type file: file object, or source
+    
+    :param end_position: End position of the reading, first chunk ends here.
+    :type end_position: int
+    
+    :param chunk_size: Read in this sized chunks, ``None`` defaults to 
+        :const:`DEFAULT_CHUNK_SIZE`.
+    :type chunk_size: int
+    
+    :param max_chunks: Maximum amount of chunks, ``-1`` means *infinity*.
+    :type max_chunks: int
+    
+    :return: Generator of file chunks as tuples of chunk offset and chunk, 
+        chunks are in reversed order but the data within chunk is not.
+    :rtype: generator of (chunk_offset, chunk)
+    
+    """
+    source = get_source(file)
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+    i = 0
+    while end_position > 0:
+        if 0 < max_chunks <= i:
+            break
+
+        offset = max(end_position - chunk_size, 0)
+        chunk = source.read_at(offset, end_position - offset)
         if not chunk:
             break
         yield (offset, chunk)
+        end_position = offset
         i += 1
 
+def copy_range(source, destination, offset, length, chunk_size=None):
+    """Copy range of bytes from source file to the end of destination file.
+    
+    Uses ``copy_file_range`` or ``sendfile`` when the source has descriptor, 
+    so that the data is copied by the kernel and never read to Python, see 
+    :func:`mpeg1audio.sources.copy_file_range`. Otherwise falls back to 
+    chunked reading and writing. Copied bytes bypass the block cache.
+    
+    :param source: File to be read, e.g. returned by :func:`open`, or source.
+    :type source: file object, or source
+    
+    :param destination: File to be written.
+    :type destination: file object
+    
+    :param offset: Offset of the range in source.
+    :type offset: int
+    
+    :param length: Length of the range in bytes.
+    :type length: int
+    
+    :param chunk_size: Chunk size of fallback copying, ``None`` defaults to 
+        :const:`DEFAULT_CHUNK_SIZE`.
+    :type chunk_size: int
+    
+    :return: Count of bytes copied, less than length if the source ended.
+    :rtype: int
+    
+    """
+    while isinstance(source, sources.BlockCache):
+        source = source.source
+
+    copied = 0
+    source_fd = sources.get_fileno(source)
+    try:
+        destination_fd = destination.fileno()
+    except (AttributeError, IOError, ValueError):
+        source_fd = None
+
+    kernel_copiers = []
+    if source_fd is not None:
+        kernel_copiers = [
+            lambda count: sources.copy_file_range(source_fd, destination_fd,
+                                                  count, offset + copied),
+            lambda count: sources.sendfile(destination_fd, source_fd,
+                                           offset + copied, count),
+        ]
+        destination.flush()
+
+    for kernel_copy in kernel_copiers:
+        try:
+            while copied < length:
+                count = kernel_copy(length - copied)
+                if not count:
+                    break
+                copied += count
+            return copied
+        except OSError, error:
+            # Unsupported by file system, try next one unless partially copied
+            if copied or error.errno not in (errno.EXDEV, errno.ENOSYS,
+                                             errno.EINVAL, errno.EBADF,
+                                             getattr(errno, 'EOPNOTSUPP', 0)):
+                raise
+
+    for chunk_offset, chunk in chunked_reader(source, chunk_size=chunk_size,
+                                              start_position=offset):
+        chunk = chunk[:length - copied]
+        destination.write(chunk)
+        copied += len(chunk)
+        if copied >= length:
+            break
+    return copied
+
+def get_footer_size(tail):
+    """Get size of tags at the end of file.
+    
+    Recognizes ID3v1, and Lyrics3v2 and APEv2 tags preceding it.
+    
+        >>> get_footer_size('audio' + 'TAG' + ' ' * 125)
+        128
+        >>> get_footer_size('audio')
+        0
+    
+    :param tail: Tail of the file.
+    :type tail: string
+    
+    :return: Size of tags in bytes, it may exceed the length of the tail.
+    :rtype: int
+    
+    """
+    size = 0
+    if len(tail) >= 128 and tail[-128:-125] == 'TAG':
+        size += 128
+
+    end = len(tail) - size
+    if end >= 15 and tail[end - 9:end] == 'LYRICS200' and \
+       tail[end - 15:end - 9].isdigit():
+        size += int(tail[end - 15:end - 9]) + 15
+
+    end = len(tail) - size
+    if end >= 32 and tail[end - 32:end - 24] == 'APETAGEX':
+        tag_size, = struct.unpack('<I', tail[end - 20:end - 16])
+        flags, = struct.unpack('<I', tail[end - 12:end - 8])
+        size += tag_size
+        if flags & 0x80000000:
+            # Has header
+            size += 32
+
+    return size
+
 def find_all_overlapping(string, occurrence):
     """Find all overlapping occurrences.
     
@@ -197,6 +362,51 @@ def genmin(generator, min):
 
     return join_iterators(cache, generator)
 
+class StopOnException(object):
+    """Iterable ending when the iterated raises given exceptions.
+    
+    The caught exception is kept, so the caller can tell a complete iteration
+    from a stopped one.
+    
+        >>> def numbers():
+        ...     yield 1
+        ...     raise KeyError()
+        >>> stopping = StopOnException(numbers(), KeyError)
+        >>> list(stopping), stopping.exception is not None
+        ([1], True)
+    
+    """
+    def __init__(self, iterable, exceptions):
+        """
+        :param iterable: Iterated.
+        :type iterable: iterable
+        
+        :param exceptions: Exceptions ending the iteration.
+        :type exceptions: exception class, or tuple of them
+        
+        """
+        self.iterable = iterable
+        """Iterated.
+        
+        :type: iterable"""
+
+        self.exceptions = exceptions
+        """Exceptions ending the iteration.
+        
+        :type: exception class, or tuple of them"""
+
+        self.exception = None
+        """Exception which ended the iteration, ``None`` if not ended by one.
+        
+        :type: exception, or None"""
+
+    def __iter__(self):
+        try:
+            for item in self.iterable:
+                yield item
+        except self.exceptions, error:
+            self.exception = error
+
 def genmax(generator, max):
     """Ensures that generator does not exceed given max when yielding.
     
@@ -268,8 +478,8 @@ class FileOpener(object):
         _filepath = obj.__dict__.get("_filepath", None)
         _file = obj.__dict__.get('_filehandle', None)
 
-        # Try to re-open the closed file
-        if _file and _file.closed:
+        # Try to re-open the closed file, pooled file re-opens on access
+        if _file and _file.closed and not isinstance(_file, PooledFile):
             try:
                 _file = open(self.filepath or _filepath, self.mode or _file.mode)
             except (IOError, os.error):
@@ -278,3 +488,292 @@ class FileOpener(object):
             return _file
 
         return _file
+
+class FilePool(object):
+    """Thread-safe pool of files, with upper bound of open descriptors.
+    
+    Files are opened as :class:`PooledFile` proxies. Descriptors are opened
+    on access, and least recently used descriptors are closed when the bound
+    is exceeded. Re-opened file must be the same file as when first opened,
+    otherwise :exc:`FileIdentityException` is raised.
+    
+    Usage example, sharing the pool between many MPEGAudio objects::
+    
+        pool = FilePool(max_open=128)
+        mpegs = [MPEGAudio(path, file_pool=pool) for path in paths]
+    
+    """
+    def __init__(self, max_open=None, mode='rb'):
+        """
+        :param max_open: Maximum of open descriptors, ``None`` defaults to
+            :const:`FILE_POOL_SIZE`.
+        :type max_open: int
+        
+        :param mode: Opening mode.
+        :type mode: string
+        
+        """
+        self.max_open = max_open or FILE_POOL_SIZE
+        """Maximum of open descriptors.
+        
+        :type: int"""
+
+        self.mode = mode
+        """Opening mode.
+        
+        :type: string"""
+
+        self.opens = 0
+        """Count of descriptors opened.
+        
+        :type: int"""
+
+        self._files = OrderedDict()
+        """Open files by proxy, least recently used first.
+        
+        :type: dict of :class:`PooledFile`: file object"""
+
+        self._lock = threading.Lock()
+        """Lock of the open files."""
+
+    def open(self, path):
+        """Open file proxy, descriptor is opened on the first access.
+        
+        :param path: Path to file.
+        :type path: string
+        
+        :rtype: :class:`PooledFile`
+        
+        """
+        return PooledFile(self, path)
+
+    def _acquire(self, pooled_file):
+        """Get open file of the proxy, and mark it used most recently.
+        
+        Caller must hold the lock of the proxy.
+        
+        :param pooled_file: Proxy of the file.
+        :type pooled_file: :class:`PooledFile`
+        
+        :rtype: file object
+        
+        :raise FileIdentityException: Raised if re-opened file is not the same.
+        :raise IOError: Raised if file cannot be opened.
+        
+        """
+        self._lock.acquire()
+        try:
+            file = self._files.pop(pooled_file, None)
+            if file is not None:
+                self._files[pooled_file] = file
+                return file
+        finally:
+            self._lock.release()
+
+        file = open(pooled_file.name, self.mode)
+        stat = os.fstat(file.fileno())
+        identity = get_identity(stat)
+        if pooled_file.identity is None:
+            pooled_file.identity = identity
+        elif pooled_file.identity != identity:
+            file.close()
+            raise FileIdentityException('File %s has changed since opened' % \
+                                        pooled_file.name)
+
+        self._lock.acquire()
+        try:
+            self.opens += 1
+            self._files[pooled_file] = file
+            self._evict()
+        finally:
+            self._lock.release()
+        return file
+
+    def _evict(self):
+        """Close least recently used descriptors exceeding the bound. 
+        
+        Files being accessed by other threads are skipped, so the bound can be
+        exceeded temporarily. Caller must hold the lock of the pool.
+        
+        """
+        for pooled_file in list(self._files):
+            if len(self._files) <= self.max_open:
+                return
+            if pooled_file._lock.acquire(False):
+                try:
+                    self._files.pop(pooled_file).close()
+                finally:
+                    pooled_file._lock.release()
+
+    def _release(self, pooled_file):
+        """Close descriptor of the proxy, if open.
+        
+        :param pooled_file: Proxy of the file.
+        :type pooled_file: :class:`PooledFile`
+        
+        """
+        self._lock.acquire()
+        try:
+            file = self._files.pop(pooled_file, None)
+        finally:
+            self._lock.release()
+        if file is not None:
+            file.close()
+
+    def close(self):
+        """Close all open descriptors."""
+        self._lock.acquire()
+        try:
+            files = self._files.values()
+            self._files.clear()
+        finally:
+            self._lock.release()
+        for file in files:
+            file.close()
+
+class PooledFile(object):
+    """File proxy of :class:`FilePool`, having its own position.
+    
+    Descriptor is re-opened transparently on access, when it has been closed
+    by the pool, or by :func:`close`.
+    
+    """
+    def __init__(self, pool, name):
+        """
+        :param pool: Pool of the file.
+        :type pool: :class:`FilePool`
+        
+        :param name: Path to file.
+        :type name: string
+        
+        """
+        self.pool = pool
+        """Pool of the file.
+        
+        :type: :class:`FilePool`"""
+
+        self.name = name
+        """Path to file.
+        
+        :type: string"""
+
+        self.mode = pool.mode
+        """Opening mode.
+        
+        :type: string"""
+
+        self.identity = None
+        """Identity of the file when first opened, see :func:`get_identity`.
+        
+        :type: tuple, or None"""
+
+        self._position = 0
+        """Position of the proxy in file.
+        
+        :type: int"""
+
+        self._lock = threading.Lock()
+        """Lock held during access to the file."""
+
+    @property
+    def closed(self):
+        """Is the descriptor closed, by the pool or by :func:`close`.
+        
+        Proxy can still be accessed, descriptor is re-opened on access.
+        
+        :rtype: bool
+        
+        """
+        self.pool._lock.acquire()
+        try:
+            return self not in self.pool._files
+        finally:
+            self.pool._lock.release()
+
+    def read(self, size= -1):
+        """Read from current position.
+        
+        :param size: Count of bytes read, negative reads to the end of file.
+        :type size: int
+        
+        :rtype: string
+        
+        """
+        self._lock.acquire()
+        try:
+            file = self.pool._acquire(self)
+            file.seek(self._position)
+            data = file.read(size)
+            self._position += len(data)
+            return data
+        finally:
+            self._lock.release()
+
+    def read_at(self, offset, length):
+        """Read bytes at offset, position of the proxy is not changed.
+        
+        :param offset: Offset in file.
+        :type offset: int
+        
+        :param length: Count of bytes, less is returned at the end of file.
+        :type length: int
+        
+        :rtype: string
+        
+        """
+        self._lock.acquire()
+        try:
+            return get_source(self.pool._acquire(self)).read_at(offset, length)
+        finally:
+            self._lock.release()
+
+    def size(self):
+        """Size of file.
+        
+        :rtype: int
+        
+        """
+        self._lock.acquire()
+        try:
+            return os.fstat(self.pool._acquire(self).fileno()).st_size
+        finally:
+            self._lock.release()
+
+    def seek(self, offset, whence=0):
+        """Seek to position.
+        
+        :param offset: Offset relative to *whence*.
+        :type offset: int
+        
+        :param whence: ``0`` beginning, ``1`` current position, ``2`` end of
+            file.
+        :type whence: int
+        
+        """
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self.size()
+        if offset < 0:
+            raise IOError(errno.EINVAL, 'Invalid argument')
+        self._position = offset
+
+    def tell(self):
+        """Get current position.
+        
+        :rtype: int
+        
+        """
+        return self._position
+
+    def close(self):
+        """Close the descriptor, file is re-opened on next access."""
+        self._lock.acquire()
+        try:
+            self.pool._release(self)
+        finally:
+            self._lock.release()
+
+class FileIdentityException(IOError):
+    """Raised when re-opened file is not the same file as originally opened."""
+    pass
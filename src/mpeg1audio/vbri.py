@@ -15,6 +15,7 @@ VBRI (Fraunhofer Encoder) Header
 # pylint: disable-msg=W0622
 
 from mpeg1audio import VBRHeader
+from mpeg1audio.sources import get_source
 import struct
 
 class VBRI(VBRHeader):
@@ -40,8 +41,8 @@ class VBRI(VBRHeader):
     def find_and_parse(cls, file, first_frame_offset):
         """Find and parse VBRI header in MPEG File.
         
-        :param file: File object.
-        :type file: file object
+        :param file: File object, or source.
+        :type file: file object, or source
         
         :param first_frame_offset: Offset of first mpeg frame in file.
         :type first_frame_offset: int
@@ -53,9 +54,27 @@ class VBRI(VBRHeader):
             parsed or found.
             
         """
-        file.seek(first_frame_offset)
-        chunk_offset, chunk = file.tell(), file.read(1024)
+        return cls.parse(get_source(file).read_at(first_frame_offset, 1024),
+                         first_frame_offset)
 
+    @classmethod
+    def parse(cls, chunk, chunk_offset=0):
+        """Parse VBRI header from chunk beginning at the first mpeg frame.
+        
+        :param chunk: Chunk of data from the beginning of first mpeg frame,
+            e.g. :attr:`data` of parsed header.
+        :type chunk: string
+        
+        :param chunk_offset: Offset of chunk in file.
+        :type chunk_offset: int
+        
+        :return: VBRI Header in given chunk.
+        :rtype: :class:`VBRI`
+        
+        :raise VBRIHeaderException: Raised if VBRI Header cannot be 
+            parsed or found.
+            
+        """
         beginning_of_vbri = 4 + 32 # Header 4 bytes, VBRI is in 32nd byte.
 
         # If positive match for VBRI
@@ -79,6 +98,7 @@ class VBRI(VBRHeader):
              scale_factor_of_toc, size_per_table, #@UnusedVariable
              frames_per_table) = struct.unpack('>HHHIIHHHH', #@UnusedVariable 
                                                chunk[fcur:fcur + 22])
+            self.data = chunk[:fcur + 22]
 
             # TODO: TOC!
 
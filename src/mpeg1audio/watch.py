@@ -0,0 +1,435 @@
+"""
+Watching directories for changed MPEGAudio files, keeping a catalog updated.
+
+Changes are detected with inotify on Linux, other platforms poll the
+directories. Bursts of events on a file are coalesced, the file is scanned
+once it has been quiet for the debounce time, and scans are rate limited.
+Only files whose identity has changed are parsed again, see
+:class:`mpeg1audio.scanner.Catalog`.
+
+Usage example::
+
+    from mpeg1audio.scanner import Catalog
+    from mpeg1audio.watch import Watcher
+    catalog = Catalog()
+    watcher = Watcher(catalog, 'music/')
+    def changed(path, change):
+        print change, path
+    watcher.run(changed)
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio.utils import get_identity
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+WATCH_DEBOUNCE = 2.0
+"""Seconds a file must be quiet before it is scanned.
+
+:type: float"""
+
+WATCH_RATE_LIMIT = 20.0
+"""Maximum of files scanned per second.
+
+:type: float"""
+
+WATCH_POLL_INTERVAL = 30.0
+"""Seconds between polls of the directories, when inotify is not available.
+
+:type: float"""
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x800
+IN_CLOEXEC = 0x80000
+
+IN_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | \
+                IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | \
+                IN_MOVE_SELF
+"""Events of inotify watched.
+
+:type: int"""
+
+_INOTIFY_EVENT = struct.Struct('iIII')
+"""Fixed part of inotify event: descriptor, mask, cookie and name length."""
+
+class Watcher(object):
+    """Watcher of directories, updating a catalog as files change."""
+
+    def __init__(self, catalog, root, debounce=None, rate_limit=None,
+                 poll_interval=None, use_inotify=None):
+        """
+        :param catalog: Catalog being updated.
+        :type catalog: :class:`mpeg1audio.scanner.Catalog`
+
+        :param root: Watched directory.
+        :type root: string
+
+        :param debounce: Seconds a file must be quiet before it is scanned,
+            ``None`` defaults to :const:`WATCH_DEBOUNCE`.
+        :type debounce: float
+
+        :param rate_limit: Maximum of files scanned per second, ``None``
+            defaults to :const:`WATCH_RATE_LIMIT`.
+        :type rate_limit: float
+
+        :param poll_interval: Seconds between polls, ``None`` defaults to
+            :const:`WATCH_POLL_INTERVAL`.
+        :type poll_interval: float
+
+        :param use_inotify: Use inotify, ``None`` uses it if available.
+        :type use_inotify: bool
+
+        :raise WatchException: Raised if inotify is required but not
+            available.
+
+        """
+        self.catalog = catalog
+        """Catalog being updated.
+
+        :type: :class:`mpeg1audio.scanner.Catalog`"""
+
+        self.root = os.path.normpath(root)
+        """Watched directory.
+
+        :type: string"""
+
+        self.debounce = WATCH_DEBOUNCE if debounce is None else debounce
+        """Seconds a file must be quiet before it is scanned.
+
+        :type: float"""
+
+        self.rate_limit = rate_limit or WATCH_RATE_LIMIT
+        """Maximum of files scanned per second.
+
+        :type: float"""
+
+        self.poll_interval = poll_interval or WATCH_POLL_INTERVAL
+        """Seconds between polls.
+
+        :type: float"""
+
+        self.pending = {}
+        """Paths waiting to be scanned, by time of their latest event.
+
+        :type: dict of string: float"""
+
+        self._tokens = self.rate_limit
+        """Scans allowed now, refilled at the rate limit.
+
+        :type: float"""
+
+        self._refilled = None
+        """Time the tokens were refilled, ``None`` if not yet.
+
+        :type: float, or None"""
+
+        self._inotify = None
+        """Inotify of the root, ``None`` if polling.
+
+        :type: :class:`Inotify`, or None"""
+
+        if use_inotify is not False:
+            try:
+                self._inotify = Inotify(self.root)
+            except WatchException:
+                if use_inotify:
+                    raise
+
+        self._polled = None
+        """Time of the latest poll, ``None`` if not polled yet.
+
+        :type: float, or None"""
+
+    def _get_is_polling(self):
+        """Is polling getter.
+
+        :rtype: bool
+
+        """
+        return self._inotify is None
+
+    is_polling = property(_get_is_polling)
+    """Are the directories polled, instead of using inotify?
+
+    :type: bool
+    """
+
+    def add(self, path, now=None):
+        """Add path to be scanned, when quiet for the debounce time.
+
+        :param path: Path of changed file or directory.
+        :type path: string
+
+        :param now: Time of the event, ``None`` is current time.
+        :type now: float
+
+        """
+        self.pending[path] = time.time() if now is None else now
+
+    def wait(self, timeout):
+        """Wait for changes, adding changed paths to pending paths.
+
+        :param timeout: Maximum of seconds waited.
+        :type timeout: float
+
+        """
+        if self._inotify is not None:
+            paths = self._inotify.read(timeout)
+            now = time.time()
+            if paths is None:
+                # Events are lost, everything must be checked.
+                paths = [self.root]
+            for path in paths:
+                self.add(path, now)
+            return
+
+        now = time.time()
+        if self._polled is not None and now - self._polled < self.poll_interval:
+            time.sleep(min(timeout, self.poll_interval - (now - self._polled)))
+            return
+        self._polled = now
+        for path in self.poll():
+            self.add(path, now)
+
+    def poll(self):
+        """Find files whose identity differs from the catalog.
+
+        :return: Paths of added, changed and removed files.
+        :rtype: list of string
+
+        """
+        catalog = self.catalog
+        entries = catalog.entries
+        paths = []
+        found = set()
+        for directory, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if not catalog.is_scanned(path):
+                    continue
+                found.add(path)
+                try:
+                    identity = get_identity(os.stat(path))
+                except OSError:
+                    continue
+                entry = entries.get(path)
+                if entry is None or entry.identity != identity:
+                    paths.append(path)
+
+        paths.extend(path for path in catalog.get_paths_under(self.root) \
+                     if path not in found)
+        return paths
+
+    def process(self, callback=None, now=None):
+        """Scan pending paths which have been quiet for the debounce time, as
+        many as the rate limit allows.
+
+        :param callback: Called with path and change of each changed entry,
+            see :func:`mpeg1audio.scanner.Catalog.update`.
+        :type callback: callable, or None
+
+        :param now: Current time, ``None`` is current time.
+        :type now: float
+
+        :return: Count of paths scanned.
+        :rtype: int
+
+        """
+        now = time.time() if now is None else now
+        if self._refilled is not None:
+            self._tokens = min(self.rate_limit, self._tokens + \
+                            max(now - self._refilled, 0) * self.rate_limit)
+        self._refilled = now
+
+        quiet = sorted((event_time, path) \
+                       for path, event_time in self.pending.items() \
+                       if now - event_time >= self.debounce)
+        processed = 0
+        for event_time, path in quiet:
+            if self._tokens < 1:
+                break
+            self._tokens -= 1
+            del self.pending[path]
+            processed += 1
+
+            if os.path.isdir(path) or path == self.root:
+                changes = self.catalog.scan(path)
+            elif self.catalog.is_scanned(path) or path in self.catalog.entries:
+                change = self.catalog.update(path)
+                changes = [(path, change)] if change else []
+            else:
+                # Removed or renamed directory, or unrelated file.
+                changes = [(removed, self.catalog.update(removed)) \
+                           for removed in self.catalog.get_paths_under(path)]
+
+            if callback is not None:
+                for changed_path, change in changes:
+                    callback(changed_path, change)
+        return processed
+
+    def run(self, callback=None, until=None, timeout=0.5):
+        """Scan the root, then update the catalog as files change.
+
+        :param callback: Called with path and change of each changed entry.
+        :type callback: callable, or None
+
+        :param until: Called between waits, watching ends when it returns
+            ``True``, ``None`` watches forever.
+        :type until: callable, or None
+
+        :param timeout: Maximum of seconds waited at once.
+        :type timeout: float
+
+        """
+        for path, change in self.catalog.scan(self.root):
+            if callback is not None:
+                callback(path, change)
+        self._polled = time.time()
+
+        try:
+            while until is None or not until():
+                self.wait(timeout)
+                self.process(callback)
+        finally:
+            self.close()
+
+    def close(self):
+        """Close the inotify descriptor, if open."""
+        if self._inotify is not None:
+            self._inotify.close()
+
+class Inotify(object):
+    """Recursive inotify watch of a directory, through :mod:`ctypes`."""
+
+    def __init__(self, root):
+        """
+        :param root: Watched directory.
+        :type root: string
+
+        :raise WatchException: Raised if inotify is not available.
+
+        """
+        name = ctypes.util.find_library('c')
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except (OSError, AttributeError):
+            raise WatchException('Inotify is not available')
+
+        self.fileno = init(IN_NONBLOCK | IN_CLOEXEC)
+        """Descriptor of the inotify.
+
+        :type: int"""
+
+        if self.fileno < 0:
+            raise WatchException('Inotify is not available: %s' % \
+                                 os.strerror(ctypes.get_errno()))
+
+        self.directories = {}
+        """Watched directories by watch descriptor.
+
+        :type: dict of int: string"""
+
+        self.add_tree(root)
+
+    def add_tree(self, root):
+        """Watch directory and its subdirectories.
+
+        :param root: Path of the directory.
+        :type root: string
+
+        """
+        for directory, dirnames, filenames in os.walk(root):
+            descriptor = self._add_watch(self.fileno, directory,
+                                         IN_WATCH_MASK)
+            if descriptor >= 0:
+                self.directories[descriptor] = directory
+
+    def read(self, timeout):
+        """Read events, waiting for them.
+
+        :param timeout: Maximum of seconds waited.
+        :type timeout: float
+
+        :return: Paths having events, ``None`` if events were lost.
+        :rtype: list of string, or None
+
+        """
+        try:
+            readable = select.select([self.fileno], [], [], timeout)[0]
+        except select.error, error:
+            if error.args[0] == errno.EINTR:
+                return []
+            raise
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fileno, 65536)
+        except OSError, error:
+            if error.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+
+        paths = []
+        overflow = False
+        position = 0
+        while position + _INOTIFY_EVENT.size <= len(data):
+            descriptor, mask, cookie, length = \
+                _INOTIFY_EVENT.unpack_from(data, position)
+            position += _INOTIFY_EVENT.size
+            name = data[position:position + length].rstrip('\0')
+            position += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+
+            directory = self.directories.get(descriptor)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.directories[descriptor]
+                continue
+
+            path = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may be created before the watch is added.
+                self.add_tree(path)
+            paths.append(path)
+        return None if overflow else paths
+
+    def close(self):
+        """Close the descriptor."""
+        if self.fileno >= 0:
+            os.close(self.fileno)
+            self.fileno = -1
+
+class WatchException(Exception):
+    """Watch exception."""
+    pass
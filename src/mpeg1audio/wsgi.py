@@ -0,0 +1,443 @@
+"""
+WSGI application serving MPEGAudio files by time and by byte ranges.
+
+Time is given in query string either as ``?t=start``, ``?t=start,end`` (as in
+media fragments, ``npt:`` prefix is allowed) or as ``?start=...&end=...``, all
+in seconds. Time is mapped to frame aligned byte offsets, see
+:func:`mpeg1audio.MPEGAudio.get_time_offset`. Standard HTTP ``Range`` header
+is applied within the selected time range.
+
+Parsed :class:`mpeg1audio.MPEGAudio` objects are cached between requests, so
+their frame indexes and VBR headers are reused until the file changes. Each
+cached object is used by one request at a time, and their descriptors are
+bounded by :class:`mpeg1audio.utils.FilePool`.
+
+Usage example, serving files under :file:`data/`::
+
+    from wsgiref.simple_server import make_server
+    from mpeg1audio.wsgi import MPEGAudioApplication
+    make_server('', 8000, MPEGAudioApplication('data/')).serve_forever()
+
+"""
+
+# Pylint disable settings:
+# ------------------------
+# ToDos, DocStrings:
+# pylint: disable-msg=W0511,W0105
+
+# Unused variable, argument:
+# pylint: disable-msg=W0612,W0613
+
+from mpeg1audio import MPEGAudio, MPEGAudioHeaderException
+from mpeg1audio import utils
+from collections import OrderedDict
+import math
+import os
+import threading
+import urlparse
+
+WSGI_CACHE_SIZE = 256
+"""Count of parsed MPEGAudio objects cached by the application.
+
+:type: int"""
+
+class MPEGAudioApplication(object):
+    """WSGI application serving MPEGAudio files under root directory."""
+
+    def __init__(self, root, cache_size=None, chunk_size=None,
+                 file_pool=None):
+        """
+        :param root: Root directory of served files.
+        :type root: string
+
+        :param cache_size: Count of parsed MPEGAudio objects cached, ``None``
+            defaults to :const:`WSGI_CACHE_SIZE`.
+        :type cache_size: int
+
+        :param chunk_size: Chunk size of response body, ``None`` defaults to
+            :const:`mpeg1audio.utils.DEFAULT_CHUNK_SIZE`.
+        :type chunk_size: int
+
+        :param file_pool: Pool of descriptors of the cached MPEGAudio objects,
+            ``None`` creates pool of :const:`mpeg1audio.utils.FILE_POOL_SIZE`
+            descriptors.
+        :type file_pool: :class:`mpeg1audio.utils.FilePool`
+
+        """
+        self.root = os.path.abspath(root)
+        """Root directory of served files.
+
+        :type: string"""
+
+        self.cache_size = cache_size or WSGI_CACHE_SIZE
+        """Count of parsed MPEGAudio objects cached.
+
+        :type: int"""
+
+        self.chunk_size = chunk_size or utils.DEFAULT_CHUNK_SIZE
+        """Chunk size of response body.
+
+        :type: int"""
+
+        self.file_pool = file_pool or utils.FilePool()
+        """Pool of descriptors of the cached MPEGAudio objects.
+
+        :type: :class:`mpeg1audio.utils.FilePool`"""
+
+        self._cache = OrderedDict()
+        """Parsed MPEGAudio objects, their locks and file identities by path.
+
+        :type: dict of string: (tuple, :class:`mpeg1audio.MPEGAudio`,
+            :class:`threading.Lock`)"""
+
+        self._lock = threading.Lock()
+        """Lock of the cache."""
+
+    def __call__(self, environ, start_response):
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            return self._error(start_response, '405 Method Not Allowed',
+                               [('Allow', 'GET, HEAD')])
+
+        path = self.get_path(environ.get('PATH_INFO', ''))
+        if path is None:
+            return self._error(start_response, '404 Not Found')
+
+        # File changed while being served is a conflict, and it is parsed
+        # again on the next request.
+        try:
+            identity, mpeg, lock = self.get_mpeg(path)
+
+            # Cached MPEGAudio is shared by the requests of the file.
+            lock.acquire()
+            try:
+                begin, end = self.get_time_range(mpeg, environ)
+            finally:
+                lock.release()
+        except MPEGAudioHeaderException:
+            return self._error(start_response, '415 Unsupported Media Type')
+        except (ValueError, OverflowError):
+            return self._error(start_response, '400 Bad Request')
+        except utils.FileIdentityException:
+            self._evict(path)
+            return self._error(start_response, '409 Conflict')
+        except (IOError, OSError):
+            self._evict(path)
+            return self._error(start_response, '404 Not Found')
+
+        status = '200 OK'
+        headers = [('Content-Type', 'audio/mpeg'),
+                   ('Accept-Ranges', 'bytes')]
+
+        length = end - begin
+        byte_range = parse_range(environ.get('HTTP_RANGE'), length)
+        if byte_range is False:
+            return self._error(start_response,
+                               '416 Requested Range Not Satisfiable',
+                               [('Content-Range', 'bytes */%d' % length)])
+        elif byte_range is not None:
+            status = '206 Partial Content'
+            headers.append(('Content-Range', 'bytes %d-%d/%d' % \
+                            (byte_range[0], byte_range[1] - 1, length)))
+            begin, end = begin + byte_range[0], begin + byte_range[1]
+
+        headers.append(('Content-Length', str(end - begin)))
+
+        body = []
+        if method != 'HEAD':
+            try:
+                body = self.get_body(environ, path, begin, end - begin,
+                                     identity)
+            except utils.FileIdentityException:
+                self._evict(path)
+                return self._error(start_response, '409 Conflict')
+            except (IOError, OSError):
+                self._evict(path)
+                return self._error(start_response, '404 Not Found')
+
+        start_response(status, headers)
+        return body
+
+    def get_path(self, path_info):
+        """Get path of file under root directory.
+
+        :param path_info: Path of the request.
+        :type path_info: string
+
+        :return: Path of existing file, ``None`` if file does not exist or is
+            not under root directory.
+        :rtype: string, or None
+
+        """
+        path = os.path.normpath(os.path.join(self.root,
+                                             path_info.lstrip('/')))
+        if not path.startswith(self.root + os.sep) or \
+           not os.path.isfile(path):
+            return None
+        return path
+
+    def get_mpeg(self, path):
+        """Get cached MPEGAudio of the file, parsed again if the file changed.
+
+        MPEGAudio is shared between requests, and must be used only while
+        holding the lock returned with it.
+
+        :param path: Path of the file.
+        :type path: string
+
+        :return: Identity of the file, see
+            :func:`mpeg1audio.utils.get_identity`, MPEGAudio and its lock.
+        :rtype: tuple of (tuple, :class:`mpeg1audio.MPEGAudio`,
+            :class:`threading.Lock`)
+
+        :raise mpeg1audio.MPEGAudioHeaderException: Raised if the file is not
+            MPEGAudio.
+        :raise OSError: Raised if the file does not exist.
+
+        """
+        stat = os.stat(path)
+        identity = utils.get_identity(stat)
+
+        self._lock.acquire()
+        try:
+            cached = self._cache.pop(path, None)
+            if cached is not None and cached[0] == identity:
+                self._cache[path] = cached
+                return cached
+        finally:
+            self._lock.release()
+
+        mpeg = MPEGAudio(path, file_pool=self.file_pool)
+        lock = threading.Lock()
+
+        self._lock.acquire()
+        try:
+            self._cache[path] = (identity, mpeg, lock)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)[1][1].close()
+        finally:
+            self._lock.release()
+        return identity, mpeg, lock
+
+    def _evict(self, path):
+        """Remove MPEGAudio of the file from the cache, if cached.
+
+        :param path: Path of the file.
+        :type path: string
+
+        """
+        self._lock.acquire()
+        try:
+            cached = self._cache.pop(path, None)
+        finally:
+            self._lock.release()
+        if cached is not None:
+            cached[1].close()
+
+    def get_time_range(self, mpeg, environ):
+        """Get frame aligned byte range of the time range in query.
+
+        :param mpeg: MPEGAudio requested.
+        :type mpeg: :class:`mpeg1audio.MPEGAudio`
+
+        :param environ: WSGI environment of the request.
+        :type environ: dict
+
+        :return: Begin and end offset, without time range the whole file.
+        :rtype: tuple of (int, int)
+
+        :raise ValueError: Raised if the time range is invalid.
+
+        """
+        start, end = parse_time_range(environ.get('QUERY_STRING', ''))
+        if start is None and end is None:
+            return 0, mpeg.filesize
+
+        last_frame = mpeg.frames[-1]
+        end_offset = last_frame.offset + last_frame.size
+        if end is not None:
+            end_offset = mpeg.get_time_offset(end)[1]
+        begin_offset = mpeg.get_time_offset(start or 0)[1]
+        return begin_offset, max(end_offset, begin_offset)
+
+    def get_body(self, environ, path, offset, length, identity=None):
+        """Get response body of the byte range.
+
+        If the range extends to the end of the file, ``wsgi.file_wrapper`` of
+        the server is used when available, which allows the server to send the
+        file without copying it through Python. Bounded ranges are read
+        through Python, as the file wrapper sends the file up to its end, and
+        WSGI has no way to limit its length.
+
+        :param environ: WSGI environment of the request.
+        :type environ: dict
+
+        :param path: Path of the file.
+        :type path: string
+
+        :param offset: Offset of the range.
+        :type offset: int
+
+        :param length: Length of the range.
+        :type length: int
+
+        :param identity: Identity of the file the range is from, see
+            :func:`mpeg1audio.utils.get_identity`, ``None`` is not checked.
+        :type identity: tuple
+
+        :rtype: iterable of strings
+
+        :raise mpeg1audio.utils.FileIdentityException: Raised if the file is
+            not the file the range is from.
+        :raise IOError: Raised if the file cannot be opened.
+
+        """
+        file = open(path, 'rb')
+        stat = os.fstat(file.fileno())
+        if identity is not None and utils.get_identity(stat) != identity:
+            file.close()
+            raise utils.FileIdentityException(
+                'File %s has changed since parsed' % path)
+
+        file.seek(offset)
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None and offset + length == stat.st_size:
+            return file_wrapper(file, self.chunk_size)
+        return FileRangeWrapper(file, length, self.chunk_size)
+
+    def _error(self, start_response, status, headers=None):
+        """Start error response.
+
+        :param start_response: WSGI start response callable.
+        :type start_response: callable
+
+        :param status: HTTP status.
+        :type status: string
+
+        :param headers: Extra headers.
+        :type headers: list of (string, string)
+
+        :rtype: list of strings
+
+        """
+        body = status + '\n'
+        start_response(status, [('Content-Type', 'text/plain'),
+                                ('Content-Length', str(len(body)))] + \
+                               (headers or []))
+        return [body]
+
+class FileRangeWrapper(object):
+    """Iterable over range of file, starting from current position."""
+
+    def __init__(self, file, length, chunk_size=None):
+        """
+        :param file: File positioned to the beginning of the range.
+        :type file: file object
+
+        :param length: Length of the range.
+        :type length: int
+
+        :param chunk_size: Chunk size, ``None`` defaults to
+            :const:`mpeg1audio.utils.DEFAULT_CHUNK_SIZE`.
+        :type chunk_size: int
+
+        """
+        self.file = file
+        self.length = length
+        self.chunk_size = chunk_size or utils.DEFAULT_CHUNK_SIZE
+
+    def __iter__(self):
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.file.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+def parse_time_range(query_string):
+    """Parse time range from query string.
+
+        >>> parse_time_range('t=10')
+        (10.0, None)
+        >>> parse_time_range('t=npt:10,20.5')
+        (10.0, 20.5)
+        >>> parse_time_range('start=5&end=6')
+        (5.0, 6.0)
+        >>> parse_time_range('')
+        (None, None)
+        >>> parse_time_range('t=inf')
+        Traceback (most recent call last):
+        ...
+        ValueError: Invalid time range.
+
+    :param query_string: Query string of request.
+    :type query_string: string
+
+    :return: Start and end in seconds.
+    :rtype: tuple of (float, or None, float, or None)
+
+    :raise ValueError: Raised if the time range is invalid.
+
+    """
+    query = urlparse.parse_qs(query_string)
+    start, end = query.get('start', [None])[0], query.get('end', [None])[0]
+    if 't' in query:
+        time = query['t'][0]
+        if time.startswith('npt:'):
+            time = time[4:]
+        start, sep, end = time.partition(',')
+
+    start = float(start) if start else None
+    end = float(end) if end else None
+    for time in (start, end):
+        if time is not None and (math.isinf(time) or math.isnan(time)):
+            raise ValueError('Invalid time range.')
+    if (start is not None and start < 0) or \
+       (end is not None and end <= (start or 0)):
+        raise ValueError('Invalid time range.')
+    return start, end
+
+def parse_range(header, length):
+    """Parse single byte range of HTTP ``Range`` header.
+
+        >>> parse_range('bytes=0-99', 1000)
+        (0, 100)
+        >>> parse_range('bytes=900-', 1000)
+        (900, 1000)
+        >>> parse_range('bytes=-100', 1000)
+        (900, 1000)
+        >>> parse_range('bytes=1000-', 1000)
+        False
+
+    :param header: Value of ``Range`` header.
+    :type header: string, or None
+
+    :param length: Length of the resource.
+    :type length: int
+
+    :return: Begin and end of the range, ``None`` if the whole resource should
+        be returned, ``False`` if the range is not satisfiable.
+    :rtype: tuple of (int, int), None, or False
+
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    first, sep, last = header[6:].strip().partition('-')
+    try:
+        if not first:
+            begin, end = max(length - int(last), 0), length
+        else:
+            begin = int(first)
+            end = last and min(int(last) + 1, length) or length
+    except ValueError:
+        return None
+
+    if begin >= length or begin >= end:
+        return False
+    return begin, end
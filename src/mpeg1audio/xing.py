@@ -14,7 +14,10 @@ XING VBR Header parsing module.
 # Re-define built-in:
 # pylint: disable-msg=W0622
 
-from mpeg1audio import VBRHeader
+from mpeg1audio import VBRHeader, MPEGAudioFrame, headers
+from mpeg1audio.headers import MPEGAudioHeaderException
+from mpeg1audio.lame import LAME, LAMEHeaderException
+from mpeg1audio.sources import get_source
 import struct
 
 class XING(VBRHeader):
@@ -27,16 +30,119 @@ class XING(VBRHeader):
     don't consider this header can decode the file. The XING header stands after
     the side information in Layer III files.
     
+    LAME writes the same header as ``"Info"`` to constant bitrate files, and
+    extends it with :class:`LAME` extension.
+    
     """
     def __init__(self):
         super(XING, self).__init__()
 
+        self.is_info = False
+        """Is this ``"Info"`` header, written to constant bitrate files?
+        
+        :type: bool"""
+
+        self.lame = None
+        """LAME extension, if any.
+        
+        :type: :class:`LAME`, or None"""
+
+        self.toc = None
+        """Table of contents, 100 entries. Entry *n* is the position of *n*
+        percent of duration, scaled to ``0 - 256`` of MPEGAudio size.
+        
+        :type: list of int, or None"""
+
+    def get_toc_offset(self, percent, mpeg_size=None):
+        """Get offset of given percent of duration using table of contents.
+        
+        Offsets between entries of table of contents are interpolated 
+        linearly, thus the offset is not frame aligned.
+        
+        :param percent: Percent of duration, from ``0`` to ``100``.
+        :type percent: number
+        
+        :param mpeg_size: MPEGAudio size, ``None`` defaults to size in XING.
+        :type mpeg_size: int
+        
+        :return: Offset relative to the first frame.
+        :rtype: int
+        
+        :raise XINGHeaderException: Raised if there is no table of contents, 
+            or size of MPEGAudio.
+            
+        """
+        mpeg_size = mpeg_size or self.mpeg_size
+        if self.toc is None or mpeg_size is None:
+            raise XINGHeaderException('XING Table of contents is not usable.')
+
+        percent = min(max(float(percent), 0.0), 100.0)
+        index = min(int(percent), 99)
+        begin = self.toc[index]
+        end = 256
+        if index < 99:
+            end = self.toc[index + 1]
+        position = begin + (end - begin) * (percent - index)
+        return int(position / 256.0 * mpeg_size)
+
+    @classmethod
+    def create_frame(cls, header_bytes, frame_count, mpeg_size, is_vbr=True):
+        """Create empty MPEG frame holding XING header.
+        
+        Frame is created from the given header by removing padding and CRC
+        protection, and it decodes as silence.
+        
+        :param header_bytes: MPEG header bytes of the frame following the 
+            created one, usually obtained with :func:`headers.get_bytes`.
+        :type header_bytes: int
+        
+        :param frame_count: Count of frames following the created frame,
+            ``None`` leaves the field out of the header.
+        :type frame_count: int, or None
+        
+        :param mpeg_size: Size in bytes of frames following the created frame.
+        :type mpeg_size: int
+        
+        :param is_vbr: Create ``"Xing"`` header, ``False`` creates ``"Info"``
+            header used for constant bitrate.
+        :type is_vbr: bool
+        
+        :return: Frame bytes.
+        :rtype: string
+        
+        :raise XINGHeaderException: Raised if the frame is not Layer III, or is
+            too small for XING header.
+        
+        """
+        header_bytes = (header_bytes | (1 << 16)) & ~(1 << 9)
+        try:
+            frame = MPEGAudioFrame.parse(header_bytes)
+            xing_offset = 4 + headers.get_side_info_size(frame.version,
+                                                         frame.layer,
+                                                         frame.channel_mode)
+        except MPEGAudioHeaderException:
+            raise XINGHeaderException('Frame cannot hold XING header.')
+
+        flags = 2
+        frame_count_field = ''
+        if frame_count is not None:
+            flags |= 1
+            frame_count_field = struct.pack('>I', frame_count)
+        xing = struct.pack('>4sI', is_vbr and 'Xing' or 'Info', flags) + \
+               frame_count_field + struct.pack('>I', mpeg_size + frame.size)
+        if xing_offset + len(xing) > frame.size:
+            raise XINGHeaderException('Frame is too small for XING header.')
+
+        return struct.pack('>I', header_bytes) + \
+               '\x00' * (xing_offset - 4) + xing + \
+               '\x00' * (frame.size - xing_offset - len(xing))
+
     @classmethod
     def find_and_parse(cls, file, first_frame_offset):
         """Find and parse XING header in MPEG File.
         
-        :param file: File object.
-        :type file: file object
+        :param file: File object, or source.
+        :type file: file object, or source
         
         :param first_frame_offset: Offset of first mpeg frame in file.
         :type first_frame_offset: int
@@ -48,11 +154,46 @@ class XING(VBRHeader):
             found.
             
         """
-        file.seek(first_frame_offset)
-        # TODO: LOW: Search for Xing is not needed, it has specific place, but
-        # what?
-        chunk_offset, chunk = file.tell(), file.read(1024)
-        beginning_of_xing = chunk.find('Xing')
+        return cls.parse(get_source(file).read_at(first_frame_offset, 1024),
+                         first_frame_offset)
+
+    @classmethod
+    def parse(cls, chunk, chunk_offset=0):
+        """Parse XING header from chunk beginning at the first mpeg frame.
+        
+        :param chunk: Chunk of data from the beginning of first mpeg frame,
+            e.g. :attr:`data` of parsed header.
+        :type chunk: string
+        
+        :param chunk_offset: Offset of chunk in file.
+        :type chunk_offset: int
+        
+        :return: XING Header in given chunk.
+        :rtype: :class:`XING`
+        
+        :raise XINGHeaderException: Raised if XING Header cannot be parsed or 
+            found.
+            
+        """
+        # XING header stands right after the side information, and CRC if
+        # frame is protected. Otherwise it is searched.
+        beginning_of_xing = -1
+        try:
+            header_bytes = headers.get_bytes(0, chunk)
+            frame = MPEGAudioFrame.parse(header_bytes)
+            position = 4 + headers.get_side_info_size(frame.version,
+                                                      frame.layer,
+                                                      frame.channel_mode)
+        except MPEGAudioHeaderException:
+            pass
+        else:
+            if not (header_bytes >> 16) & 1:
+                position += 2
+            if chunk[position:position + 4] in ('Xing', 'Info'):
+                beginning_of_xing = position
+
+        if beginning_of_xing == -1:
+            beginning_of_xing = chunk.find('Xing')
 
         # Found the beginning of xing
         if beginning_of_xing != -1:
@@ -73,6 +214,8 @@ class XING(VBRHeader):
             has_quality = (flags & 8) == 8
 
             self = XING()
+            self.is_info = chunk[beginning_of_xing:beginning_of_xing + 4] == \
+                           'Info'
 
             if has_frame_count:
                 (self.frame_count,) = struct.unpack('>i', chunk[cur:cur + 4])
@@ -83,8 +226,7 @@ class XING(VBRHeader):
                 cur += 4
 
             if has_toc:
-                toc_chunk = chunk[cur:cur + 100] #@UnusedVariable
-                # TODO: TOC!
+                self.toc = [ord(byte) for byte in chunk[cur:cur + 100]]
                 cur += 100
 
             if has_quality:
@@ -94,6 +236,14 @@ class XING(VBRHeader):
             self.offset = chunk_offset + beginning_of_xing
             self.size = cur - beginning_of_xing
 
+            try:
+                self.lame = LAME.parse(chunk, cur, chunk_offset)
+            except LAMEHeaderException:
+                pass
+
+            # Enough data for the length check above, and LAME extension
+            self.data = chunk[:max(beginning_of_xing + 121, cur + 36)]
+
             return self
 
         raise XINGHeaderException('XING Header is not found.')
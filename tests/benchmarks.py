@@ -1,23 +1,48 @@
-from mpeg1audio import MPEG
+from mpeg1audio import MPEGAudio
 import mpeg1audio
 
 def benchmark_chunk_size(size, parsing_method):
-    if parsing_method == 'parse_all':
+    if parsing_method in ('parse_all', 'parse_all_crc'):
         mpeg1audio.PARSE_ALL_CHUNK_SIZE = size
     else:
         mpeg1audio.utils.DEFAULT_CHUNK_SIZE = size
     
     # TODO: BENCHMARKS: This is most likely highly biased to use only one file:
-    mpeg = MPEG(file=open('data/song.mp3', 'rb'))
+    mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
     
     if parsing_method == 'parse_all':
         mpeg.parse_all()
         
+    if parsing_method == 'parse_all_crc':
+        mpeg.parse_all(verify_crc=True)
+        
     if parsing_method == 'parse_ending':
         mpeg.frames[-1]
         
     mpeg._file.close()
     
+def benchmark_frames_per_second(number):
+    from timeit import default_timer
+    print "Benchmarking frames per second for %s-times:" % number
+    print "Method, Frames per second"
+    for method in ('counting', 'batches', 'parsing'):
+        frames = 0
+        start = default_timer()
+        for i in range(number):
+            mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+            if method == 'counting':
+                mpeg.parse_all()
+            elif method == 'batches':
+                for batch in mpeg.frames.iter_batches():
+                    pass
+            else:
+                mpeg.parse_all(statistics=['bitrate'])
+            frames += mpeg.frame_count
+            mpeg._file.close()
+        print "%10s % 10d" % (method, frames / (default_timer() - start))
+    print "Done..."
+    print ""
+
 def benchmark_parsing(chunk_sizes, number, parsing_method):
     from timeit import Timer
     print "Benchmarking %s for %s-times:" % (parsing_method, number)
@@ -41,4 +66,9 @@ if __name__ == '__main__':
     benchmark_parsing([1024, 8192, 10240, 51200, 81920, 102400, 153600, 163840, 204800, 1024000],
                       number=60,
                       parsing_method='parse_all')
-    
+
+    benchmark_parsing([1024, 8192, 10240, 51200, 81920, 102400, 153600, 163840, 204800, 1024000],
+                      number=60,
+                      parsing_method='parse_all_crc')
+
+    benchmark_frames_per_second(number=60)
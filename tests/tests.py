@@ -1,13 +1,36 @@
 """mpeg1audio - package tests"""
 
 from datetime import timedelta
-from mpeg1audio import MPEGAudio, MPEGAudioFrame, utils
+from mpeg1audio import MPEGAudio, MPEGAudioFrame, crc, export, headers, \
+    sampling, segmenter, sources, utils
 from mpeg1audio.headers import MPEGAudioHeaderException
+from mpeg1audio.info import MPEGAudioInfo
+from mpeg1audio.scanner import Catalog, CatalogEntry
+from mpeg1audio.watch import Watcher
+from mpeg1audio.wsgi import MPEGAudioApplication
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+import StringIO
+import csv
 import doctest
 import mpeg1audio
+import mpeg1audio.crc
+import mpeg1audio.headers
+import mpeg1audio.sampling
+import mpeg1audio.sources
+import mpeg1audio.wsgi
 import os
+import pickle
 import shutil
+import struct
+import tempfile
+import threading
 import unittest
+import urllib2
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class MPEGFileHandlingTests(unittest.TestCase):
     def setUp(self):
@@ -31,7 +54,7 @@ class MPEGSong2Tests(unittest.TestCase):
         """CBR (2) frame count"""
         self.assertEqual(self.mpeg.frame_count, 12471)
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
-        self.assertEqual(self.mpeg.frames._has_parsed_ending, True)
+        self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
 class MPEGSong3Tests(unittest.TestCase):
     """Simple CBR song 3 tests."""
@@ -42,7 +65,7 @@ class MPEGSong3Tests(unittest.TestCase):
         """CBR (3) frame count"""
         self.assertEqual(self.mpeg.frame_count, 9452)
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
-        self.assertEqual(self.mpeg.frames._has_parsed_ending, True)
+        self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
     def testFramePositions(self):
         """CBR (3) last frame"""
@@ -82,7 +105,7 @@ class MPEGTests(unittest.TestCase):
         """CBR duration"""
         self.assertEqual(self.mpeg.duration, timedelta(seconds=192))
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
-        self.assertEqual(self.mpeg.frames._has_parsed_ending, True)
+        self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
     def testSampleRate(self):
         """CBR sample rate"""
@@ -106,7 +129,17 @@ class MPEGTests(unittest.TestCase):
         """CBR frame count"""
         self.assertEqual(self.mpeg.frame_count, 7352)
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
-        self.assertEqual(self.mpeg.frames._has_parsed_ending, True)
+        self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
+
+    def testEndFrames(self):
+        """CBR end frames after calculated frame count"""
+        self.assertEqual(self.mpeg.frames.get_length(), (7352, True))
+        end_frames = self.mpeg.frames[-3:]
+        self.assertEqual(len(end_frames), 3)
+        for frame, next_frame in zip(end_frames, end_frames[1:]):
+            self.assertEqual(frame.offset + frame.size, next_frame.offset)
+        self.assertEqual(self.mpeg.frames[-2].offset, end_frames[1].offset)
+        self.assertEqual(self.mpeg.frames._has_parsed_all, False)
 
     def testIsVBR(self):
         """CBR is VBR?"""
@@ -136,7 +169,11 @@ class VBRXingTests(unittest.TestCase):
 
     def testDuration(self):
         """VBR Xing duration"""
-        self.assertEqual(self.mpeg.duration, timedelta(seconds=308))
+        # Duration is exact, from the gapless sample count of LAME extension.
+        self.assertEqual(self.mpeg.duration.seconds, 308)
+        self.assertEqual(self.mpeg.duration,
+                         timedelta(seconds=self.mpeg.sample_count / 44100.0))
+        self.assertNotEqual(self.mpeg.duration.microseconds, 0)
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
         self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
@@ -171,6 +208,15 @@ class VBRXingTests(unittest.TestCase):
         self.assertEqual(self.mpeg.frames._has_parsed_all, False)
         self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
+    def testSampleCount(self):
+        """VBR Xing LAME gapless sample count"""
+        lame = self.mpeg.xing.lame
+        self.assertEqual(self.mpeg.xing.is_info, False)
+        self.assertEqual(self.mpeg.sample_count, 11805 * 1152 - \
+                         lame.encoder_delay - lame.encoder_padding)
+        self.assertEqual(self.mpeg.frames._has_parsed_all, False)
+        self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
+
 class VBRFraunhoferTests(unittest.TestCase):
     """VBR Fraunhofer Encoder header tests."""
     def setUp(self):
@@ -278,6 +324,909 @@ class VBRHeaderlessFileOpenerTests(unittest.TestCase):
         self.assertEqual(self.mpeg.frames._has_parsed_all, True)
         self.assertEqual(self.mpeg.frames._has_parsed_ending, False)
 
+class FrameIndexTests(unittest.TestCase):
+    """Frame index random access tests."""
+    def setUp(self):
+        self.mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'),
+                              index_interval=16)
+
+    def testRandomAccess(self):
+        """Frame index random access"""
+        self.assertEqual(self.mpeg.frames[1000].offset,
+                         self.mpeg.frames[999].offset + \
+                         self.mpeg.frames[999].size)
+        offsets = [frame.offset for frame in self.mpeg.frames]
+        for number in (6, 100, 17, 1000, len(offsets) - 1, 33):
+            self.assertEqual(self.mpeg.frames[number].offset, offsets[number])
+        self.assertEqual(self.mpeg.frames._index.frame_count, len(offsets))
+        self.assertRaises(IndexError, lambda: self.mpeg.frames[len(offsets)])
+
+class CountingTests(unittest.TestCase):
+    """Counting frames without parsing them tests."""
+    def testParseAll(self):
+        """Counting frames of parse all"""
+        counted = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        counted.parse_all()
+        parsed = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        parsed.parse_all(statistics=['bitrate'])
+        self.assertEqual(counted.frame_count, parsed.frame_count)
+        self.assertEqual(counted.bitrate, parsed.bitrate)
+        self.assertEqual(counted.frames._index.offsets,
+                         parsed.frames._index.offsets)
+        self.assertEqual(counted.frames[-1].offset, parsed.frames[-1].offset)
+
+    def testCountConsecutive(self):
+        """Counting consecutive frames"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        chunks = utils.chunked_reader(open('data/song.mp3', 'rb'),
+                                      start_position=2283, chunk_size=1000)
+        count, bitrate_sum, end_offset = \
+            MPEGAudioFrame.count_consecutive(2283, chunks)
+        self.assertEqual(count, 7352)
+        self.assertEqual(bitrate_sum, 7352 * 256)
+        self.assertEqual(end_offset, mpeg.frames[-1].offset + \
+                                     mpeg.frames[-1].size)
+
+class SamplingTests(unittest.TestCase):
+    """Sampling estimation tests."""
+    def setUp(self):
+        self.exact = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        self.exact.parse_all()
+
+    def testEstimate(self):
+        """Sampling estimate of VBR"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        estimate = sampling.estimate(mpeg, window_size=4096, seed=1)
+        low, high = estimate.frame_count_interval
+        self.assertTrue(low <= self.exact.frame_count <= high)
+        self.assertTrue(estimate.duration_interval[0] <= self.exact.duration
+                        <= estimate.duration_interval[1])
+        self.assertEqual(estimate.frame_count,
+                         sampling.estimate(mpeg, window_size=4096,
+                                           seed=1).frame_count)
+
+    def testSamplingError(self):
+        """Sampling estimate of VBR frame count"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'),
+                         sampling_error=0.05)
+        self.assertEqual(mpeg.frames._has_parsed_all, False)
+        self.assertTrue(abs(mpeg.frame_count - self.exact.frame_count) <= \
+                        mpeg.frame_count * mpeg.estimate.error + 1)
+        self.assertEqual(mpeg.frame_count, mpeg.estimate.frame_count)
+        self.assertEqual(mpeg.frames._has_parsed_all, False)
+        self.assertEqual(mpeg.provenance, 'parsed' \
+                         if mpeg.estimate.is_exact else 'estimated')
+
+class BudgetTests(unittest.TestCase):
+    """Read and time budget tests."""
+    def setUp(self):
+        self.exact = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        self.exact.parse_all()
+
+    def testParseAll(self):
+        """Parse all frames within budget is estimated"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        mpeg.parse_all(max_bytes=mpeg.size // 2)
+        self.assertEqual(mpeg.budget_exceeded, True)
+        self.assertEqual(mpeg.provenance, 'estimated')
+        self.assertEqual(mpeg.budget, None)
+        self.assertTrue(abs(mpeg.frame_count - self.exact.frame_count) < \
+                        self.exact.frame_count * 0.2)
+
+    def testLimit(self):
+        """Budget limited temporarily"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        with mpeg.limit(max_bytes=mpeg.size // 2):
+            mpeg.frame_count
+            self.assertEqual(mpeg.budget.bytes_read <= mpeg.size // 2, True)
+        self.assertEqual(mpeg.budget, None)
+        self.assertEqual(mpeg.budget_exceeded, True)
+
+    def testDeadlineCached(self):
+        """Deadline exceeded walking frames read from the cache"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'),
+                         cache_size=os.path.getsize('data/vbr_empty.mp3'))
+        mpeg.frames[1500]
+        offset = mpeg.frames[1450].offset
+        misses = mpeg.block_cache.misses
+        with mpeg.limit(deadline=-1):
+            self.assertRaises(sources.BudgetException,
+                              lambda: mpeg.frames[1450])
+        self.assertEqual(mpeg.block_cache.misses, misses)
+        self.assertEqual(mpeg.frames[1450].offset, offset)
+
+    def testNotMPEG(self):
+        """Budget exceeded searching non-MPEG file"""
+        data = ''.join(chr(i % 251) for i in range(1000000))
+        self.assertRaises(sources.BudgetException, MPEGAudio,
+                          sources.MemorySource(data), mpeg_test=False,
+                          max_bytes=100000)
+
+class SniffTests(unittest.TestCase):
+    """Non-MPEG file signature tests."""
+    def setUp(self):
+        self.data = open('data/song.mp3', 'rb').read()
+
+    def testRejected(self):
+        """Known non-MPEG file rejected by one read"""
+        for signature in ('fLaC', 'OggS', '\x00\x00\x00\x20ftypM4A ',
+                          '\xff\xd8\xff\xe0', 'PK\x03\x04', '%PDF-1.4',
+                          'RIFF\x00\x00\x00\x00WAVEfmt '
+                          '\x10\x00\x00\x00\x01\x00'):
+            # Budget is exceeded, if more than the signature is read.
+            self.assertRaises(MPEGAudioHeaderException, MPEGAudio,
+                              StringIO.StringIO(signature + self.data),
+                              max_bytes=headers.SNIFF_SIZE)
+
+        # Probing of remote source is not planned for known non-MPEG file.
+        source = sources.PrefetchSource(sources.MemorySource('fLaC' +
+                                                             self.data))
+        self.assertRaises(MPEGAudioHeaderException, MPEGAudio, source)
+        self.assertEqual(source.round_trips, 1)
+
+    def testAccepted(self):
+        """MPEG in WAV is not rejected"""
+        mpeg = MPEGAudio(sources.MemorySource('RIFF\x00\x00\x00\x00WAVEfmt '
+                                              '\x1e\x00\x00\x00\x55\x00' +
+                                              self.data))
+        self.assertEqual(mpeg.duration, MPEGAudio('data/song.mp3').duration)
+
+class CBRFrameCountTests(unittest.TestCase):
+    """Exact CBR frame count tests."""
+    def testFrameCount(self):
+        """CBR exact frame count and last frame"""
+        mpeg = MPEGAudio(file=open('data/song3.mp3', 'rb'))
+        self.assertEqual(mpeg._get_cbr_frame_count(), 9452)
+        self.assertEqual(mpeg.frames[-1].offset, 5927670)
+        self.assertEqual(mpeg.size, 5925826)
+        self.assertEqual(mpeg.frames._has_parsed_ending, False)
+
+    def testFooterSize(self):
+        """Footer size of tags"""
+        ape = 'APETAGEX' + struct.pack('<IIII', 2000, 100, 1, 0x80000000) + \
+              '\x00' * 8
+        self.assertEqual(utils.get_footer_size('audio' + ape), 132)
+        self.assertEqual(utils.get_footer_size('audio' + ape + 'TAG' + \
+                                               ' ' * 125), 260)
+
+class FrameLengthTests(unittest.TestCase):
+    """Frame iterator length tests."""
+    def testCBR(self):
+        """CBR length of frames"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        self.assertEqual(len(mpeg.frames), 7352)
+        self.assertEqual(mpeg.frames.get_length(), (7352, True))
+        self.assertEqual(mpeg.frames._has_parsed_all, False)
+
+    def testVBRHeaderless(self):
+        """VBR headerless length of frames"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        self.assertEqual(mpeg.frames.get_length(scan=False), (None, False))
+        self.assertEqual(len(mpeg.frames), 8074)
+        self.assertEqual(mpeg.frames.get_length(scan=False), (8074, True))
+
+    def testVBRHeader(self):
+        """VBR Xing length of frames"""
+        mpeg = MPEGAudio(file=open('data/vbr_xing.mp3', 'rb'))
+        # Frame holding the Xing header is not counted by the header.
+        self.assertEqual(mpeg.frames.get_length(), (11806, False))
+        self.assertEqual(mpeg.frame_count, 11805)
+
+class BackwardIterationTests(unittest.TestCase):
+    """Backward frame iteration tests."""
+    def testReversed(self):
+        """Reversed VBR headerless frames"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        offsets = [frame.offset for frame in mpeg.frames]
+        self.assertEqual([frame.offset for frame in reversed(mpeg.frames)],
+                         offsets[::-1])
+
+    def testNegativeSlice(self):
+        """Slices of VBR headerless frames relative to the end"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        offsets = [frame.offset for frame in mpeg.frames]
+        for key in (slice(-2, None), slice(-500, None), slice(-500, -400),
+                    slice(10, -8000), slice(-3, None, -100)):
+            mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+            self.assertEqual([frame.offset for frame in mpeg.frames[key]],
+                             offsets[key])
+
+    def testTail(self):
+        """Reversed CBR tail frames"""
+        mpeg = MPEGAudio(file=open('data/song3.mp3', 'rb'))
+        tail = list(utils.genmax(reversed(mpeg.frames), 100))
+        self.assertEqual(tail[0].offset, 5927670)
+        for frame, next_frame in zip(tail[1:], tail):
+            self.assertEqual(frame.offset + frame.size, next_frame.offset)
+        self.assertEqual(mpeg.frames._has_parsed_all, False)
+
+class ExtractTests(unittest.TestCase):
+    """Frame aligned extraction tests."""
+    def setUp(self):
+        if os.path.exists("data/temp.mp3"):
+            os.unlink("data/temp.mp3")
+
+    def tearDown(self):
+        if os.path.exists("data/temp.mp3"):
+            os.unlink("data/temp.mp3")
+
+    def testTimeOffset(self):
+        """CBR time offset"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        number, offset = mpeg.get_time_offset(timedelta(seconds=60))
+        self.assertEqual(number, 2296)
+        self.assertEqual(mpeg.frames[number].offset, offset)
+
+    def testExtractCBR(self):
+        """CBR extract"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        written = mpeg.extract(10, 20, 'data/temp.mp3')
+        self.assertEqual(os.path.getsize('data/temp.mp3'), written)
+        extracted = MPEGAudio('data/temp.mp3')
+        self.assertEqual(extracted.duration, timedelta(seconds=10))
+        extracted.close()
+
+    def testExtractVBR(self):
+        """VBR Xing extract"""
+        mpeg = MPEGAudio(file=open('data/vbr_xing.mp3', 'rb'))
+        mpeg.extract(60, 120, 'data/temp.mp3')
+        extracted = MPEGAudio('data/temp.mp3')
+        self.assertEqual(extracted.is_vbr, True)
+        self.assertEqual(extracted.xing.frame_count,
+                         len(list(extracted.frames)) - 1)
+        extracted.close()
+
+    def testExtractVBRHeaderless(self):
+        """VBR headerless extract to the end"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        mpeg.extract(60, None, 'data/temp.mp3')
+        extracted = MPEGAudio('data/temp.mp3')
+        self.assertEqual(extracted.xing.frame_count,
+                         len(list(extracted.frames)) - 1)
+        self.assertEqual(extracted.xing.mpeg_size, extracted.size)
+        extracted.close()
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+class WSGITests(unittest.TestCase):
+    """WSGI application tests against local server."""
+    def setUp(self):
+        self.server = make_server('127.0.0.1', 0, MPEGAudioApplication('data'),
+                                  handler_class=QuietRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def testRange(self):
+        """WSGI byte range"""
+        request = urllib2.Request(self.url + 'song.mp3',
+                                  headers={'Range': 'bytes=2283-3118'})
+        response = urllib2.urlopen(request)
+        self.assertEqual(response.code, 206)
+        self.assertEqual(response.read(),
+                         open('data/song.mp3', 'rb').read()[2283:3119])
+
+    def testTime(self):
+        """WSGI time range"""
+        response = urllib2.urlopen(self.url + 'vbr_xing.mp3?t=10,20')
+        mpeg = MPEGAudio(file=open('data/vbr_xing.mp3', 'rb'))
+        begin = mpeg.get_time_offset(10)[1]
+        end = mpeg.get_time_offset(20)[1]
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.read(),
+                         open('data/vbr_xing.mp3', 'rb').read()[begin:end])
+
+    def testConcurrent(self):
+        """WSGI time ranges of cached file in threads"""
+        application = MPEGAudioApplication('data', file_pool=utils.FilePool(1))
+        mpeg = MPEGAudio(file=open('data/vbr_xing.mp3', 'rb'))
+        data = open('data/vbr_xing.mp3', 'rb').read()
+        bodies = {}
+
+        def request(start):
+            environ = {'PATH_INFO': '/vbr_xing.mp3',
+                       'QUERY_STRING': 't=%d,%d' % (start, start + 10)}
+            body = application(environ, lambda status, headers: None)
+            bodies[start] = ''.join(body)
+            body.close()
+
+        threads = [threading.Thread(target=request, args=(start,)) \
+                   for start in range(0, 80, 10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for start, body in bodies.items():
+            self.assertEqual(body,
+                             data[mpeg.get_time_offset(start)[1]:
+                                  mpeg.get_time_offset(start + 10)[1]])
+        self.assertEqual(len(bodies), 8)
+
+    def testInvalidTime(self):
+        """WSGI infinite time range"""
+        application = MPEGAudioApplication('data')
+        statuses = []
+        for query_string in ('t=inf', 't=1e400', 't=0,nan'):
+            environ = {'PATH_INFO': '/song.mp3', 'QUERY_STRING': query_string}
+            application(environ,
+                        lambda status, headers: statuses.append(status))
+        self.assertEqual(statuses, ['400 Bad Request'] * 3)
+
+    def testChanged(self):
+        """WSGI file changed while served"""
+        class ChangingApplication(MPEGAudioApplication):
+            def get_mpeg(self, path):
+                cached = MPEGAudioApplication.get_mpeg(self, path)
+                open(path, 'ab').write('TAG')
+                return cached
+
+        shutil.copy('data/song.mp3', 'data/temp.mp3')
+        try:
+            application = ChangingApplication('data')
+            statuses = []
+            for query_string in ('', 't=0,5'):
+                environ = {'PATH_INFO': '/temp.mp3',
+                           'QUERY_STRING': query_string}
+                application(environ,
+                            lambda status, headers: statuses.append(status))
+            self.assertEqual(statuses, ['409 Conflict'] * 2)
+        finally:
+            os.unlink('data/temp.mp3')
+
+    def testNotFound(self):
+        """WSGI not found"""
+        try:
+            urllib2.urlopen(self.url + '../tests.py')
+        except urllib2.HTTPError as error:
+            self.assertEqual(error.code, 404)
+        else:
+            self.fail('Files outside of root must not be served.')
+
+class SegmenterTests(unittest.TestCase):
+    """Segmenter tests."""
+    def testSegments(self):
+        """Segments of CBR"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        segments = list(segmenter.get_segments(mpeg, 10))
+        self.assertEqual(segments[0].offset, 2283)
+        for segment, next_segment in zip(segments, segments[1:]):
+            self.assertEqual(segment.offset + segment.size,
+                             next_segment.offset)
+            self.assertTrue(segment.duration >= 10)
+        self.assertEqual(sum(segment.frame_count for segment in segments),
+                         len(list(mpeg.frames)))
+
+    def testPlaylist(self):
+        """Segments playlist"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        playlist = StringIO.StringIO()
+        segmenter.write_playlist(segmenter.get_segments(mpeg, 10), playlist,
+                                 uri='song.mp3')
+        lines = playlist.getvalue().splitlines()
+        self.assertEqual(lines[0], '#EXTM3U')
+        self.assertEqual(lines[5], '#EXTINF:10.004898,')
+        self.assertTrue(lines[6].startswith('#EXT-X-BYTERANGE:'))
+        self.assertTrue(lines[6].endswith('@2283'))
+        self.assertEqual(lines[7], 'song.mp3')
+        self.assertEqual(lines[-1], '#EXT-X-ENDLIST')
+
+    def testWriteSegments(self):
+        """Segments written to files"""
+        directory = tempfile.mkdtemp()
+        try:
+            mpeg = MPEGAudio('data/song.mp3', file_pool=utils.FilePool(1))
+            segments = list(segmenter.write_segments(
+                                mpeg, segmenter.get_segments(mpeg, 10),
+                                directory))
+            data = ''.join(open(os.path.join(directory, segment.uri),
+                                'rb').read() for segment in segments)
+            self.assertEqual(data, open('data/song.mp3', 'rb').read()[
+                segments[0].offset:segments[-1].offset + segments[-1].size])
+            mpeg.close()
+        finally:
+            shutil.rmtree(directory)
+
+class CRCTests(unittest.TestCase):
+    """CRC verification tests."""
+    def _get_protected_frame(self, is_corrupted=False):
+        header = '\xff\xfa\x90\x44'
+        side_info = ''.join(chr(byte) for byte in range(32))
+        frame_crc = crc.crc16(side_info, crc.crc16(header[2:4]))
+        if is_corrupted:
+            frame_crc ^= 1
+        frame = header + struct.pack('>H', frame_crc) + side_info
+        return frame + '\x00' * (417 - len(frame))
+
+    def testVerify(self):
+        """CRC verify protected frames"""
+        data = self._get_protected_frame() + \
+               self._get_protected_frame(is_corrupted=True) + \
+               self._get_protected_frame()
+        for chunk_size in (4, 40, 1024):
+            report = crc.CRCReport()
+            chunks = utils.chunked_reader(StringIO.StringIO(data),
+                                          chunk_size=chunk_size)
+            frames = list(MPEGAudioFrame.parse_consecutive(0, chunks,
+                                                           crc_report=report))
+            self.assertEqual([f.offset for f in frames], [0, 417, 834])
+            self.assertEqual(report.checked, 3)
+            self.assertEqual(report.errors, 1)
+            self.assertEqual(report.error_offsets, [417])
+
+    def testUnprotected(self):
+        """CRC verify unprotected file"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'), verify_crc=True)
+        mpeg.parse_all()
+        self.assertEqual(mpeg.frame_count, 7352)
+        self.assertEqual(mpeg.crc_report.errors, 0)
+
+class FilePoolTests(unittest.TestCase):
+    """File descriptor pool tests."""
+    def setUp(self):
+        self.pool = utils.FilePool(max_open=1)
+
+    def testBound(self):
+        """File pool bound of descriptors"""
+        paths = ['data/song.mp3', 'data/vbr_empty.mp3']
+        mpegs = [MPEGAudio(path, file_pool=self.pool) for path in paths]
+        self.assertEqual([mpeg.frames[100].offset for mpeg in mpegs],
+                         [MPEGAudio(path).frames[100].offset \
+                          for path in paths])
+        self.assertEqual(len(self.pool._files), 1)
+        self.assertEqual(mpegs[0].frames[200].offset,
+                         MPEGAudio('data/song.mp3').frames[200].offset)
+
+    def testClosed(self):
+        """File pool closed state of proxy"""
+        files = [self.pool.open(path) for path in ['data/song.mp3',
+                                                   'data/vbr_empty.mp3']]
+        self.assertEqual([file.closed for file in files], [True, True])
+        files[0].read(4)
+        self.assertEqual([file.closed for file in files], [False, True])
+        files[1].read(4)
+        self.assertEqual([file.closed for file in files], [True, False])
+        files[1].close()
+        self.assertTrue(files[1].closed)
+        self.assertEqual(files[1].read(4),
+                         open('data/vbr_empty.mp3', 'rb').read(8)[4:])
+        self.assertFalse(files[1].closed)
+
+    def testIdentity(self):
+        """File pool identity after re-open"""
+        shutil.copy("data/song.mp3", "data/temp.mp3")
+        try:
+            mpeg = MPEGAudio('data/temp.mp3', file_pool=self.pool)
+            open('data/temp.mp3', 'ab').write('TAG')
+            self.assertRaises(utils.FileIdentityException, list, mpeg.frames)
+        finally:
+            self.pool.close()
+            os.unlink("data/temp.mp3")
+
+class TolerantTests(unittest.TestCase):
+    """Tolerant parsing of corrupted file tests."""
+    def setUp(self):
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        self.offsets = [frame.offset for frame in mpeg.frames]
+        data = open('data/song.mp3', 'rb').read()
+        damaged = self.offsets[100]
+        open('data/temp_damaged.mp3', 'wb').write(data[:damaged] + '\x00' * 4 +
+                                                 data[damaged + 4:])
+
+    def tearDown(self):
+        os.unlink('data/temp_damaged.mp3')
+
+    def testStrict(self):
+        """Strict parsing stops at corrupted frame"""
+        mpeg = MPEGAudio(file=open('data/temp_damaged.mp3', 'rb'))
+        mpeg.parse_all()
+        self.assertEqual(mpeg.frame_count, 100)
+        self.assertEqual(mpeg.gaps, [])
+
+    def testStrictWalk(self):
+        """Strict walk stopped at corrupted frame is not the frame count"""
+        mpeg = MPEGAudio(file=open('data/temp_damaged.mp3', 'rb'))
+        self.assertRaises(IndexError, mpeg.frames.__getitem__, 150)
+        self.assertEqual(mpeg.frames._index.frame_count, None)
+        self.assertEqual(len(mpeg.frames), len(self.offsets))
+
+    def testTolerant(self):
+        """Tolerant parsing skips corrupted frame"""
+        mpeg = MPEGAudio(file=open('data/temp_damaged.mp3', 'rb'),
+                         tolerant=True)
+        mpeg.parse_all()
+        self.assertEqual(mpeg.frame_count, len(self.offsets) - 1)
+        self.assertEqual(mpeg.gaps, [(self.offsets[100],
+                                      self.offsets[101] - self.offsets[100])])
+
+class SourceTests(unittest.TestCase):
+    """Positional read source tests."""
+    def setUp(self):
+        self.data = open('data/song.mp3', 'rb').read()
+
+    def testFileSource(self):
+        """File source read at offset"""
+        source = sources.get_source(StringIO.StringIO(self.data))
+        self.assertTrue(isinstance(source, sources.FileSource))
+        self.assertEqual(source.size(), len(self.data))
+        self.assertEqual(source.read_at(2283, 4), self.data[2283:2287])
+        self.assertEqual(source.read_at(len(self.data) - 2, 4),
+                         self.data[-2:])
+
+    def testDescriptorSource(self):
+        """Descriptor source read at offset"""
+        file = open('data/song.mp3', 'rb')
+        source = sources.get_source(file)
+        if sources.HAS_PREAD:
+            self.assertTrue(isinstance(source, sources.DescriptorSource))
+        self.assertEqual(source.read_at(2283, 836), self.data[2283:3119])
+        self.assertEqual(source.read_at(len(self.data) - 2, 4),
+                         self.data[-2:])
+        self.assertEqual(file.tell(), 0)
+        self.assertEqual(sources.get_source(source), source)
+
+    def testChunkedReader(self):
+        """Chunked reader of source"""
+        source = sources.get_source(open('data/song.mp3', 'rb'))
+        self.assertEqual(''.join(chunk for offset, chunk in \
+                                 utils.chunked_reader(source, chunk_size=1000,
+                                                      start_position=0)),
+                         self.data)
+
+    def testCopyRange(self):
+        """Copy range of descriptor and source"""
+        for source in (open('data/song.mp3', 'rb'),
+                       sources.MemorySource(self.data)):
+            destination = tempfile.TemporaryFile()
+            destination.write('ID')
+            self.assertEqual(utils.copy_range(source, destination, 2283, 836),
+                             836)
+            destination.write('END')
+            destination.seek(0)
+            self.assertEqual(destination.read(),
+                             'ID' + self.data[2283:3119] + 'END')
+
+class PrefetchSourceTests(unittest.TestCase):
+    """Range read source with planned reads tests."""
+    def setUp(self):
+        self.memory = sources.MemorySource(open('data/song.mp3', 'rb').read(),
+                                           latency=0.01)
+
+    def testProbe(self):
+        """Probing source with planned reads"""
+        source = sources.PrefetchSource(self.memory)
+        mpeg = MPEGAudio(source)
+        self.assertEqual(mpeg.duration, MPEGAudio('data/song.mp3').duration)
+        self.assertEqual(source.round_trips, 5)
+        self.assertEqual(self.memory.reads, 4)
+
+    def testFrames(self):
+        """Frames of source"""
+        mpeg = MPEGAudio(self.memory)
+        self.assertEqual([frame.offset for frame in mpeg.frames[:3]],
+                         [2283, 3119, 3955])
+
+class BlockCacheTests(unittest.TestCase):
+    """Block cache tests."""
+    def setUp(self):
+        self.data = open('data/song.mp3', 'rb').read()
+        self.memory = sources.MemorySource(self.data)
+
+    def testEndingFromBeginning(self):
+        """Ending searched again from the beginning of source"""
+        # Rewound search of ending goes exactly to the beginning of file.
+        data = self.data[:5000] + '\x00' * 2999
+        mpeg = MPEGAudio(sources.MemorySource(data), mpeg_test=False)
+        self.assertEqual(len(mpeg.frames[-3:]), 3)
+        self.assertTrue(mpeg.frames[-1].offset < 5000)
+
+    def testOverlapping(self):
+        """Block cache reads overlapping bytes once"""
+        cache = sources.BlockCache(self.memory, block_size=1024,
+                                   max_bytes=4096)
+        self.assertEqual(cache.read_at(1000, 100), self.data[1000:1100])
+        self.assertEqual(cache.read_at(1050, 2000), self.data[1050:3050])
+        self.assertEqual((cache.hits, cache.misses, self.memory.reads),
+                         (1, 3, 2))
+        self.assertEqual(cache.read_at(len(self.data) - 10, 100),
+                         self.data[-10:])
+        self.assertEqual(cache._bytes <= 4096, True)
+
+    def testProbe(self):
+        """Block cache shared by probing phases"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        mpeg.frames[-1]
+        self.assertTrue(mpeg.block_cache.hits > 0)
+        self.assertEqual(MPEGAudio(file=open('data/song.mp3', 'rb'),
+                                   cache_size=0).block_cache, None)
+
+class FrameStatisticsTests(unittest.TestCase):
+    """Frame statistics tests."""
+    def testAll(self):
+        """Frame statistics of all aggregates"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        mpeg.parse_all(statistics=True)
+        frames = list(mpeg.frames)
+        statistics = mpeg.statistics
+        self.assertEqual(statistics.frame_count, len(frames))
+        self.assertEqual(statistics.bitrate_histogram, {128: len(frames)})
+        self.assertEqual((statistics.min_bitrate, statistics.max_bitrate),
+                         (128, 128))
+        self.assertEqual(statistics.channel_modes[0],
+                         (0, frames[0].channel_mode))
+        self.assertEqual(statistics.first_offset, 2283)
+        self.assertEqual(statistics.last_offset, frames[-1].offset)
+        self.assertEqual(statistics.audio_size,
+                         sum(frame.size for frame in frames))
+        self.assertTrue(0 < statistics.padding_ratio < 1)
+
+    def testSelected(self):
+        """Frame statistics of selected aggregates"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        mpeg.parse_all(statistics=['bitrate'])
+        self.assertEqual(sum(mpeg.statistics.bitrate_histogram.values()),
+                         mpeg.frame_count)
+        self.assertEqual(mpeg.statistics.padding_ratio, None)
+        self.assertEqual(mpeg.statistics.audio_size, 0)
+
+class InfoTests(unittest.TestCase):
+    """Snapshot tests."""
+    def setUp(self):
+        self.mpeg = MPEGAudio('data/song.mp3')
+        self.info = self.mpeg.get_info()
+
+    def testSerialize(self):
+        """Snapshot serialization"""
+        self.assertEqual(MPEGAudioInfo.from_bytes(self.info.to_bytes()),
+                         self.info)
+        self.assertEqual(pickle.loads(pickle.dumps(self.info, 2)), self.info)
+        self.assertEqual(self.info.frame_count, 7352)
+        self.assertTrue(isinstance(
+            MPEGAudioInfo.from_bytes(self.info.to_bytes()).bitrate, int))
+        self.assertEqual(self.info.offset, 2283)
+        self.assertRaises(ValueError, MPEGAudioInfo.from_bytes, 'MPAI')
+
+    def testShort(self):
+        """Snapshot serialization of short file"""
+        data = open('data/song.mp3', 'rb').read()
+        offsets = [frame.offset for frame in self.mpeg.frames[:11]]
+        mpeg = MPEGAudio(file=StringIO.StringIO(data[:offsets[10]]))
+        info = mpeg.get_info()
+        self.assertTrue(info.duration < 0.5)
+        self.assertEqual(MPEGAudioInfo.from_bytes(info.to_bytes()), info)
+        self.assertEqual(pickle.loads(pickle.dumps(info, 2)), info)
+
+    def testFromInfo(self):
+        """MPEGAudio from snapshot"""
+        mpeg = MPEGAudio.from_info(self.info)
+        self.assertEqual(mpeg.frames._has_parsed_beginning, False)
+        self.assertEqual(mpeg.duration, self.mpeg.duration)
+        self.assertEqual(mpeg.frame_count, self.mpeg.frame_count)
+        self.assertEqual(mpeg.frames[10].offset, self.mpeg.frames[10].offset)
+
+    def testChanged(self):
+        """MPEGAudio from snapshot of changed file"""
+        shutil.copy('data/song.mp3', 'data/temp.mp3')
+        try:
+            info = MPEGAudio('data/temp.mp3').get_info()
+            open('data/temp.mp3', 'ab').write('TAG')
+            self.assertRaises(utils.FileIdentityException,
+                              MPEGAudio.from_info, info)
+            self.assertRaises(utils.FileIdentityException,
+                              MPEGAudio.from_info, info,
+                              open('data/temp.mp3', 'rb'))
+        finally:
+            os.unlink('data/temp.mp3')
+
+    def testVBRHeader(self):
+        """MPEGAudio from snapshot of XING header, without reading it"""
+        mpeg = MPEGAudio(file=open('data/vbr_xing.mp3', 'rb'))
+        info = MPEGAudioInfo.from_bytes(mpeg.get_info().to_bytes())
+        source = sources.PrefetchSource(sources.MemorySource(
+                                    open('data/vbr_xing.mp3', 'rb').read()))
+        mpeg_from_info = MPEGAudio.from_info(info, source)
+
+        # Only the size of file is asked, for comparing to the snapshot.
+        self.assertEqual(source.round_trips, 1)
+        self.assertEqual(mpeg_from_info.xing.toc, mpeg.xing.toc)
+        self.assertEqual(mpeg_from_info.xing.offset, mpeg.xing.offset)
+        self.assertEqual(mpeg_from_info.sample_count, mpeg.sample_count)
+        self.assertEqual(mpeg_from_info.frame_count, mpeg.frame_count)
+
+class CatalogTests(unittest.TestCase):
+    """Catalog and watcher tests."""
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.root, 'a'))
+        shutil.copy('data/song.mp3', os.path.join(self.root, 'a', 'song.mp3'))
+        open(os.path.join(self.root, 'bad.mp3'), 'wb').write('x' * 1000)
+        self.catalog = Catalog()
+        self.catalog.scan(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testScan(self):
+        """Catalog scans only changed files"""
+        path = os.path.join(self.root, 'a', 'song.mp3')
+        self.assertEqual(self.catalog.entries[path].info.frame_count, 7352)
+        self.assertNotEqual(
+            self.catalog.entries[os.path.join(self.root, 'bad.mp3')].error,
+            None)
+        self.assertEqual(self.catalog.scan(self.root), [])
+        self.assertEqual(self.catalog.scans, 2)
+
+        open(path, 'ab').write('\0' * 128)
+        os.utime(path, (0, 0))
+        self.assertEqual(self.catalog.scan(self.root), [(path, 'changed')])
+        shutil.rmtree(os.path.join(self.root, 'a'))
+        self.assertEqual(self.catalog.scan(self.root), [(path, 'removed')])
+        self.assertEqual(self.catalog.scans, 3)
+
+    def testEntryWithoutHash(self):
+        """Catalog entry saved without content hash"""
+        entry = CatalogEntry((0, 0, 0, 0.0), None, 'error')
+        self.assertEqual(entry.content_hash, None)
+        self.assertEqual(pickle.loads(pickle.dumps(entry, 2)), entry)
+
+    def testErrors(self):
+        """Catalog records errors of reading files"""
+        self.assertRaises(ValueError, Catalog, hash_algorithm='unknown')
+        self.assertRaises(ValueError, Catalog, statistics=['unknown'])
+
+        class BrokenPool(utils.FilePool):
+            def open(self, name):
+                raise utils.FileIdentityException('Broken pool')
+
+        catalog = Catalog(file_pool=BrokenPool())
+        changes = catalog.scan(self.root)
+        self.assertEqual(len(changes), 2)
+        for path, entry in catalog.entries.items():
+            self.assertEqual(entry.info, None)
+            self.assertEqual(entry.error, 'File %s cannot be opened' % path)
+
+        # Programming errors are not hidden as errors of files.
+        class BuggyPool(utils.FilePool):
+            def open(self, name):
+                raise ValueError('Bug')
+
+        self.assertRaises(ValueError, Catalog(file_pool=BuggyPool()).scan,
+                          self.root)
+
+    def testWatcher(self):
+        """Watcher coalesces events and rate limits scans"""
+        watcher = Watcher(self.catalog, self.root, debounce=1, rate_limit=1,
+                          use_inotify=False)
+        path = os.path.join(self.root, 'a', 'song.mp3')
+        for i in range(3):
+            watcher.add(path, now=10 + i)
+        watcher.add(os.path.join(self.root, 'b.mp3'), now=10)
+        self.assertEqual(watcher.process(now=11.5), 1)
+        self.assertEqual(watcher.process(now=12.5), 0)
+        self.assertEqual(watcher.process(now=13), 1)
+        self.assertEqual(watcher.pending, {})
+        self.assertEqual(self.catalog.scans, 2)
+
+        os.unlink(path)
+        self.assertEqual(watcher.poll(), [path])
+
+class ContentHashTests(unittest.TestCase):
+    """Hashing of audio tests."""
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        data = open('data/song.mp3', 'rb').read()
+        open(os.path.join(self.root, 'song.mp3'), 'wb').write(data)
+        open(os.path.join(self.root, 'tagged.mp3'), 'wb').write(
+            'ID3\x04\x00\x00\x00\x00\x01\x00' + '\x00' * 128 + data[2283:] +
+            'TAG' + 'x' * 125)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testHash(self):
+        """Hash of audio is the same in all passes"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        mpeg.parse_all(hash_algorithm='sha1')
+        self.assertEqual(len(mpeg.content_hash), 40)
+        for kwargs in ({'statistics': True}, {'verify_crc': True},
+                       {'tolerant': True}):
+            other = MPEGAudio(file=open('data/song.mp3', 'rb'))
+            other.parse_all(hash_algorithm='sha1', **kwargs)
+            self.assertEqual(other.content_hash, mpeg.content_hash)
+
+    def testHashAfterParsingAll(self):
+        """Hash and statistics asked after parsing all"""
+        mpeg = MPEGAudio(file=open('data/vbr_empty.mp3', 'rb'))
+        frame_count = mpeg.frame_count
+        self.assertEqual(mpeg.frames._has_parsed_all, True)
+        mpeg.parse_all()
+        mpeg.parse_all(statistics=True)
+        self.assertEqual(mpeg.statistics.frame_count, frame_count)
+        mpeg.parse_all(hash_algorithm='sha1')
+        self.assertEqual(len(mpeg.content_hash), 40)
+        mpeg.parse_all(hash_algorithm='md5')
+        self.assertEqual(len(mpeg.content_hash), 32)
+        self.assertEqual(mpeg.frame_count, frame_count)
+
+    def testDuplicates(self):
+        """Catalog finds same audio with different tags"""
+        catalog = Catalog(hash_algorithm='sha1')
+        catalog.scan(self.root)
+        self.assertEqual(catalog.get_duplicates().values(),
+                         [[os.path.join(self.root, 'song.mp3'),
+                           os.path.join(self.root, 'tagged.mp3')]])
+
+class ExportTests(unittest.TestCase):
+    """Columnar export tests."""
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name in ('a.mp3', 'b.mp3', 'c.mp3'):
+            shutil.copy('data/song.mp3', os.path.join(self.root, name))
+        open(os.path.join(self.root, 'bad.mp3'), 'wb').write('x' * 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testCSV(self):
+        """Export CSV while scanning"""
+        output = StringIO.StringIO()
+        writer = export.CSVWriter(output, batch_size=3)
+        catalog = Catalog(statistics=['bitrate', 'padding'])
+        catalog.scan(self.root, writer)
+        writer.close()
+
+        rows = list(csv.reader(StringIO.StringIO(output.getvalue())))
+        self.assertEqual(writer.rows, 4)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(tuple(rows[0]),
+                         tuple(name for name, type in export.COLUMNS))
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['frame_count'], '7352')
+        self.assertEqual(row['min_bitrate'], '256')
+        self.assertEqual(row['provenance'], 'parsed')
+        self.assertEqual(row['audio_size'], '')
+        self.assertNotEqual(dict(zip(rows[0], rows[3]))['error'], '')
+
+    def testVBRHeader(self):
+        """Export columns of XING header"""
+        shutil.copy('data/vbr_xing.mp3', os.path.join(self.root, 'a.mp3'))
+        output = StringIO.StringIO()
+        writer = export.CSVWriter(output)
+        catalog = Catalog()
+        catalog.scan(self.root, writer)
+        writer.close()
+
+        rows = list(csv.reader(StringIO.StringIO(output.getvalue())))
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['vbr_quality'], '78')
+        self.assertEqual(row['has_toc'], 'True')
+        self.assertEqual(row['vbri_version'], '')
+        self.assertEqual(dict(zip(rows[0], rows[2]))['vbr_quality'], '')
+
+    def testAbstract(self):
+        """Columnar writer is abstract"""
+        self.assertRaises(TypeError, export.ColumnarWriter)
+
+    @unittest.skipIf(export.pyarrow is None, 'pyarrow is not available')
+    def testArrow(self):
+        """Export Arrow"""
+        catalog = Catalog()
+        catalog.scan(self.root)
+        path = os.path.join(self.root, 'catalog.arrow')
+        writer = export.ArrowWriter(path, batch_size=2)
+        writer.write_catalog(catalog)
+        writer.close()
+
+        table = export.pyarrow.ipc.open_file(path).read_all()
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column_names[0], 'path')
+
 class ChunkedReadTests(unittest.TestCase):
     def setUp(self):
         self.file = open('data/song.mp3', 'rb')
@@ -287,10 +1236,75 @@ class ChunkedReadTests(unittest.TestCase):
         chunks = utils.chunked_reader(self.file, chunk_size=4)
         self.assertEqual([2283, 3119, 3955], [f.offset for f in utils.genlimit(MPEGAudioFrame.parse_consecutive(header_offset=2283, chunks=chunks), 2, 3)])
 
+    def testParseConsecutiveBackward(self):
+        """Chunked parse consecutive backward"""
+        mpeg = MPEGAudio(file=self.file)
+        chunks = utils.reverse_chunked_reader(self.file, end_position=3955,
+                                              chunk_size=4)
+        self.assertEqual([3119, 2283], [f.offset for f in utils.genmax(MPEGAudioFrame.parse_consecutive_backward(mpeg.frames[2], chunks), 2)])
+
     def testFindAndParse(self):
         """Chunked find and parse"""
         self.assertEqual([2283, 3119, 3955], [f.offset for f in list(MPEGAudioFrame.find_and_parse(self.file, max_frames=3, chunk_size=4, begin_frame_search=2273))])
 
+class LockedStreamTests(unittest.TestCase):
+    """Locked stream parsing tests."""
+    def setUp(self):
+        self.data = open('data/song.mp3', 'rb').read()
+
+    def testLocked(self):
+        """Locked frames equal parsed frames"""
+        offset = 2283
+        for frame in MPEGAudioFrame.parse_consecutive(offset,
+                                                      [(0, self.data)]):
+            parsed = MPEGAudioFrame.parse(headers.get_bytes(offset,
+                                                            self.data))
+            parsed.offset = offset
+            self.assertEqual(frame.__dict__, parsed.__dict__)
+            offset += frame.size
+
+    def testStream(self):
+        """Frames of other stream are rejected"""
+        frame = MPEGAudioFrame.parse(headers.get_bytes(2283, self.data))
+        # Protection bit differs
+        other = MPEGAudioFrame.parse(frame.header ^ 0x10000)
+        chunk = self.data[:20000]
+        self.assertEqual(MPEGAudioFrame.find_in_chunk(chunk, 0, frame).offset,
+                         2283)
+        self.assertEqual(MPEGAudioFrame.find_in_chunk(chunk, 0, other), None)
+        self.assertEqual(list(MPEGAudioFrame.parse_consecutive(2283,
+                                [(0, chunk)], stream_header=other.header)),
+                         [])
+
+class FrameBatchTests(unittest.TestCase):
+    """Batched frame iteration tests."""
+    def setUp(self):
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        self.frames = [(frame.offset, frame.size, frame.bitrate, frame.header) \
+                       for frame in mpeg.frames]
+
+    def testBatches(self):
+        """Batches of frames equal frames"""
+        for tolerant in (False, True):
+            mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'),
+                             tolerant=tolerant)
+            batches = list(mpeg.frames.iter_batches(1000))
+            self.assertEqual([len(batch.offsets) for batch in batches],
+                             [min(1000, len(self.frames) - number) \
+                              for number in range(0, len(self.frames), 1000)])
+            self.assertEqual([frame for batch in batches \
+                              for frame in zip(*batch)], self.frames)
+            self.assertEqual(mpeg.frames.get_length(scan=False),
+                             (7352, True))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not available')
+    def testNumPy(self):
+        """Batches of frames as NumPy arrays"""
+        mpeg = MPEGAudio(file=open('data/song.mp3', 'rb'))
+        batch = next(mpeg.frames.iter_batches(as_numpy=True))
+        self.assertTrue(isinstance(batch.bitrates, numpy.ndarray))
+        self.assertEqual(batch.offsets[:3].tolist(), [2283, 3119, 3955])
+
 class IncorrectFile(unittest.TestCase):
     def testParse(self):
         """Test parsing incorrect file."""
@@ -305,3 +1319,23 @@ class DocTests(unittest.TestCase):
     def testmpeg1audioUtils(self):
         """Doc test mpeg1audio.utils"""
         doctest.testmod(mpeg1audio.utils, raise_on_error=True)
+
+    def testmpeg1audioHeaders(self):
+        """Doc test mpeg1audio.headers"""
+        doctest.testmod(mpeg1audio.headers, raise_on_error=True)
+
+    def testmpeg1audioSampling(self):
+        """Doc test mpeg1audio.sampling"""
+        doctest.testmod(mpeg1audio.sampling, raise_on_error=True)
+
+    def testmpeg1audioCRC(self):
+        """Doc test mpeg1audio.crc"""
+        doctest.testmod(mpeg1audio.crc, raise_on_error=True)
+
+    def testmpeg1audioSources(self):
+        """Doc test mpeg1audio.sources"""
+        doctest.testmod(mpeg1audio.sources, raise_on_error=True)
+
+    def testmpeg1audioWSGI(self):
+        """Doc test mpeg1audio.wsgi"""
+        doctest.testmod(mpeg1audio.wsgi, raise_on_error=True)